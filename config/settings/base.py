@@ -316,6 +316,29 @@ else:
         }
     }
 
+# Upper bound of the amount of events kept in the in-process cache of serie expansions (webook.utils.serie_cache)
+SERIE_EXPANSION_CACHE_MAX_EVENTS = env.int(
+    "SERIE_EXPANSION_CACHE_MAX_EVENTS", default=250000
+)
+
+# Seconds the in-process room occupancy index (webook.utils.room_occupancy) trusts a room without reloading it.
+# Changes made without signals (bulk operations, queryset updates) are picked up when the room is reloaded.
+ROOM_OCCUPANCY_INDEX_MAX_AGE = env.int("ROOM_OCCUPANCY_INDEX_MAX_AGE", default=300)
+# Days of past bookings the room occupancy index holds. Queries reaching further back are answered by the database.
+ROOM_OCCUPANCY_INDEX_HISTORY_DAYS = env.int(
+    "ROOM_OCCUPANCY_INDEX_HISTORY_DAYS", default=31
+)
+# Seconds the collision records of the occurrences of a serie are reused when the serie is analyzed again as it is
+# edited (webook.utils.collision_analysis.analyze_serie_collisions).
+SERIE_COLLISION_CACHE_TIMEOUT = env.int("SERIE_COLLISION_CACHE_TIMEOUT", default=600)
+# Seconds the calendar rows of a week are cached (webook.utils.calendar_cache). Changes to events, arrangements and
+# their rooms and people invalidate the weeks of the affected events right away; this bounds how long other changes
+# (renamed rooms or people, queryset updates) go unseen by the calendars.
+CALENDAR_CACHE_TIMEOUT = env.int("CALENDAR_CACHE_TIMEOUT", default=600)
+# Seconds the calendar rows of a week are cached without Redis, where each worker has a cache of its own that changes
+# made through other workers do not invalidate. This bounds how long a worker serves a calendar that is out of date.
+CALENDAR_CACHE_LOCAL_TIMEOUT = env.int("CALENDAR_CACHE_LOCAL_TIMEOUT", default=10)
+
 CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default="django-db")
 RESULT_BACKEND = env("RESULT_BACKEND", default="django-db")
 # CELERY_CACHE_BACKEND = env("CELERY_CACHE_BACKEND", default="default")
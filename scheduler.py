@@ -55,10 +55,24 @@ def synchronize_all_calendars():
     stdout, stderr = [x.decode("utf-8") for x in process.communicate()]
 
 
+def extend_serie_projections():
+    now = datetime.now()
+    print(f"[{now}] Extending serie projections")
+
+    process = subprocess.Popen(
+        ["python", "manage.py", "extend_serie_projections"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    stdout, stderr = [x.decode("utf-8") for x in process.communicate()]
+
+
 schedule.every().day.at("01:00").do(synchronize_all_calendars)
 schedule.every().day.at("02:00").do(run_pii_sanitization)
 schedule.every().hour.do(hourly_index_update)
 schedule.every().day.at("03:00").do(nightly_index_rebuild)
+# Series only need extending when the month shifts, but running daily catches up on any missed runs
+schedule.every().day.at("00:30").do(extend_serie_projections)
 
 
 while True:
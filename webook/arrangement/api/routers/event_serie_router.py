@@ -1,8 +1,12 @@
 from datetime import date, datetime, time
+import json
 from typing import List, Optional, Union
 import uuid
 
+from django.db import transaction
 from django.db.models.query import QuerySet as QuerySet
+from django.http import StreamingHttpResponse
+from django.utils import timezone as dj_timezone
 from webook.api.schemas.base_schema import BaseSchema
 from webook.api.schemas.collision_record_schema import CollisionRecordSchema
 from webook.api.schemas.operation_result_schema import OperationResultSchema
@@ -23,16 +27,31 @@ from webook.arrangement.forms.exclusivity_analysis.serie_manifest_form import (
     CreateSerieForm,
     SerieManifestForm,
 )
+from ninja.errors import HttpError
 from ninja.pagination import paginate, PageNumberPagination
 from webook.arrangement.models import Event, EventSerie, EventSerieFile, PlanManifest
+from webook.arrangement.tasks import create_event_serie_task, serie_creation_progress
 from webook.api.crud_router import CrudRouter, QueryFilter, Views
 from enum import Enum
 from datetime import date, time
 
 from webook.screenshow.api import DisplayLayoutGetSchema
-from webook.utils.collision_analysis import analyze_collisions
-from webook.utils.serie_calculator import _Event, calculate_serie
-from webook.utils.sph_gen import get_serie_positional_hash
+from webook.utils.collision_analysis import (
+    analyze_batch_collisions,
+    analyze_serie_collisions,
+    iter_ndjson,
+    iter_serie_collisions,
+    serie_analysis_events,
+)
+from webook.utils.json_serial import json_serial
+from webook.utils.serie_calculator import (
+    ImpossibleSerieException,
+    LikelyInfiniteLoopException,
+    SeriePrediction,
+    _Event,
+    calculate_serie,
+    predict_serie,
+)
 
 
 class BufferMixinSchema:
@@ -122,6 +141,12 @@ class PlanManifestSchema(BaseSchema, BufferMixinSchema):
     arrangement_pk: Optional[int] = None
 
 
+class ManifestCollisionsSchema(BaseSchema):
+    index: int
+    internal_uuid: Optional[str] = None
+    records: List[CollisionRecordSchema]
+
+
 class PlanManifestCreateSchema(PlanManifestSchema):
     responsible: Optional[int] = None
     status: Optional[int]
@@ -131,6 +156,8 @@ class PlanManifestCreateSchema(PlanManifestSchema):
     location: int
     people: Optional[List[int]] = None
     display_layouts: Optional[List[int]] = None
+    # Store a serie without a stop date as a virtual serie, see EventSerie.is_virtual
+    virtual: bool = False
 
 
 class CreateEventSerieSchema(BaseSchema):
@@ -145,6 +172,59 @@ class GetEventSerieSchema(BaseSchema):
     # events: List[EventGetSchema]
 
 
+class PlanManifestPredictSchema(BaseSchema):
+    """The fields of a plan manifest that decide the serie it gives"""
+
+    title: str = ""
+    pattern: str = ""
+    pattern_strategy: str
+    recurrence_strategy: str
+    start_date: date
+    start_time: time
+    end_time: time
+
+    stop_within: Optional[date] = None
+    stop_after_x_occurences: Optional[int] = None
+    project_x_months_into_future: Optional[int] = None
+
+    exclusions: List[date] = []
+
+    monday: Optional[bool] = False
+    tuesday: Optional[bool] = False
+    wednesday: Optional[bool] = False
+    thursday: Optional[bool] = False
+    friday: Optional[bool] = False
+    saturday: Optional[bool] = False
+    sunday: Optional[bool] = False
+    arbitrator: Optional[str] = None
+    day_of_week: Optional[int] = None
+    day_of_month: Optional[int] = None
+    month: Optional[int] = None
+
+    interval: Optional[int] = None
+
+
+class SeriePredictionSchema(BaseSchema):
+    count: int
+    first_date: Optional[date] = None
+    last_date: Optional[date] = None
+
+
+class SerieCreationJobSchema(BaseSchema):
+    job_id: str
+
+
+class SerieCreationProgressSchema(BaseSchema):
+    """The progress of a serie creation job, in occurrences of the serie"""
+
+    status: str
+    expanded: int = 0
+    analyzed: int = 0
+    written: int = 0
+    serie_id: Optional[int] = None
+    error: Optional[str] = None
+
+
 class EventSerieRouter(CrudRouter, NotesMixinRouter, FileMixinRouter):
     def __init__(self, *args, **kwargs):
         self.list_filters = [
@@ -232,82 +312,89 @@ def __convert_to_form_expected_input(s: PlanManifestCreateSchema) -> dict:
     return d
 
 
-@router.post("/collisionAnalysis", response=List[CollisionRecordSchema])
-def collision_analysis(request, data: PlanManifestCreateSchema):
-    """Perform collision analysis on a plan manifest. Returns a list of CollisionRecordSchema, will be empty if no collisions are found."""
+def __serie_analysis_events(data: PlanManifestCreateSchema):
+    """Calculate the serie of the given plan manifest, as events (with rigging) ready for collision analysis"""
     form = SerieManifestForm(data=__convert_to_form_expected_input(data))
     form.is_valid()
 
     manifest = form.as_plan_manifest()
-    calculated_serie: List[_Event] = calculate_serie(manifest)
-
-    if manifest.exclusions:
-        excluded_dates = list(map(lambda ex: ex.date, manifest.exclusions.all()))
-        calculated_serie = [
-            ev for ev in calculated_serie if ev.start.date() not in excluded_dates
-        ]
-
-    converted_events: List[EventDTO] = []
-
-    rooms_list: List[int] = [int(room.id) for room in manifest.rooms.all()]
-    for ev in calculated_serie:
-        event_dto = EventDTO(
-            title=ev.title,
-            start=ev.start,
-            end=ev.end,
-            rooms=rooms_list,
-            before_buffer_title=manifest.before_buffer_title,
-            before_buffer_date_offset=manifest.before_buffer_date_offset,
-            before_buffer_start=manifest.before_buffer_start,
-            before_buffer_end=manifest.before_buffer_end,
-            after_buffer_title=manifest.after_buffer_title,
-            after_buffer_date_offset=manifest.after_buffer_date_offset,
-            after_buffer_start=manifest.after_buffer_start,
-            after_buffer_end=manifest.after_buffer_end,
-            is_resolution=True,
+    try:
+        calculated_serie: List[_Event] = calculate_serie(
+            manifest, exclusions=data.exclusions
         )
-        rigging_events: dict = event_dto.generate_rigging_events()
-        events = []
+    except (ImpossibleSerieException, LikelyInfiniteLoopException) as exception:
+        raise HttpError(status_code=400, message=str(exception))
 
-        # TODO: Figure out if this is necessary, or a remotely intelligent way of doing it.
-        # Date should be enough - no?
-        event_dto.serie_positional_hash: str = get_serie_positional_hash(  # type: ignore
-            manifest.internal_uuid, event_dto.title, event_dto.start, event_dto.end
-        )
+    rooms_list: List[int] = [int(room.id) for room in manifest.rooms.all()]
+    people_list: List[int] = [int(person.id) for person in manifest.people.all()]
+    converted_events: List[EventDTO] = serie_analysis_events(
+        manifest, calculated_serie, rooms_list, people_list
+    )
 
-        rigging_before_event = rigging_events.get("before", None)
-        if rigging_before_event is not None:
-            rigging_before_event.is_rigging = True
-            rigging_before_event.sph_of_root_event = event_dto.serie_positional_hash
-            rigging_before_event.serie_positional_hash = (
-                rigging_before_event.generate_serie_positional_hash(
-                    manifest.internal_uuid
-                )
-            )
-            events.append(rigging_before_event)
-        rigging_after_event = rigging_events.get("after", None)
-        if rigging_after_event is not None:
-            rigging_after_event.is_rigging = True
-            rigging_after_event.sph_of_root_event = event_dto.serie_positional_hash
-            rigging_after_event.serie_positional_hash = (
-                rigging_after_event.generate_serie_positional_hash(
-                    manifest.internal_uuid
-                )
-            )
-            events.append(rigging_after_event)
+    return manifest, converted_events
 
-        events.append(event_dto)
 
-        converted_events += events
+@router.post("/collisionAnalysis", response=List[CollisionRecordSchema])
+def collision_analysis(request, data: PlanManifestCreateSchema):
+    """
+    Perform collision analysis on a plan manifest. Returns a list of CollisionRecordSchema, will be empty if no
+    collisions are found.
+    """
+    manifest, events = __serie_analysis_events(data)
 
     pk_of_preceding_event_serie = manifest._predecessor_serie
-    records = analyze_collisions(
-        converted_events, ignore_serie_pk=pk_of_preceding_event_serie
+    records = analyze_serie_collisions(
+        manifest.internal_uuid,
+        events,
+        ignore_serie_pk=pk_of_preceding_event_serie,
     )
 
     return records
 
 
+@router.post("/collisionAnalysis/batch", response=List[ManifestCollisionsSchema])
+def batch_collision_analysis(request, data: List[PlanManifestCreateSchema]):
+    """
+    Perform collision analysis on several plan manifests at once, against the existing events and against each other.
+    Returns the records of each manifest, in the order the manifests were given.
+    """
+    analyzed = [__serie_analysis_events(manifest_data) for manifest_data in data]
+    records = analyze_batch_collisions(
+        [(events, manifest._predecessor_serie) for manifest, events in analyzed]
+    )
+
+    return [
+        {
+            "index": index,
+            "internal_uuid": manifest.internal_uuid,
+            "records": manifest_records,
+        }
+        for index, ((manifest, _), manifest_records) in enumerate(
+            zip(analyzed, records)
+        )
+    ]
+
+
+@router.post("/collisionAnalysis/stream")
+def stream_collision_analysis(request, data: PlanManifestCreateSchema):
+    """
+    Perform collision analysis on a plan manifest, streaming the records as NDJSON as they are found -- one
+    CollisionRecordSchema per line, in the timezone of the user. The last line is a summary of the collisions;
+    {"summary": {"count", "earliest", "latest", "resources"}}, where resources holds the count per contested resource.
+    """
+    manifest, events = __serie_analysis_events(data)
+
+    records = iter_serie_collisions(
+        manifest.internal_uuid,
+        events,
+        ignore_serie_pk=manifest._predecessor_serie,
+    )
+    return StreamingHttpResponse(
+        iter_ndjson(records, dj_timezone.get_current_timezone()),
+        content_type="application/x-ndjson",
+    )
+
+
 @router.post("/create", response=int)
 def create_event_serie(request, data: PlanManifestCreateSchema):
     form = CreateSerieForm(data=__convert_to_form_expected_input(data))
@@ -315,7 +402,68 @@ def create_event_serie(request, data: PlanManifestCreateSchema):
     if not form.is_valid():
         raise Exception(form.errors)
 
-    return form.save(form=form, user=request.user)
+    try:
+        # The manifest is saved before the serie is calculated; it is rolled back along with the serie
+        with transaction.atomic():
+            return form.save(form=form, user=request.user, exclusions=data.exclusions)
+    except (ImpossibleSerieException, LikelyInfiniteLoopException) as exception:
+        raise HttpError(status_code=400, message=str(exception))
+
+
+@router.post("/create/async", response=SerieCreationJobSchema)
+def create_event_serie_async(request, data: PlanManifestCreateSchema):
+    """
+    Create an event serie in a background job, for series too large to be created within a request. Returns the id
+    of the job, the progress of which is found at /create/jobs/{job_id}.
+    """
+    form_data = __convert_to_form_expected_input(data)
+    form_data["internal_uuid"] = str(form_data["internal_uuid"])
+
+    form = CreateSerieForm(data=form_data)
+    if not form.is_valid():
+        raise HttpError(status_code=400, message=form.errors.as_json())
+
+    job = create_event_serie_task.delay(
+        json.loads(json.dumps(form_data, default=json_serial)),
+        request.user.pk,
+        [exclusion.isoformat() for exclusion in data.exclusions],
+    )
+
+    return {"job_id": job.id}
+
+
+@router.get("/create/jobs/{job_id}", response=SerieCreationProgressSchema)
+def event_serie_creation_progress(request, job_id: str):
+    """Get the status and progress of a serie creation job started with /create/async"""
+    return serie_creation_progress(job_id)
+
+
+@router.post("/predict", response=SeriePredictionSchema)
+def predict(request, data: PlanManifestPredictSchema):
+    """
+    Predict how many activities a plan manifest gives, and the dates of the first and last of them, without
+    calculating the serie.
+    """
+    manifest = PlanManifest(**data.dict(exclude={"exclusions"}))
+
+    try:
+        prediction = predict_serie(manifest, exclusions=data.exclusions)
+        if prediction is None:
+            # Too irregular to be predicted, so we have to calculate it
+            events = calculate_serie(manifest, exclusions=data.exclusions)
+            prediction = SeriePrediction(
+                count=len(events),
+                first_date=events[0].start.date() if events else None,
+                last_date=events[-1].start.date() if events else None,
+            )
+    except (
+        ImpossibleSerieException,
+        LikelyInfiniteLoopException,
+        ValueError,
+    ) as exception:
+        raise HttpError(status_code=400, message=str(exception))
+
+    return prediction
 
 
 @router.put("/{id}", response=GetEventSerieSchema)
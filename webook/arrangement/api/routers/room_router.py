@@ -1,11 +1,15 @@
+from datetime import datetime, timedelta
 from typing import List, Optional
 from django.http import Http404
 from django.shortcuts import get_object_or_404
-from ninja import Router, Schema
+from django.utils import timezone as dj_timezone
+from ninja import Query, Router, Schema
+from ninja.errors import HttpError
 
 from webook.api.schemas.base_schema import BaseSchema, ModelBaseSchema
 from webook.api.crud_router import CrudRouter, Views
-from webook.arrangement.models import Room
+from webook.arrangement.models import Person, Room
+from webook.utils.room_availability import find_free_windows
 
 
 class RoomCreateSchema(BaseSchema):
@@ -28,6 +32,12 @@ class RoomGetSchema(ModelBaseSchema):
     has_screen: bool
 
 
+class FreeWindowSchema(BaseSchema):
+    start: datetime
+    end: datetime
+    free_until: datetime
+
+
 class RoomRouter(CrudRouter):
     def __init__(self, *args, **kwargs):
         self.non_deferred_fields = ["location"]
@@ -52,3 +62,44 @@ room_router = RoomRouter(
 @room_router.get("/tree", response=List[RoomGetSchema], by_alias=True)
 def get_tree(request):
     return [item.as_node() for item in Room.objects.all()]
+
+
+@room_router.get("/availability", response=List[FreeWindowSchema], by_alias=True)
+def get_availability(
+    request,
+    duration: int,
+    rooms: List[int] = Query(...),
+    people: List[int] = Query([]),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    count: int = 5,
+):
+    """
+    Find the next count windows of duration minutes at which all of the given rooms and people are free, within their
+    business hours. Searches from start (default now) until end (default 31 days after start).
+    """
+    start = start or dj_timezone.now()
+    if dj_timezone.is_naive(start):
+        start = dj_timezone.make_aware(start)
+    end = end or start + timedelta(days=31)
+    if dj_timezone.is_naive(end):
+        end = dj_timezone.make_aware(end)
+
+    rooms = list(set(rooms))
+    people = list(set(people))
+    if Room.objects.filter(id__in=rooms).count() != len(rooms):
+        raise HttpError(status_code=404, message="Room not found")
+    if Person.objects.filter(id__in=people).count() != len(people):
+        raise HttpError(status_code=404, message="Person not found")
+
+    try:
+        return find_free_windows(
+            rooms,
+            timedelta(minutes=duration),
+            start,
+            end,
+            person_ids=people,
+            count=count,
+        )
+    except ValueError as exception:
+        raise HttpError(status_code=400, message=str(exception))
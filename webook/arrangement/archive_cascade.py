@@ -0,0 +1,95 @@
+"""archive_cascade.py
+
+Set-based archiving of the dependents of an archived object.
+
+Archiving an object archives what depends on it as well; the events of an arrangement or a serie, the rooms of a
+location, and so forth. Models declare their dependents with a get_archive_dependents classmethod, returning a
+queryset for each kind of dependent of the objects with the given ids:
+
+    @classmethod
+    def get_archive_dependents(cls, ids):
+        return [Event.all_objects.filter(arrangement_id__in=ids)]
+
+The archive graph is walked once, level by level, collecting the ids of the dependents per model (see
+plan_archive_cascade), after which the dependents of each model are archived with one UPDATE. As updates do not send
+the post_save signal, one objects_archived signal is sent for the cascade as a whole once the transaction has been
+committed, in place of the signals of each dependent.
+
+"""
+
+import datetime
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Optional, Set, Type
+
+from django.db import models, transaction
+from django.utils import timezone as dj_timezone
+
+from webook.arrangement.signals import objects_archived
+
+
+def plan_archive_cascade(
+    model: Type[models.Model], ids: Iterable[int]
+) -> Dict[Type[models.Model], Set[int]]:
+    """
+    Walk the archive graph from the objects of the given model with the given ids, collecting the ids of their
+    dependents that are not yet archived, per model. The objects themselves are not included.
+    """
+    root_ids = set(ids)
+    planned: Dict[Type[models.Model], Set[int]] = defaultdict(set)
+    planned[model] |= root_ids
+
+    queue = deque([(model, root_ids)])
+    while queue:
+        model_of_level, ids_of_level = queue.popleft()
+        get_archive_dependents = getattr(model_of_level, "get_archive_dependents", None)
+        if get_archive_dependents is None:
+            continue
+
+        for dependents in get_archive_dependents(ids_of_level):
+            dependent_ids = (
+                set(dependents.filter(is_archived=False).values_list("id", flat=True))
+                - planned[dependents.model]
+            )
+            if dependent_ids:
+                planned[dependents.model] |= dependent_ids
+                queue.append((dependents.model, dependent_ids))
+
+    planned[model] -= root_ids
+    return {model: ids for model, ids in planned.items() if ids}
+
+
+def archive_dependents(
+    instance: models.Model,
+    person_archiving: Optional[models.Model] = None,
+    archived_when: Optional[datetime.datetime] = None,
+) -> Dict[Type[models.Model], List[int]]:
+    """
+    Archive the dependents of the given instance with one UPDATE per model, returning the ids of the archived
+    dependents per model.
+    """
+    if archived_when is None:
+        archived_when = datetime.datetime.now()
+
+    archived = {
+        model: sorted(ids)
+        for model, ids in plan_archive_cascade(type(instance), [instance.pk]).items()
+    }
+
+    for model, ids in archived.items():
+        fields = {
+            "is_archived": True,
+            "archived_by": person_archiving,
+            "archived_when": archived_when,
+        }
+        if any(field.name == "modified" for field in model._meta.concrete_fields):
+            # As set by TimeStampedModel on save
+            fields["modified"] = dj_timezone.now()
+
+        model.all_objects.filter(id__in=ids).update(**fields)
+
+    if archived:
+        transaction.on_commit(
+            lambda: objects_archived.send(sender=type(instance), archived=archived)
+        )
+
+    return archived
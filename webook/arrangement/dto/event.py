@@ -1,10 +1,7 @@
 import time
 from dataclasses import dataclass, field
-from datetime import datetime, time, timedelta
-from typing import Dict, List, Optional, Tuple
-
-import pytz
-from django.utils import timezone as dj_timezone
+from datetime import datetime, time
+from typing import List, Optional
 
 from webook.utils.sph_gen import get_serie_positional_hash
 
@@ -51,68 +48,27 @@ class EventDTO:
         return get_serie_positional_hash(serie_uuid, self.title, self.start, self.end)
 
     def generate_rigging_events(self):
-        _title_generators_per_position = {
-            "before": lambda root_name: "Opprigging for " + root_name,
-            "after": lambda root_name: "Nedrigging for " + root_name,
-        }
-
-        time_pairs: List[Tuple[datetime, datetime, int]] = [
-            (
-                self.before_buffer_title,
-                self.before_buffer_date,
-                self.before_buffer_start,
-                self.before_buffer_end,
-                self.before_buffer_date_offset,
-            ),
-            (
-                self.after_buffer_title,
-                self.after_buffer_date,
-                self.after_buffer_start,
-                self.after_buffer_end,
-                self.after_buffer_date_offset,
-            ),
-        ]
-
-        current_tz = pytz.timezone(str(dj_timezone.get_current_timezone()))
+        from webook.utils.collision_analysis import (
+            explode_rigging_events,
+            rigging_title,
+        )
 
         rigging_events = {"root": self}
 
-        root_event_rooms = self.rooms
-        root_event_people = self.people
-
-        is_before = True
-        for title, date, start_time, end_time, date_offset in time_pairs:
-            if start_time is None or end_time is None:
-                # We need both start and end to generate a rigging event
-                # Without both present there is really no point.
-                is_before = False
-                continue
-
-            position_key = "before" if is_before else "after"
-            is_before = False
-
-            date = date or self.start
-
-            offset: Optional[datetime] = (
-                timedelta(days=date_offset) if date_offset else timedelta(days=0)
-            )
-            if position_key == "before":
-                date = date - offset
-            else:
-                date = date + offset
-
+        for position, intervals in explode_rigging_events([self.start], self).items():
+            ((start, end),) = intervals
             rigging_event = EventDTO(
-                title=title or _title_generators_per_position[position_key](self.title),
-                start=current_tz.localize(datetime.combine(date, start_time)),
-                end=current_tz.localize(datetime.combine(date, end_time)),
+                title=rigging_title(position, self, self.title),
+                start=start,
+                end=end,
             )
 
             rigging_event.arrangement_id = self.arrangement_id
 
             # We can not set rooms or people before the event has been saved -- unfortunately.
-            rigging_event.rooms = root_event_rooms
-            rigging_event.people = root_event_people
+            rigging_event.rooms = self.rooms
+            rigging_event.people = self.people
 
-            rigging_events[position_key] = rigging_event
+            rigging_events[position] = rigging_event
 
         return rigging_events
@@ -3,104 +3,232 @@
 This file contains queries that are used to get events from the database.
 Used in calendar views.
 
+All the calendar feeds -- the planner, the calendar API and personal calendars -- are served by the one calendar
+query of this module, compiled once per dialect (see _compile_calendar_query). The feeds get the rows of the query
+through the calendar cache, which caches them per week (see cached_calendar_json).
+
 """
 
 import json
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Optional, Tuple
 
 from dateutil import parser
 from django.db import connection
 
-from webook.utils import json_serial
+from webook.arrangement.virtual_series import get_virtual_occurrences_in_period
+from webook.utils.calendar_cache import calendar_week_cache
+from webook.utils.json_serial import json_serial
+
+# The columns of the rows of the calendar query, as (name, expression) pairs. The expressions select from the events
+# in the period (ev), what they refer to, and the CTEs aggregating their rooms and people (see _compile_calendar_query)
+_CALENDAR_COLUMNS = [
+    ("audience_icon", "audience.icon_class"),
+    ("arrangement_name", "arr.name"),
+    ("audience", "audience.name"),
+    ("audience_slug", "audience.slug"),
+    ("mainPlannerName", "(resp.first_name || ' ' || resp.last_name)"),
+    ("arrangement_pk", "arr.id"),
+    ("event_pk", "ev.id"),
+    ("slug", "arr.slug"),
+    ("name", "ev.title"),
+    ("starts", "ev.start"),
+    ("created_when", "arr.created"),
+    ("association_type", "ev.association_type"),
+    ("ends", "ev.end"),
+    ("location", "loc.name"),
+    ("location_slug", "loc.slug"),
+    ("arrangement_type", "arrtype.name"),
+    ("arrangement_type_slug", "arrtype.slug"),
+    ("evserie_id", "ev.serie_id"),
+    ("status_name", "status.name"),
+    ("status_color", "status.color"),
+    ("status_slug", "status.slug"),
+    ("expected_visitors", "ev.expected_visitors"),
+    ("after_buffer_ev_id", "ev.buffer_after_event_id"),
+    ("before_buffer_ev_id", "ev.buffer_before_event_id"),
+    ("is_rigging", "(rigging.id IS NOT NULL)"),
+    ("room_names", "coalesce(rooms.names, {empty})"),
+    ("people_names", "coalesce(people.names, {empty})"),
+    ("slug_list", "coalesce(slugs.slugs, {empty})"),
+]
+
+# The columns that are arrays, which are aggregated as JSON on SQLite
+_ARRAY_COLUMNS = {"room_names", "people_names", "slug_list"}
+
+
+def _sqlite_json_rows(columns: List[str]) -> str:
+    """Aggregate the rows of the calendar query into a JSON array on SQLite"""
+    pairs = ", ".join(
+        (
+            f"'{column}', json(calendar.\"{column}\")"
+            if column in _ARRAY_COLUMNS
+            else f"'{column}', calendar.\"{column}\""
+        )
+        for column in columns
+    )
+    return f"coalesce(json_group_array(json_object({pairs})), '[]')"
+
+
+# Per dialect; the aggregate that collects the rooms and people of each event, the value of an event without any, and
+# the aggregate of the rows into a JSON array
+_DIALECTS = {
+    "postgresql": (
+        "array_agg",
+        "'{}'",
+        lambda columns: "coalesce(json_agg(calendar), '[]')::text",
+    ),
+    "sqlite": ("json_group_array", "'[]'", _sqlite_json_rows),
+}
+
 
+@lru_cache(maxsize=None)
+def _compile_calendar_query(
+    vendor: str, for_person: bool, starting_in_period: bool = False
+) -> str:
+    """
+    Compile the calendar query for the given database vendor. The query is parameterized with the start and end of
+    the period, and the id of the person if for_person, and has one row with one column; the calendar rows as a JSON
+    array. The rows are those of the events within the period, or those of the events that start in the period if
+    starting_in_period.
 
-def __arrangement_query_builder(where: str):
+    The rooms and people of the events in the period are aggregated in CTEs of their own, as are the events that are
+    rigging for other events, and joined to the events afterwards; one row per event, without a GROUP BY over the
+    cross product of its rooms and people.
     """
-    Builds a query that returns all arrangements that are not archived
+    aggregate, empty, json_rows = _DIALECTS[vendor]
+
+    period_filter = "event.start > %s AND event.end < %s"
+    if starting_in_period:
+        period_filter = "event.start >= %s AND event.start < %s"
+
+    person_filter = ""
+    if for_person:
+        person_filter = "AND event.id IN (SELECT event_id FROM arrangement_event_people WHERE person_id = %s)"
 
-    Args:
-        where: A string that is used to filter the query.
+    columns = ",\n        ".join(
+        f'{expression.format(empty=empty)} AS "{name}"'
+        for name, expression in _CALENDAR_COLUMNS
+    )
 
-    Returns:
-        A string that is a query. Remember to parameterize this string, do not pass values in directly with the where argument.
+    return f"""
+    WITH calendar_events AS (
+        SELECT event.* FROM arrangement_event AS event
+        JOIN arrangement_arrangement AS arr ON arr.id = event.arrangement_id
+        WHERE arr.is_archived = false AND event.is_archived = false AND {period_filter}
+        {person_filter}
+    ),
+    event_rooms AS (
+        SELECT evr.event_id, room.name, room.slug
+        FROM arrangement_event_rooms AS evr
+        JOIN calendar_events AS ev ON ev.id = evr.event_id
+        JOIN arrangement_room AS room ON room.id = evr.room_id
+    ),
+    event_people AS (
+        SELECT evp.event_id, (person.first_name || ' ' || person.last_name) AS name, person.slug
+        FROM arrangement_event_people AS evp
+        JOIN calendar_events AS ev ON ev.id = evp.event_id
+        JOIN arrangement_person AS person ON person.id = evp.person_id
+    ),
+    rooms AS (
+        SELECT event_id, {aggregate}(DISTINCT name) AS names FROM event_rooms GROUP BY event_id
+    ),
+    people AS (
+        SELECT event_id, {aggregate}(DISTINCT name) AS names FROM event_people GROUP BY event_id
+    ),
+    slugs AS (
+        SELECT event_id, {aggregate}(slug) AS slugs FROM (
+            SELECT event_id, slug FROM event_rooms UNION SELECT event_id, slug FROM event_people
+        ) AS event_slugs
+        GROUP BY event_id
+    ),
+    rigging AS (
+        SELECT buffer_before_event_id AS id FROM arrangement_event
+        WHERE buffer_before_event_id IN (SELECT id FROM calendar_events)
+        UNION
+        SELECT buffer_after_event_id AS id FROM arrangement_event
+        WHERE buffer_after_event_id IN (SELECT id FROM calendar_events)
+    )
+    SELECT {json_rows([name for name, _ in _CALENDAR_COLUMNS])} FROM (
+        SELECT
+        {columns}
+        FROM calendar_events AS ev
+        JOIN arrangement_arrangement AS arr ON arr.id = ev.arrangement_id
+        JOIN arrangement_location AS loc ON loc.id = arr.location_id
+        LEFT JOIN arrangement_person AS resp ON resp.id = ev.responsible_id
+        LEFT JOIN arrangement_arrangementtype AS arrtype ON arrtype.id = ev.arrangement_type_id
+        LEFT JOIN arrangement_audience AS audience ON audience.id = ev.audience_id
+        LEFT JOIN arrangement_statustype AS status ON status.id = ev.status_id
+        LEFT JOIN rooms ON rooms.event_id = ev.id
+        LEFT JOIN people ON people.event_id = ev.id
+        LEFT JOIN slugs ON slugs.event_id = ev.id
+        LEFT JOIN rigging ON rigging.id = ev.id
+    ) AS calendar
     """
-    if connection.vendor == "postgresql":
-        return f"""
-        SELECT audience.icon_class as audience_icon, arr.name as arrangement_name, audience.name as audience, audience.slug as audience_slug, (resp.first_name || ' ' || resp.last_name) as mainPlannerName,
-                                arr.id as arrangement_pk, ev.id as event_pk, arr.slug as slug, ev.title as name, ev.start as starts, arr.created as created_when, ev.association_type as association_type,
-                                ev.end as ends, loc.name as location, loc.slug as location_slug, arrtype.name as arrangement_type, arrtype.slug as arrangement_type_slug, evserie.id as evserie_id, status.name as status_name, status.color as status_color,
-                                status.slug as status_slug, ev.expected_visitors as expected_visitors,
-                                ev.buffer_after_event_id as after_buffer_ev_id, ev.buffer_before_event_id as before_buffer_ev_id,
-                                (SELECT EXISTS(SELECT id from arrangement_event WHERE buffer_before_event_id = ev.id OR buffer_after_event_id = ev.id)) AS is_rigging,
-                                array_agg( DISTINCT room.name) as room_names,
-                                array_agg( DISTINCT participants.first_name || ' ' || participants.last_name ) as people_names,
-                                (array_to_string(array_agg(DISTINCT room.slug ), ',') || ',' || array_to_string(array_agg(DISTINCT participants.slug), ',')) as slug_list
-                                from arrangement_arrangement as arr
-                                JOIN arrangement_event as ev on ev.arrangement_id = arr.id
-                                JOIN arrangement_location as loc on loc.id = arr.location_id
-                                LEFT JOIN arrangement_person as resp on resp.id = ev.responsible_id
-                                LEFT JOIN arrangement_arrangementtype as arrtype on arrtype.id = ev.arrangement_type_id
-                                LEFT JOIN arrangement_audience as audience on audience.id = ev.audience_id
-                                LEFT JOIN arrangement_statustype as status on status.id = ev.status_id
-                                LEFT JOIN arrangement_event_people as evp on evp.event_id = ev.id
-                                LEFT JOIN arrangement_person as participants on participants.id = evp.person_id
-                                LEFT JOIN arrangement_event_rooms as evr on evr.event_id = ev.id
-                                LEFT JOIN arrangement_room as room on room.id = evr.room_id
-                                LEFT JOIN arrangement_eventserie as evserie on evserie.id = ev.serie_id
-                                WHERE {where} AND ev.is_archived = false
-                                GROUP BY 
-                                    event_pk, audience.icon_class, audience.name, audience.slug,
-                                    resp.first_name, resp.last_name, arr.id, ev.id, arr.slug,
-                                    loc.name, loc.slug, arrtype.name, arrtype.slug, evserie.id,
-                                    status.name, status.color, status.slug, arr.expected_visitors
-                                """
-    elif connection.vendor == "sqlite":
-        return f"""
-                    SELECT audience.icon_class as audience_icon, arr.name as arrangement_name, audience.name as audience, audience.slug as audience_slug, resp.first_name || " " || resp.last_name as mainPlannerName,
-                            arr.id as arrangement_pk, ev.id as event_pk, arr.slug as slug, ev.title as name, ev.start as starts, arr.created as created_when, ev.association_type as association_type,
-                            ev.end as ends, loc.name as location, loc.slug as location_slug, arrtype.name as arrangement_type, arrtype.slug as arrangement_type_slug, evserie.id as evserie_id, status.name as status_name, status.color as status_color,
-                            ev.buffer_after_event_id as after_buffer_ev_id, ev.buffer_before_event_id as before_buffer_ev_id,
-                            (SELECT EXISTS(SELECT id from arrangement_event WHERE buffer_before_event_id = ev.id OR buffer_after_event_id = ev.id)) AS is_rigging,
-                            GROUP_CONCAT( DISTINCT room.name) as room_names, 
-                            GROUP_CONCAT( DISTINCT participants.first_name || " " || participants.last_name ) as people_names,
-                            GROUP_CONCAT(DISTINCT room.slug ) || "," || GROUP_CONCAT(DISTINCT participants.slug) as slug_list
-                            from arrangement_arrangement as arr 
-                            JOIN arrangement_arrangementtype as arrtype on arrtype.id = arr.arrangement_type_id
-                            JOIN arrangement_location as loc on loc.id = arr.location_id
-                            JOIN arrangement_person as resp on resp.id = arr.responsible_id
-                            JOIN arrangement_audience as audience on audience.id = arr.audience_id
-                            JOIN arrangement_event as ev on ev.arrangement_id = arr.id
-                            left join arrangement_statustype as status on status.id = ev.status_id
-                            LEFT JOIN arrangement_event_people as evp on evp.event_id = ev.id
-                            LEFT JOIN arrangement_person as participants on participants.id = evp.person_id
-                            LEFT JOIN arrangement_event_rooms as evr on evr.event_id = ev.id
-                            LEFT JOIN arrangement_room as room on room.id = evr.room_id
-                            LEFT JOIN arrangement_eventserie as evserie on evserie.id = ev.serie_id
-                            WHERE {where} AND ev.is_archived = 0
-                            GROUP BY event_pk
-                """
-
-
-def __parse_results(cursor) -> List[dict]:
-    """Parse results from query and return a list of dictionaries"""
-    results = []
-    columns = [column[0] for column in cursor.description]
-
-    for row in cursor.fetchall():
-        m = dict(zip(columns, row))
-
-        m["slug_list"] = m["slug_list"].split(",") if m["slug_list"] is not None else []
-        if connection.vendor == "sqlite":
-            m["room_names"] = (
-                m["room_names"].split(",") if m["room_names"] is not None else []
-            )
-            m["people_names"] = (
-                m["people_names"].split(",") if m["people_names"] is not None else []
-            )
-        results.append(m)
-
-    return results
+
+
+def calendar_json(
+    start: str,
+    end: str,
+    person_id: Optional[int] = None,
+    starting_in_period: bool = False,
+) -> str:
+    """
+    Get the events in the period between the given ISO formatted start and end, optionally only those the given
+    person takes part in, as a JSON array of calendar rows, as it is aggregated by the database. If
+    starting_in_period, the events that start in the period are gotten, rather than those within it.
+    """
+    # Adapted as the database stores them, such that they compare as datetimes on SQLite as well
+    params = [
+        connection.ops.adapt_datetimefield_value(parser.parse(value))
+        for value in (start, end)
+    ]
+    if person_id is not None:
+        params.append(person_id)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _compile_calendar_query(
+                connection.vendor, person_id is not None, starting_in_period
+            ),
+            params,
+        )
+        return cursor.fetchone()[0]
+
+
+def calendar_rows(
+    start: str,
+    end: str,
+    person_id: Optional[int] = None,
+    starting_in_period: bool = False,
+) -> List[dict]:
+    """
+    Get the events in the period between the given ISO formatted start and end, optionally only those the given
+    person takes part in, as calendar rows.
+    """
+    return json.loads(calendar_json(start, end, person_id, starting_in_period))
+
+
+def cached_calendar_json(start: str, end: str, person_id: Optional[int] = None) -> str:
+    """
+    Get the events in the period between the given ISO formatted start and end, optionally only those the given
+    person takes part in, as a JSON array of calendar rows, from the calendar cache where the weeks of the period are
+    cached (see webook.utils.calendar_cache).
+    """
+    signature = "all" if person_id is None else f"person:{person_id}"
+
+    return calendar_week_cache.rows_json(
+        parser.parse(start),
+        parser.parse(end),
+        signature,
+        lambda week_start, week_end: calendar_rows(
+            week_start.isoformat(),
+            week_end.isoformat(),
+            person_id,
+            starting_in_period=True,
+        ),
+    )
 
 
 def __parse_datetimes(start: str, end: str) -> Tuple[datetime]:
@@ -118,13 +246,30 @@ def __parse_datetimes(start: str, end: str) -> Tuple[datetime]:
 
 def get_arrangements_in_period(start: datetime, end: datetime) -> List[dict]:
     start, end = __parse_datetimes(start, end)
-    with connection.cursor() as cursor:
-        cursor.execute(
-            __arrangement_query_builder("ev.start > %s AND ev.end < %s"),
-            [start, end],
-        )
 
-        return __parse_results(cursor)
+    return json.loads(
+        cached_calendar_json(start, end)
+    ) + get_virtual_occurrences_in_period(parser.parse(start), parser.parse(end))
+
+
+def get_arrangements_in_period_json(start: str, end: str) -> str:
+    """
+    Get all arrangements in a period, including the occurrences of virtual series, as a JSON array. The rows of the
+    stored events are passed on as they are cached, with the rows of the virtual occurrences appended to them.
+    """
+    start, end = __parse_datetimes(start, end)
+
+    rows_json = cached_calendar_json(start, end)
+    virtual_rows = get_virtual_occurrences_in_period(
+        parser.parse(start), parser.parse(end)
+    )
+    if not virtual_rows:
+        return rows_json
+
+    virtual_json = json.dumps(virtual_rows, default=json_serial)
+    if rows_json == "[]":
+        return virtual_json
+    return rows_json[:-1] + "," + virtual_json[1:]
 
 
 def get_arrangements_in_period_for_person(
@@ -134,12 +279,9 @@ def get_arrangements_in_period_for_person(
     if start is None:
         return []
     start, end = __parse_datetimes(start, end)
-    with connection.cursor() as cursor:
-        cursor.execute(
-            __arrangement_query_builder(
-                "ev.start > %s AND ev.end < %s AND evp.person_id = %s"
-            ),
-            [start, end, person_id],
-        )
 
-        return __parse_results(cursor)
+    return json.loads(
+        cached_calendar_json(start, end, person_id)
+    ) + get_virtual_occurrences_in_period(
+        parser.parse(start), parser.parse(end), person_id=person_id
+    )
@@ -1,48 +1,62 @@
-from webook.arrangement.models import Arrangement, Event, CollisionAnalysisReport, CollisionAnalysisRecord
-from django.db.models import Q, Min, Max
+from webook.arrangement.dto.event import EventDTO
+from webook.arrangement.models import (
+    Arrangement,
+    CollisionAnalysisRecord,
+    CollisionAnalysisReport,
+    Event,
+)
+from webook.utils.collision_analysis import analyze_collisions
+
 
 def generate_collision_analysis_report(arrangement: Arrangement):
-    report = CollisionAnalysisReport()
-    report.generated_for = arrangement
-    report.save()
+    """
+    Generate a report of the collisions of the events of the given arrangement, on exclusive rooms and on people.
+    The events are analyzed in one pass, and the records of the report are created in bulk.
+    """
+    report = CollisionAnalysisReport.objects.create(generated_for=arrangement)
+
+    events = {
+        event_id: EventDTO(id=event_id, title=title, start=start, end=end)
+        for event_id, title, start, end in arrangement.event_set.values_list(
+            "id", "title", "start", "end"
+        )
+    }
+    if not events:
+        return report
 
-    arrangement_events = arrangement.event_set
-    
-    criterion_in_production_silo = Q(silo=Event.PRODUCTION_SILO)
-    criterion_in_requisitioning_silo = Q(silo=Event.REQUISITIONING_SILO)
-    #temporary
-    criterion_in_planning_silo = Q(silo=Event.PLANNING_SILO)
-    criterion_not_with_focused_arrangement = ~Q(arrangement=arrangement)
+    for event_id, room_id in Event.rooms.through.objects.filter(
+        event_id__in=list(events)
+    ).values_list("event_id", "room_id"):
+        events[event_id].rooms.append(room_id)
+    for event_id, person_id in Event.people.through.objects.filter(
+        event_id__in=list(events)
+    ).values_list("event_id", "person_id"):
+        events[event_id].people.append(person_id)
 
-    events_in_circumference = Event.objects.filter( criterion_in_production_silo | criterion_in_requisitioning_silo | criterion_in_planning_silo & criterion_not_with_focused_arrangement )
-    print (events_in_circumference)
+    records = analyze_collisions(list(events.values()), annotate_events=False)
 
-    for event in arrangement_events.all():
-        events_in_intersect = events_in_circumference.filter( Q(start__lt=event.start) & Q(end__gt=event.end) )
+    CollisionAnalysisRecord.objects.bulk_create(
+        [
+            CollisionAnalysisRecord(
+                report=report,
+                originator_event_id=record.event_a_id,
+                collided_with_event_id=record.event_b_id,
+                dimension=record.dimension,
+                conflicted_room_id=(
+                    record.contested_resource_id
+                    if record.dimension == CollisionAnalysisRecord.DIMENSION_ROOM
+                    else None
+                ),
+                conflicted_person_id=(
+                    record.contested_resource_id
+                    if record.dimension == CollisionAnalysisRecord.DIMENSION_PERSON
+                    else None
+                ),
+            )
+            for record in records
+            # Occurrences of virtual series are not stored, and have their serie positional hash as id
+            if isinstance(record.event_b_id, int)
+        ]
+    )
 
-        if events_in_intersect:
-            for room in event.rooms.all():
-                colliding_events_on_room = events_in_intersect.filter(rooms__in=[room.pk])
-                if (colliding_events_on_room is not None):
-                    for colliding_event in colliding_events_on_room:
-                        record = CollisionAnalysisRecord()
-                        record.report = report
-                        record.originator_event = event
-                        record.collided_with_event = colliding_event
-                        record.conflicted_room = room
-                        record.dimension = CollisionAnalysisRecord.DIMENSION_ROOM
-                        record.save()
-            
-            for person in event.people.all():
-                colliding_events_on_person = events_in_intersect.filter(people__in=[person.pk])
-                if (colliding_events_on_person is not None):
-                    for colliding_event in colliding_events_on_person:
-                        record = CollisionAnalysisRecord()
-                        record.report = report
-                        record.originator_event = event
-                        record.collided_with_event = colliding_event
-                        record.conflicted_person = person
-                        record.dimension = CollisionAnalysisRecord.DIMENSION_PERSON
-                        record.save()
-        
-    return report
\ No newline at end of file
+    return report
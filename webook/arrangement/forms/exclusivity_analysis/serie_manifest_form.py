@@ -2,6 +2,7 @@ from datetime import datetime
 
 from django import forms
 from django.conf import settings
+from django.db import transaction
 from django.http import JsonResponse
 from django.utils.timezone import make_aware
 from pytz import timezone
@@ -12,13 +13,19 @@ from webook.arrangement.models import (
     Audience,
     Event,
     EventSerie,
+    EventSerieExclusion,
     Person,
     PlanManifest,
     Room,
     StatusType,
 )
+from webook.arrangement.serie_materialization import (
+    materialize_serie,
+    update_materialized_serie,
+)
 from webook.onlinebooking.models import County, School
 from webook.screenshow.models import DisplayLayout
+from webook.utils.bulk_operation import bulk_operation
 from webook.utils.collision_analysis import analyze_collisions
 from webook.utils.serie_calculator import calculate_serie
 from webook.logger import logger
@@ -184,6 +191,8 @@ class SerieManifestForm(forms.Form):
 
 class CreateSerieForm(SerieManifestForm):
     arrangementPk = forms.IntegerField()
+    # Only applies to series without a stop date, see EventSerie.is_virtual
+    virtual = forms.BooleanField(required=False)
 
     def save(self, form, *args, **kwargs) -> JsonResponse:
         manifest: PlanManifest = form.as_plan_manifest()
@@ -191,135 +200,104 @@ class CreateSerieForm(SerieManifestForm):
         manifest.timezone = kwargs["user"].timezone
         manifest.save()
 
-        calculated_serie = calculate_serie(manifest)
-
-        for ev in calculated_serie:
-            ev.rooms = [int(room.id) for room in manifest.rooms.all()]
-
-        pk_of_preceding_event_serie = form.cleaned_data["predecessorSerie"]
-
-        _ = analyze_collisions(  # Will annotate the events in the calculated serie with collision information
-            calculated_serie, ignore_serie_pk=pk_of_preceding_event_serie
-        )
-
-        serie = EventSerie()
-        serie.arrangement = Arrangement.objects.get(
-            id=form.cleaned_data["arrangementPk"]
+        exclusions = kwargs.get("exclusions") or []
+        # Called with the stage (expanded, analyzed or written) and the amount of occurrences that have been through it
+        progress = kwargs.get("progress") or (lambda stage, count: None)
+        is_virtual = (
+            form.cleaned_data["virtual"]
+            and manifest.recurrence_strategy == "NoStopDate"
         )
-        serie.serie_plan_manifest = manifest
 
-        files_on_old_serie = EventSerie.objects.filter(
-            id=pk_of_preceding_event_serie
-        ).values_list("files", flat=True)
+        pk_of_preceding_event_serie = form.cleaned_data["predecessorSerie"]
 
-        serie.save()
+        calculated_serie = []
+        room_ids = [int(room.id) for room in manifest.rooms.all()]
+        if not is_virtual:
+            calculated_serie = calculate_serie(manifest, exclusions=exclusions)
 
-        if files_on_old_serie and files_on_old_serie[0]:
-            serie.files.set(files_on_old_serie)
-            serie.save()
+            for ev in calculated_serie:
+                ev.rooms = room_ids
 
-        logger.info(f"Created event serie with id {serie.id}")
+            progress("expanded", len(calculated_serie))
 
-        if pk_of_preceding_event_serie:
-            logger.info(
-                f"Archiving predecessor event serie with id {pk_of_preceding_event_serie}"
-            )
-            predecessor_event_serie = EventSerie.objects.get(
-                id=pk_of_preceding_event_serie
+            _ = analyze_collisions(  # Will annotate the events in the calculated serie with collision information
+                calculated_serie, ignore_serie_pk=pk_of_preceding_event_serie
             )
-
-            for event in predecessor_event_serie.events.all():
-                logger.info(f"Archiving event with id {event.id}")
-
-            predecessor_event_serie.archive(kwargs["user"].person)
-            logger.info(
-                f"Archived predecessor event serie with id {pk_of_preceding_event_serie}"
+            progress("analyzed", len(calculated_serie))
+
+        # The serie is written in one transaction, such that a failing job leaves nothing half created behind, and its
+        # side effects are batched until that transaction has been committed
+        with transaction.atomic(), bulk_operation():
+            serie = EventSerie()
+            serie.arrangement = Arrangement.objects.get(
+                id=form.cleaned_data["arrangementPk"]
             )
+            serie.serie_plan_manifest = manifest
+            serie.is_virtual = is_virtual
 
-        room_ids = [room.id for room in manifest.rooms.all()]
-        people_ids = [person.id for person in manifest.people.all()]
-        display_layout_ids = [
-            display_layout.id for display_layout in manifest.display_layouts.all()
-        ]
-
-        create_events = []
-
-        for ev in calculated_serie:
-            if ev.is_collision and manifest.collision_resolution_behaviour == 0:
-                continue
-
-            event = Event()
-
-            event.is_collision = ev.is_collision
-
-            event.arrangement = serie.arrangement
-            event.title = manifest.title
-            event.title_en = manifest.title_en
-            event.ticket_code = manifest.ticket_code
-            event.expected_visitors = manifest.expected_visitors
-            event.serie = serie
-            event.start = ev.start
-            event.end = ev.end
-
-            if manifest.is_school_related:
-                event.county = manifest.county
-                event.school = manifest.school
+            files_on_old_serie = EventSerie.objects.filter(
+                id=pk_of_preceding_event_serie
+            ).values_list("files", flat=True)
 
-            event.status = manifest.status
-            event.audience = manifest.audience
-            event.arrangement_type = manifest.arrangement_type
-            event.meeting_place = manifest.meeting_place
-            event.meeting_place_en = manifest.meeting_place_en
-            event.responsible = manifest.responsible
+            serie.save()
 
-            event.display_text = manifest.display_text
+            if files_on_old_serie and files_on_old_serie[0]:
+                serie.files.set(files_on_old_serie)
+                serie.save()
 
-            event.before_buffer_title = manifest.before_buffer_title
-            event.before_buffer_date_offset = manifest.before_buffer_date_offset
-            event.before_buffer_start = manifest.before_buffer_start
-            event.before_buffer_end = manifest.before_buffer_end
+            logger.info(f"Created event serie with id {serie.id}")
 
-            event.after_buffer_title = manifest.after_buffer_title
-            event.after_buffer_date_offset = manifest.after_buffer_date_offset
-            event.after_buffer_start = manifest.after_buffer_start
-            event.after_buffer_end = manifest.after_buffer_end
+            predecessor_event_serie = None
+            if pk_of_preceding_event_serie:
+                predecessor_event_serie = EventSerie.objects.get(
+                    id=pk_of_preceding_event_serie
+                )
 
-            event.save()
+            if (
+                predecessor_event_serie is not None
+                and not is_virtual
+                and not predecessor_event_serie.is_virtual
+            ):
+                # The events of the predecessor that the serie still has are kept and updated, instead of recreated
+                logger.info(
+                    f"Updating the events of predecessor event serie with id {pk_of_preceding_event_serie}"
+                )
+                created_events = update_materialized_serie(
+                    serie,
+                    predecessor_event_serie,
+                    manifest,
+                    calculated_serie,
+                    room_ids,
+                    person_archiving=kwargs["user"].person,
+                )
+            elif not is_virtual:
+                created_events = materialize_serie(
+                    serie, manifest, calculated_serie, room_ids
+                )
 
-            event.refresh_buffers()
+            if predecessor_event_serie is not None:
+                logger.info(
+                    f"Archiving predecessor event serie with id {pk_of_preceding_event_serie}"
+                )
 
-            create_events.append(event)
+                for event in predecessor_event_serie.events.all():
+                    logger.info(f"Archiving event with id {event.id}")
 
-        room_throughs = []
-        people_throughs = []
-        display_layout_throughs = []
+                predecessor_event_serie.archive(kwargs["user"].person)
+                logger.info(
+                    f"Archived predecessor event serie with id {pk_of_preceding_event_serie}"
+                )
 
-        event: Event
-        for event in create_events:
-            if not (
-                manifest.collision_resolution_behaviour
-                == PlanManifest.CollisionResolutionBehaviour.REMOVE_CONTESTED_RESOURCE
-                and event.is_collision
-            ):
-                room_throughs = room_throughs + [
-                    Event.rooms.through(event_id=event.id, room_id=room_id)
-                    for room_id in room_ids
-                    if room_ids
-                ]
-
-            people_throughs = people_throughs + [
-                Event.people.through(event_id=event.id, person_id=person_id)
-                for person_id in people_ids
-                if people_ids
-            ]
-            display_layout_throughs = display_layout_throughs + [
-                Event.display_layouts.through(
-                    event_id=event.id, displaylayout_id=display_layout_id
+            if is_virtual:
+                # Virtual series are not materialized; only their exclusions are stored
+                EventSerieExclusion.objects.bulk_create(
+                    [
+                        EventSerieExclusion(serie=serie, date=exclusion)
+                        for exclusion in set(exclusions)
+                    ]
                 )
-                for display_layout_id in display_layout_ids
-                if display_layout_ids
-            ]
+                return serie.id
+
+        progress("written", len(created_events))
 
-        Event.rooms.through.objects.bulk_create(room_throughs)
-        Event.people.through.objects.bulk_create(people_throughs)
-        Event.display_layouts.through.objects.bulk_create(display_layout_throughs)
+        return serie.id
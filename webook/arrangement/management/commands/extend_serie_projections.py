@@ -0,0 +1,21 @@
+"""extend_serie_projections.py
+This module contains the extend_serie_projections command. This command pushes the projection of all event series
+without a stop date forward, such that they are projected the configured amount of months ahead of the current date.
+"""
+
+from django.core.management.base import BaseCommand
+
+from webook.arrangement.tasks import extend_all_serie_projections
+
+
+class Command(BaseCommand):
+    help = "Extends the projection of all event series without a stop date"
+
+    def handle(self, *args, **options):
+        extend_all_serie_projections()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Serie projection tasks have been registered with Celery"
+            )
+        )
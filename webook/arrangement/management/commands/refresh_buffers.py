@@ -6,15 +6,17 @@ Useful when changes have been made to how buffers are created, and want to also
 from django.core.management.base import BaseCommand
 
 from webook.arrangement.models import Event
+from webook.utils.bulk_operation import bulk_operation
 
 
 class Command(BaseCommand):
     help = "Refreshes all buffers in the application"
 
+    @bulk_operation()
     def handle(self, *args, **options):
         all_events = Event.objects.all()
         for event in all_events:
             self.stdout.write(f"Refreshing buffer for event {event}")
             event.refresh_buffers()
 
-        self.stdout.write(self.style.SUCCESS("Successfully refreshed all buffers"))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS("Successfully refreshed all buffers"))
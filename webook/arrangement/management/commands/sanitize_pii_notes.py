@@ -6,6 +6,7 @@ import pytz
 from django.core.management.base import BaseCommand, CommandError, CommandParser
 
 from webook.arrangement.models import Arrangement, Event, Note
+from webook.utils.bulk_operation import bulk_operation
 
 
 class Command(BaseCommand):
@@ -14,6 +15,7 @@ class Command(BaseCommand):
     def add_arguments(self, parser: CommandParser) -> None:
         parser.add_argument("delete_after_n_days", type=int)
 
+    @bulk_operation()
     def handle(self, *args, **options):
         arrangements: List[Arrangement] = Arrangement.objects.all()
 
@@ -1,11 +1,13 @@
 from typing import List
 from django.core.management.base import BaseCommand
 from webook.arrangement.models import Arrangement, PlanManifest, Event
+from webook.utils.bulk_operation import bulk_operation
 
 
 class Command(BaseCommand):
     help = "Rinse 'undefined' from ticket code values"
 
+    @bulk_operation()
     def handle(self, *args, **options):
         arrangements: List[Arrangement] = Arrangement.objects.all()
         manifests: List[PlanManifest] = PlanManifest.objects.all()
@@ -39,6 +39,9 @@ class EventManager(ArchivedManager):
         if start >= end:
             raise ValueError("Start is equal to or greater than the end of the given range")
 
-        return self.filter(Q(start__lte = end) & Q(end__gte = start))
+        # Imported here as the periods module depends on the models, which depend on this module
+        from webook.arrangement.periods import filter_overlapping
+
+        return filter_overlapping(self.get_queryset(), start, end)
 
         
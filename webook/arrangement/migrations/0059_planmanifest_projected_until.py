@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('arrangement', '0058_alter_eventserie_serie_plan_manifest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planmanifest',
+            name='projected_until',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("arrangement", "0059_planmanifest_projected_until"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="eventserie",
+            name="is_virtual",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name="EventSerieExclusion",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name="modified"
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "serie",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="exclusions",
+                        to="arrangement.eventserie",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("serie", "date")},
+            },
+        ),
+    ]
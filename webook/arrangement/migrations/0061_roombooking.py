@@ -0,0 +1,127 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Overlap queries on the period of events and room bookings are served by GiST indexes on tstzrange, and the room
+# booking projection is maintained by triggers. Both are PostgreSQL only; other databases query Event.rooms instead.
+# Nothing keeps the end of an event from preceding its start (rigging from misconfigured buffer times does), which
+# tstzrange rejects; the periods are therefore indexed from the earliest to the latest of the two.
+POSTGRESQL_FORWARDS = """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+CREATE INDEX arrangement_event_period_gist
+    ON arrangement_event USING gist (tstzrange(least("start", "end"), greatest("start", "end"), '[]'));
+CREATE INDEX arrangement_roombooking_period_gist
+    ON arrangement_roombooking USING gist (room_id, tstzrange(least("start", "end"), greatest("start", "end"), '[]'));
+
+INSERT INTO arrangement_roombooking (event_id, room_id, "start", "end")
+    SELECT event.id, event_rooms.room_id, event."start", event."end"
+    FROM arrangement_event_rooms event_rooms
+    JOIN arrangement_event event ON event.id = event_rooms.event_id
+    WHERE NOT event.is_archived;
+
+CREATE FUNCTION arrangement_roombooking_sync_event_rooms() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM arrangement_roombooking WHERE event_id = OLD.event_id AND room_id = OLD.room_id;
+        RETURN OLD;
+    END IF;
+
+    INSERT INTO arrangement_roombooking (event_id, room_id, "start", "end")
+        SELECT id, NEW.room_id, "start", "end" FROM arrangement_event WHERE id = NEW.event_id AND NOT is_archived
+        ON CONFLICT (event_id, room_id) DO NOTHING;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER arrangement_roombooking_sync_event_rooms
+    AFTER INSERT OR DELETE ON arrangement_event_rooms
+    FOR EACH ROW EXECUTE FUNCTION arrangement_roombooking_sync_event_rooms();
+
+CREATE FUNCTION arrangement_roombooking_sync_event() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM arrangement_roombooking WHERE event_id = NEW.id;
+    IF NOT NEW.is_archived THEN
+        INSERT INTO arrangement_roombooking (event_id, room_id, "start", "end")
+            SELECT NEW.id, room_id, NEW."start", NEW."end" FROM arrangement_event_rooms WHERE event_id = NEW.id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER arrangement_roombooking_sync_event
+    AFTER UPDATE OF "start", "end", is_archived ON arrangement_event
+    FOR EACH ROW
+    WHEN (
+        OLD."start" IS DISTINCT FROM NEW."start"
+        OR OLD."end" IS DISTINCT FROM NEW."end"
+        OR OLD.is_archived IS DISTINCT FROM NEW.is_archived
+    )
+    EXECUTE FUNCTION arrangement_roombooking_sync_event();
+"""
+
+POSTGRESQL_BACKWARDS = """
+DROP TRIGGER IF EXISTS arrangement_roombooking_sync_event ON arrangement_event;
+DROP FUNCTION IF EXISTS arrangement_roombooking_sync_event();
+DROP TRIGGER IF EXISTS arrangement_roombooking_sync_event_rooms ON arrangement_event_rooms;
+DROP FUNCTION IF EXISTS arrangement_roombooking_sync_event_rooms();
+DROP INDEX IF EXISTS arrangement_roombooking_period_gist;
+DROP INDEX IF EXISTS arrangement_event_period_gist;
+"""
+
+
+def create_period_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(POSTGRESQL_FORWARDS)
+
+
+def drop_period_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(POSTGRESQL_BACKWARDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("arrangement", "0060_eventserie_is_virtual_eventserieexclusion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RoomBooking",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("start", models.DateTimeField()),
+                ("end", models.DateTimeField()),
+                (
+                    "event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="room_bookings",
+                        to="arrangement.event",
+                    ),
+                ),
+                (
+                    "room",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="bookings",
+                        to="arrangement.room",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("event", "room")},
+            },
+        ),
+        migrations.RunPython(create_period_indexes, drop_period_indexes),
+    ]
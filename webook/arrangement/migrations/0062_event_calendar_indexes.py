@@ -0,0 +1,31 @@
+# Generated by Django 4.2.10 on 2026-10-18 20:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("arrangement", "0061_roombooking"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                condition=models.Q(("is_archived", False)),
+                fields=["start", "end"],
+                name="event_active_period_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["arrangement", "start"], name="event_arrangement_start_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["serie", "start"], name="event_serie_start_idx"),
+        ),
+    ]
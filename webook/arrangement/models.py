@@ -27,8 +27,10 @@ from django_extensions.db.models import TimeStampedModel
 
 import webook.screenshow.models as screen_models
 from webook.arrangement.managers import ArchivedManager, EventManager
+from webook.utils.bulk_operation import bulk_operation, memoized
 from webook.utils.crudl_utils.model_mixins import ModelNamingMetaMixin
 from webook.utils.manifest_describe import describe_manifest
+from webook.utils.slug_allocation import BulkAutoSlugField
 
 
 class SelfNestedModelMixin(models.Model):
@@ -177,6 +179,33 @@ class CalendarEntitySchoolMixin(models.Model):
         abstract = True
 
 
+def _get_auditing_person() -> Optional[Person]:
+    """Get the person to audit writes as; the person of the current user, or of the service account of the request"""
+    request = get_current_request()
+    user = get_current_user()
+    if user and user.pk:  # User may be none if test is running
+        person = user.person
+
+        if person is None:
+            raise Exception("User has no person")
+
+        return person
+
+    if request is None or not request.service_account:
+        return None
+
+    if not request.service_account.person:
+        person = Person()
+        person.first_name = request.service_account.username
+        person.last_name = "(Service Account)"
+        person.personal_email = request.service_account.email
+        person.save()
+        request.service_account.person = person
+        request.service_account.save()
+
+    return request.service_account.person
+
+
 class ModelAuditableMixin(models.Model):
     created_by = models.ForeignKey(
         verbose_name=_("Created by"),
@@ -195,32 +224,13 @@ class ModelAuditableMixin(models.Model):
     )
 
     def save(self, *args, **kwargs):
-        request = get_current_request()
-        user = get_current_user()
-        if user and user.pk:  # User may be none if test is running
-            person = user.person
-
-            if person is None:
-                raise Exception("User has no person")
-
+        # Within a bulk operation the auditing person is looked up once, rather than once for each saved object
+        person = memoized("auditing_person", _get_auditing_person)
+        if person is not None:
             if self._state.adding:
                 self.created_by = person
             else:
                 self.updated_by = person
-        elif request.service_account:
-            if not request.service_account.person:
-                person = Person()
-                person.first_name = request.service_account.username
-                person.last_name = "(Service Account)"
-                person.personal_email = request.service_account.email
-                person.save()
-                request.service_account.person = person
-                request.service_account.save()
-
-            if self._state.adding:
-                self.created_by = request.service_account.person
-            else:
-                self.updated_by = request.service_account.person
 
         super().save(*args, **kwargs)
 
@@ -286,16 +296,21 @@ class ModelArchiveableMixin(models.Model):
     all_objects = models.Manager()
 
     def archive(self, person_archiving_this: Optional[Person] = None):
-        """Archive this object"""
+        """Archive this object, and its dependents (see get_archive_dependents)"""
+        from webook.arrangement.archive_cascade import archive_dependents
+
         self.is_archived = True
         self.archived_by = person_archiving_this
         self.archived_when = datetime.datetime.now()
 
-        on_archive = getattr(self, "on_archive", None)
-        if callable(on_archive):
-            on_archive(person_archiving_this)
+        # Archiving cascades to the dependents of this object, whose side effects are batched
+        with bulk_operation():
+            on_archive = getattr(self, "on_archive", None)
+            if callable(on_archive):
+                on_archive(person_archiving_this)
 
-        self.save()
+            archive_dependents(self, person_archiving_this, self.archived_when)
+            self.save()
 
     is_archived = models.BooleanField(verbose_name=_("Is archived"), default=False)
 
@@ -390,16 +405,15 @@ class Audience(
     name_en = models.CharField(
         verbose_name=_("Name(English)"), max_length=255, blank=False, null=True
     )
-    slug = AutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
+    slug = BulkAutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
 
     entity_name_singular = _("Audience")
     entity_name_plural = _("Audiences")
 
-    def archive(self, person_archiving_this: Person):
-        for child in self.nested_children.all():
-            child.archive(person_archiving_this)
-
-        return super().archive(person_archiving_this)
+    @classmethod
+    def get_archive_dependents(cls, ids):
+        """Get the dependents that are archived along with the objects with the given ids; their nested children"""
+        return [cls.objects.filter(parent_id__in=ids)]
 
     def get_absolute_url(self):
         return reverse("arrangement:audience_detail", kwargs={"slug": self.slug})
@@ -420,16 +434,15 @@ class ArrangementType(
     name_en = models.CharField(
         verbose_name=_("Name(English)"), max_length=255, blank=False, null=True
     )
-    slug = AutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
+    slug = BulkAutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
 
     entity_name_singular = _("Arrangement type")
     entity_name_plural = _("Arrangement types")
 
-    def archive(self, person_archiving_this: Person):
-        for child in self.nested_children.all():
-            child.archive(person_archiving_this)
-
-        return super().archive(person_archiving_this)
+    @classmethod
+    def get_archive_dependents(cls, ids):
+        """Get the dependents that are archived along with the objects with the given ids; their nested children"""
+        return [cls.objects.filter(parent_id__in=ids)]
 
     def get_absolute_url(self):
         return reverse(
@@ -452,7 +465,7 @@ class StatusType(
     entity_name_plural = _("Status types")
 
     name = models.CharField(verbose_name=_("Name"), max_length=255)
-    slug = AutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
+    slug = BulkAutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
 
     def as_node(self):
         return {
@@ -475,7 +488,7 @@ class RoomPreset(TimeStampedModel, ModelNamingMetaMixin, ModelArchiveableMixin):
     A room preset is a group, or collection, or set, of rooms.
     """
 
-    slug = AutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
+    slug = BulkAutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
     name = models.CharField(
         verbose_name=_("Name"), max_length=256, null=False, blank=False
     )
@@ -533,12 +546,10 @@ class Arrangement(
         verbose_name = _("Arrangement")
         verbose_name_plural = _("Arrangements")
 
-    def on_archive(self, person_archiving_this):
-        """Handle extra stuff when an arrangement is archived
-        We also need to archive events"""
-        events = self.event_set.all()
-        for event in events:
-            event.archive(person_archiving_this)
+    @classmethod
+    def get_archive_dependents(cls, ids):
+        """Get the dependents that are archived along with the arrangements with the given ids; their events"""
+        return [Event.objects.filter(arrangement_id__in=ids)]
 
     class ArrangementStates(Enum):
         PAST = 0
@@ -696,7 +707,7 @@ class Arrangement(
         blank=True,
     )
 
-    slug = AutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
+    slug = BulkAutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
 
     entity_name_singular = _("Arrangement")
     entity_name_plural = _("Arrangements")
@@ -736,13 +747,13 @@ class Location(TimeStampedModel, ModelNamingMetaMixin, ModelArchiveableMixin):
             ),
         }
 
-    def on_archive(self, person_archiving_this):
-        rooms = self.rooms.all()
-        for room in rooms:
-            room.archive(person_archiving_this)
+    @classmethod
+    def get_archive_dependents(cls, ids):
+        """Get the dependents that are archived along with the locations with the given ids; their rooms"""
+        return [Room.objects.filter(location_id__in=ids)]
 
     name = models.CharField(verbose_name=_("Name"), max_length=255)
-    slug = AutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
+    slug = BulkAutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
 
     entity_name_singular = _("Location")
     entity_name_plural = _("Locations")
@@ -799,7 +810,7 @@ class Room(TimeStampedModel, ModelNamingMetaMixin, ModelArchiveableMixin):
     )
 
     name = models.CharField(verbose_name=_("Name"), max_length=128)
-    slug = AutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
+    slug = BulkAutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
 
     entity_name_singular = _("Room")
     entity_name_plural = _("Rooms")
@@ -825,7 +836,7 @@ class Article(TimeStampedModel, ModelArchiveableMixin):
         verbose_name_plural = _("Articles")
 
     name = models.CharField(verbose_name=_("Name"), max_length=255)
-    slug = AutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
+    slug = BulkAutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
 
     def __str__(self):
         """Return article name"""
@@ -845,7 +856,7 @@ class OrganizationType(TimeStampedModel, ModelNamingMetaMixin, ModelArchiveableM
         verbose_name_plural = _("Organization Types")
 
     name = models.CharField(verbose_name=_("Name"), max_length=255)
-    slug = AutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
+    slug = BulkAutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
 
     entity_name_singular = _("Organization Type")
     entity_name_plural = _("Organization Types")
@@ -895,7 +906,7 @@ class ServiceType(TimeStampedModel, ModelNamingMetaMixin, ModelArchiveableMixin)
         verbose_name_plural = _("Service Types")
 
     name = models.CharField(verbose_name=_("Name"), max_length=255)
-    slug = AutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
+    slug = BulkAutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
 
     entity_name_singular = "Service Type"
     entity_name_plural = "Service Types"
@@ -1012,7 +1023,7 @@ class Calendar(TimeStampedModel, ModelArchiveableMixin):
     )
     room_resources = models.ManyToManyField(to="Room", verbose_name=_("Room Resources"))
 
-    slug = AutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
+    slug = BulkAutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
 
     def __str__(self):
         """Return calendar name"""
@@ -1185,7 +1196,7 @@ class Person(TimeStampedModel, ModelNamingMetaMixin, ModelArchiveableMixin):
     )
     notes = models.ManyToManyField(to=Note, verbose_name="Notes")
 
-    slug = AutoSlugField(
+    slug = BulkAutoSlugField(
         populate_from="full_name", unique=True, manager_name="all_objects"
     )
 
@@ -1271,7 +1282,7 @@ class Organization(TimeStampedModel, ModelNamingMetaMixin, ModelArchiveableMixin
         to=BusinessHour, verbose_name=_("Business Hours")
     )
 
-    slug = AutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
+    slug = BulkAutoSlugField(populate_from="name", unique=True, manager_name="all_objects")
 
     entity_name_plural = _("Organizations")
     entity_name_singular = _("Organization")
@@ -1368,6 +1379,19 @@ class Event(
     class Meta:
         verbose_name = _("Event")
         verbose_name_plural = _("Events")
+        # The calendar and collision queries filter non-archived events on their period, or on their arrangement or
+        # serie and period (see webook/tests/query_plan_tests.py)
+        indexes = [
+            models.Index(
+                fields=["start", "end"],
+                condition=models.Q(is_archived=False),
+                name="event_active_period_idx",
+            ),
+            models.Index(
+                fields=["arrangement", "start"], name="event_arrangement_start_idx"
+            ),
+            models.Index(fields=["serie", "start"], name="event_serie_start_idx"),
+        ]
 
     ARRANGEMENT_EVENT = "arrangement_event"
     COLLISION_EVENT = "collision_event"
@@ -1524,6 +1548,14 @@ class Event(
         to=ArrangementType, on_delete=models.RESTRICT, null=True, blank=True
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The start the event was loaded with; when it is moved, the calendar weeks it is moved from are invalidated
+        # as well (see webook.utils.calendar_cache)
+        instance._loaded_start = instance.__dict__.get("start")
+        return instance
+
     def hash_key(self) -> str:
         return str(
             (self.title + "-" + self.start.isoformat() + "-" + self.end.isoformat())
@@ -1551,75 +1583,35 @@ class Event(
             )
 
     def generate_rigging_events(self):
-        # TODO: Rewrite this to avoid duplication.
-        _title_generators_per_position = {
-            "before": lambda root_name: "Opprigging for " + root_name,
-            "after": lambda root_name: "Nedrigging for " + root_name,
-        }
-
-        time_pairs: List[Tuple[datetime.datetime, datetime.datetime, int]] = [
-            (
-                self.before_buffer_date,
-                self.before_buffer_start,
-                self.before_buffer_end,
-                self.before_buffer_date_offset,
-            ),
-            (
-                self.after_buffer_date,
-                self.after_buffer_start,
-                self.after_buffer_end,
-                self.after_buffer_date_offset,
-            ),
-        ]
-
-        current_tz = pytz.timezone(str(dj_timezone.get_current_timezone()))
+        from webook.utils.collision_analysis import (
+            explode_rigging_events,
+            rigging_title,
+        )
 
         rigging_events = {"root": self}
 
         root_event_rooms = self.rooms
         root_event_people = self.people
 
-        is_before = True
-        for date, start_time, end_time, date_offset in time_pairs:
-            if start_time is None or end_time is None:
-                # We need both start and end to generate a rigging event
-                # Without both present there is really no point.
-                is_before = False
-                continue
-
-            position_key = "before" if is_before else "after"
-            is_before = False
+        for position, intervals in explode_rigging_events([self.start], self).items():
+            ((start, end),) = intervals
 
             rigging_event = Event()
             rigging_event.arrangement_type = self.arrangement_type
-            rigging_event.title = _title_generators_per_position[position_key](
-                self.title
-            )
+            rigging_event.title = rigging_title(position, self, self.title)
             rigging_event.arrangement_id = self.arrangement.pk
-
-            offset: Optional[datetime.datetime] = None
-            if date_offset:
-                offset = datetime.datetime.now().replace(
-                    hour=start_time.hour, minute=start_time.minute
-                ) - datetime.timedelta(days=date_offset)
-
-            # We default in the worst case to the root events start. Do note that this is not rigging event start, but root event start.
-            # These are two distinct concepts.
-            rigging_event.start = current_tz.localize(
-                datetime.datetime.combine(date or offset or self.start, start_time)
-            )
-            rigging_event.end = current_tz.localize(
-                datetime.datetime.combine(date or offset or self.end, end_time)
-            )
+            rigging_event.start = start
+            rigging_event.end = end
 
             # We can not set rooms or people before the event has been saved -- unfortunately.
             rigging_event._rooms = root_event_rooms.values_list("id", flat=True)
             rigging_event._people = root_event_people.values_list("id", flat=True)
 
-            rigging_events[position_key] = rigging_event
+            rigging_events[position] = rigging_event
 
         return rigging_events
 
+    @bulk_operation()
     def refresh_buffers(self) -> Tuple[Optional[Event], Optional[Event]]:
         """Manage buffers from the event instance, returning them in a tuple form
 
@@ -1762,7 +1754,7 @@ class CollisionAnalysisRecord(TimeStampedModel):
         if self.dimension == self.DIMENSION_PERSON:
             return self.conflicted_person
         if self.dimension == self.DIMENSION_ROOM:
-            return self.conflicted_rooms
+            return self.conflicted_room
 
 
 class EventService(TimeStampedModel, ModelArchiveableMixin):
@@ -1906,6 +1898,9 @@ class PlanManifest(TimeStampedModel, BufferFieldsMixin, CalendarEntitySchoolMixi
     stop_within = models.DateField(blank=True, null=True)
     stop_after_x_occurences = models.IntegerField(blank=True, null=True)
     project_x_months_into_future = models.IntegerField(blank=True, null=True)
+    # For series without a stop date; the last date that events have been projected (materialized) until.
+    # If not set, the serie is projected until the end of its initial projection.
+    projected_until = models.DateField(blank=True, null=True)
 
     meeting_place = models.CharField(max_length=512, blank=True, null=True)
     meeting_place_en = models.CharField(max_length=512, blank=True, null=True)
@@ -2016,19 +2011,26 @@ class EventSerie(TimeStampedModel, ModelArchiveableMixin):
     serie_plan_manifest = models.ForeignKey(
         to=PlanManifest, on_delete=models.RESTRICT, related_name="event_series"
     )
+    # Virtual series are not materialized into events. Their occurrences are expanded from the plan manifest when
+    # calendars are queried, and only the exceptions (exclusions, and events degraded from the serie) are stored.
+    is_virtual = models.BooleanField(default=False)
 
     def hash_key(self) -> str:
         if self.serie_plan_manifest is None:
             return "undefined"
         return str(self.serie_plan_manifest.hash_key())
 
-    def on_archive(self, person_archiving_this):
-        for event in self.events.all():
-            if event.buffer_before_event is not None:
-                event.buffer_before_event.archive(person_archiving_this)
-            if event.buffer_after_event is not None:
-                event.buffer_after_event.archive(person_archiving_this)
-            event.archive(person_archiving_this)
+    @classmethod
+    def get_archive_dependents(cls, ids):
+        """Get the dependents that are archived along with the series with the given ids; their events and rigging"""
+        events = Event.objects.filter(serie_id__in=ids)
+        return [
+            events,
+            Event.objects.filter(
+                models.Q(id__in=events.values("buffer_before_event"))
+                | models.Q(id__in=events.values("buffer_after_event"))
+            ),
+        ]
 
 
 class BaseFileRelAbstractModel(TimeStampedModel):
@@ -2058,6 +2060,40 @@ class EventFile(BaseFileRelAbstractModel, ModelArchiveableMixin):
     )
 
 
+class EventSerieExclusion(TimeStampedModel):
+    """A date on which an event serie has no occurrence"""
+
+    serie = models.ForeignKey(
+        to=EventSerie, on_delete=models.CASCADE, related_name="exclusions"
+    )
+    date = models.DateField()
+
+    class Meta:
+        unique_together = ("serie", "date")
+
+
+class RoomBooking(models.Model):
+    """
+    A booking of a room by a (non-archived) event; a projection of Event.rooms, with the period of the event.
+
+    On PostgreSQL the projection is maintained by triggers on arrangement_event and arrangement_event_rooms, and
+    indexed with GiST on (room, period) for overlap queries. Other databases do not maintain it, and are queried
+    through Event.rooms instead. See webook.arrangement.periods.
+    """
+
+    event = models.ForeignKey(
+        to=Event, on_delete=models.CASCADE, related_name="room_bookings"
+    )
+    room = models.ForeignKey(
+        to=Room, on_delete=models.CASCADE, related_name="bookings"
+    )
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("event", "room")
+
+
 class EventSerieFile(BaseFileRelAbstractModel, ModelArchiveableMixin):
     associated_with = models.ForeignKey(
         to=EventSerie, on_delete=models.RESTRICT, related_name="files"
@@ -0,0 +1,104 @@
+"""periods.py
+
+Overlap queries on the periods of events and room bookings.
+
+On PostgreSQL the period of an event is indexed as tstzrange(least(start, end), greatest(start, end), '[]') with GiST
+(see migration 0061), such that events that end before they start can be indexed as well, and the bookings of rooms
+are projected into RoomBooking, indexed on (room, period). Overlap queries are then expressed as range overlaps (&&),
+such that they are answered from the indexes. On other databases -- SQLite in local development
+-- the same queries fall back to comparing start and end, and room bookings are read through Event.rooms.
+
+"""
+
+from datetime import datetime
+from typing import Iterable, Optional
+
+from django.db import connection
+from django.db.models import BooleanField, DateTimeField, F, Func, Value
+from django.db.models.query import QuerySet
+
+from webook.arrangement.models import Event, RoomBooking
+
+
+def uses_range_indexes() -> bool:
+    """Check if the database has the range indexes and the room booking projection"""
+    return connection.vendor == "postgresql"
+
+
+class PeriodsOverlap(Func):
+    """
+    Check if the period between the first two expressions overlaps the period between the last two, with both ends
+    inclusive. Compiles to tstzrange(least(a, b), greatest(a, b), '[]') && tstzrange(c, d, '[]'), which matches the GiST
+    period indexes. The period being compared against, between the last two expressions, is expected to be in order.
+    """
+
+    arity = 4
+    output_field = BooleanField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        compiled = [
+            compiler.compile(expression) for expression in self.get_source_expressions()
+        ]
+        # The first two expressions are compiled into both least() and greatest()
+        (a, a_params), (b, b_params), (c, c_params), (d, d_params) = compiled
+
+        return (
+            f"tstzrange(least({a}, {b}), greatest({a}, {b}), '[]') && tstzrange({c}, {d}, '[]')",
+            [*a_params, *b_params, *a_params, *b_params, *c_params, *d_params],
+        )
+
+
+def filter_overlapping(
+    queryset: QuerySet,
+    start: datetime,
+    end: datetime,
+    field_prefix: str = "",
+) -> QuerySet:
+    """
+    Filter the given queryset down to the rows whose period overlaps the period between start and end, both ends
+    inclusive. field_prefix is the path to the model that has the start and end fields, such as "event__".
+    """
+    if not uses_range_indexes():
+        return queryset.filter(
+            **{f"{field_prefix}start__lte": end, f"{field_prefix}end__gte": start}
+        )
+
+    return queryset.filter(
+        PeriodsOverlap(
+            F(f"{field_prefix}start"),
+            F(f"{field_prefix}end"),
+            Value(start, output_field=DateTimeField()),
+            Value(end, output_field=DateTimeField()),
+        )
+    )
+
+
+def room_bookings(
+    room_ids: Iterable[int],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> QuerySet:
+    """
+    Get the bookings of the given rooms by non-archived events, optionally only those overlapping the period between
+    start and end -- or only those ending at or after start, if no end is given -- as (room id, start, end, event id,
+    title, serie id) tuples.
+    """
+    room_ids = list(room_ids)
+
+    if uses_range_indexes():
+        bookings = RoomBooking.objects.filter(room_id__in=room_ids)
+        fields = ("room_id", "start", "end", "event_id", "event__title")
+        field_prefix = ""
+    else:
+        bookings = Event.rooms.through.objects.filter(
+            room_id__in=room_ids, event__is_archived=False
+        )
+        fields = ("room_id", "event__start", "event__end", "event_id", "event__title")
+        field_prefix = "event__"
+
+    if start is not None and end is not None:
+        bookings = filter_overlapping(bookings, start, end, field_prefix)
+    elif start is not None:
+        bookings = bookings.filter(**{f"{field_prefix}end__gte": start})
+
+    return bookings.values_list(*fields, "event__serie_id")
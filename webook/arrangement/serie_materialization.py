@@ -0,0 +1,527 @@
+"""serie_materialization.py
+
+Materialization of the calculated occurrences of an event serie into events, in bulk.
+
+The root events of the serie are created with one bulk_create, and their rigging events with another, after which
+the rigging events are wired to the root events they are rigging for with one bulk_update. The rooms, people and
+display layouts of the events are created in bulk as well. As bulk operations do not send the post_save and
+m2m_changed signals, one serie_created signal is sent for the serie as a whole once the transaction has been
+committed, in place of the signals of each event. Neither do they call save, so the audit fields that
+ModelAuditableMixin.save would fill in are filled in here.
+
+A serie that replaces a predecessor (as when a serie is edited) is materialized as an update of the events of the
+predecessor instead (see update_materialized_serie). Events the serie still has an occurrence for are kept, and are
+updated in place, such that what refers to them (Graph synchronization, service orders) is kept as well.
+
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone as dj_timezone
+
+from webook.arrangement.models import (
+    Event,
+    EventSerie,
+    PlanManifest,
+    Person,
+    _get_auditing_person,
+)
+from webook.arrangement.signals import objects_archived, serie_created
+from webook.utils.bulk_operation import memoized
+from webook.utils.collision_analysis import explode_rigging_events, rigging_title
+
+# The fields of an event of a serie that are filled from its manifest and occurrence (see _fill_event)
+_SERIE_EVENT_FIELDS = [
+    "arrangement",
+    "title",
+    "title_en",
+    "ticket_code",
+    "expected_visitors",
+    "serie",
+    "start",
+    "end",
+    "county",
+    "school",
+    "status",
+    "audience",
+    "arrangement_type",
+    "meeting_place",
+    "meeting_place_en",
+    "responsible",
+    "display_text",
+    "before_buffer_title",
+    "before_buffer_date_offset",
+    "before_buffer_start",
+    "before_buffer_end",
+    "after_buffer_title",
+    "after_buffer_date_offset",
+    "after_buffer_start",
+    "after_buffer_end",
+]
+# The fields of a rigging event that are filled from the event it is rigging for (see _fill_rigging_event)
+_RIGGING_EVENT_FIELDS = [
+    "title",
+    "arrangement",
+    "start",
+    "end",
+    "audience",
+    "arrangement_type",
+    "responsible",
+    "status",
+]
+# The fields save would fill in when updating an event; the person that updated it, and when
+_AUDIT_FIELDS = ["updated_by", "modified"]
+_RIGGING_ATTRS = {"before": "buffer_before_event", "after": "buffer_after_event"}
+
+
+def _auditing_person() -> Optional[Person]:
+    """Get the person to audit the written events as, as ModelAuditableMixin.save does"""
+    return memoized("auditing_person", _get_auditing_person)
+
+
+def _fill_event(
+    event: Event,
+    serie: EventSerie,
+    manifest: PlanManifest,
+    occurrence,
+    is_school_related: bool,
+) -> Event:
+    """Fill the given event as an event of the serie, from an occurrence calculated from its manifest"""
+    event.is_collision = occurrence.is_collision
+
+    event.arrangement = serie.arrangement
+    event.title = manifest.title
+    event.title_en = manifest.title_en
+    event.ticket_code = manifest.ticket_code
+    event.expected_visitors = manifest.expected_visitors
+    event.serie = serie
+    event.start = occurrence.start
+    event.end = occurrence.end
+
+    event.county = manifest.county if is_school_related else None
+    event.school = manifest.school if is_school_related else None
+
+    event.status = manifest.status
+    event.audience = manifest.audience
+    event.arrangement_type = manifest.arrangement_type
+    event.meeting_place = manifest.meeting_place
+    event.meeting_place_en = manifest.meeting_place_en
+    event.responsible = manifest.responsible
+
+    event.display_text = manifest.display_text
+
+    event.before_buffer_title = manifest.before_buffer_title
+    event.before_buffer_date_offset = manifest.before_buffer_date_offset
+    event.before_buffer_start = manifest.before_buffer_start
+    event.before_buffer_end = manifest.before_buffer_end
+
+    event.after_buffer_title = manifest.after_buffer_title
+    event.after_buffer_date_offset = manifest.after_buffer_date_offset
+    event.after_buffer_start = manifest.after_buffer_start
+    event.after_buffer_end = manifest.after_buffer_end
+
+    return event
+
+
+def _build_event(
+    serie: EventSerie,
+    manifest: PlanManifest,
+    occurrence,
+    is_school_related: bool,
+    created_by: Optional[Person],
+) -> Event:
+    """Build an (unsaved) event of the serie from an occurrence calculated from its manifest"""
+    return _fill_event(
+        Event(created_by=created_by), serie, manifest, occurrence, is_school_related
+    )
+
+
+def _fill_rigging_event(
+    rigging_event: Event,
+    position: str,
+    event: Event,
+    manifest: PlanManifest,
+    start: datetime,
+    end: datetime,
+) -> Event:
+    """Fill the given event as the rigging event at the given position, for an event of the serie of the manifest"""
+    rigging_event.title = rigging_title(position, manifest, event.title)
+    rigging_event.arrangement_id = event.arrangement_id
+    rigging_event.start = start
+    rigging_event.end = end
+    rigging_event.audience = event.audience
+    rigging_event.arrangement_type = event.arrangement_type
+    rigging_event.responsible = event.responsible
+    rigging_event.status = event.status
+
+    return rigging_event
+
+
+def _event_room_ids(
+    manifest: PlanManifest, event: Event, room_ids: List[int]
+) -> List[int]:
+    """Get the rooms an event of the serie is to have, after the collision resolution behaviour of the manifest"""
+    if (
+        manifest.collision_resolution_behaviour
+        == PlanManifest.CollisionResolutionBehaviour.REMOVE_CONTESTED_RESOURCE
+        and event.is_collision
+    ):
+        return []
+    return room_ids
+
+
+def _create_rigging_events(
+    events: List[Event],
+    manifest: PlanManifest,
+    room_ids: Dict[int, List[int]],
+    positions: Optional[Dict[int, List[str]]] = None,
+) -> List[Event]:
+    """
+    Create the rigging events of the given (created) root events of the serie of the given manifest, in bulk.
+    Equivalent to calling refresh_buffers on each of the events, without saving them one by one. room_ids holds the
+    rooms of each root event, by its id, which the rigging events are given. If positions is given, only the rigging
+    events at the positions it holds for each root event, by its id, are created.
+    """
+    rigging_events = []
+    created_by = _auditing_person()
+
+    exploded = explode_rigging_events([event.start for event in events], manifest)
+    for position, intervals in exploded.items():
+        for event, (start, end) in zip(events, intervals):
+            if positions is not None and position not in positions.get(event.id, []):
+                continue
+
+            rigging_event = _fill_rigging_event(
+                Event(created_by=created_by), position, event, manifest, start, end
+            )
+            rigging_event._rooms = room_ids.get(event.id, [])
+            rigging_event._root_event = event
+            rigging_event._position_attr = _RIGGING_ATTRS[position]
+            rigging_events.append(rigging_event)
+
+    if not rigging_events:
+        return []
+
+    Event.objects.bulk_create(rigging_events)
+
+    for rigging_event in rigging_events:
+        setattr(rigging_event._root_event, rigging_event._position_attr, rigging_event)
+
+    Event.objects.bulk_update(events, ["buffer_before_event", "buffer_after_event"])
+
+    return rigging_events
+
+
+def _set_relation(relation, targets: Dict[int, List[int]]) -> None:
+    """
+    Set the targets of the given many to many relation of events (such as Event.rooms) to the given target ids, by
+    event id, in bulk. Only the rows that differ are deleted and created.
+    """
+    through = relation.through
+    source_field = relation.field.m2m_field_name() + "_id"
+    target_field = relation.field.m2m_reverse_field_name() + "_id"
+
+    existing = {
+        (event_id, target_id): pk
+        for pk, event_id, target_id in through.objects.filter(
+            **{f"{source_field}__in": list(targets)}
+        ).values_list("pk", source_field, target_field)
+    }
+    wanted = {
+        (event_id, target_id)
+        for event_id, target_ids in targets.items()
+        for target_id in target_ids
+    }
+
+    stale = [pk for row, pk in existing.items() if row not in wanted]
+    if stale:
+        through.objects.filter(pk__in=stale).delete()
+
+    through.objects.bulk_create(
+        [
+            through(**{source_field: event_id, target_field: target_id})
+            for event_id, target_id in wanted - set(existing)
+        ]
+    )
+
+
+def _create_events(
+    serie: EventSerie,
+    manifest: PlanManifest,
+    occurrences: list,
+    room_ids: List[int],
+    people_ids: List[int],
+    display_layout_ids: List[int],
+) -> Tuple[List[Event], List[Event]]:
+    """Create the events of the serie from the given occurrences, returning the root events and rigging events"""
+    is_school_related = manifest.is_school_related
+    created_by = _auditing_person()
+    create_events = [
+        _build_event(serie, manifest, occurrence, is_school_related, created_by)
+        for occurrence in occurrences
+        if not (
+            occurrence.is_collision and manifest.collision_resolution_behaviour == 0
+        )
+    ]
+
+    Event.objects.bulk_create(create_events)
+
+    room_throughs = []
+    people_throughs = []
+    display_layout_throughs = []
+    event_room_ids_by_event = {}
+
+    for event in create_events:
+        event_room_ids = _event_room_ids(manifest, event, room_ids)
+        event_room_ids_by_event[event.id] = event_room_ids
+
+        room_throughs += [
+            Event.rooms.through(event_id=event.id, room_id=room_id)
+            for room_id in event_room_ids
+        ]
+        people_throughs += [
+            Event.people.through(event_id=event.id, person_id=person_id)
+            for person_id in people_ids
+        ]
+        display_layout_throughs += [
+            Event.display_layouts.through(
+                event_id=event.id, displaylayout_id=display_layout_id
+            )
+            for display_layout_id in display_layout_ids
+        ]
+
+    # Rigging times are localized in the current timezone, which should be that of the user that created the serie
+    with dj_timezone.override(manifest.timezone):
+        rigging_events = _create_rigging_events(
+            create_events, manifest, event_room_ids_by_event
+        )
+
+    # Rigging events are given the rooms of the event they are rigging for
+    room_throughs += [
+        Event.rooms.through(event_id=rigging_event.id, room_id=room_id)
+        for rigging_event in rigging_events
+        for room_id in rigging_event._rooms
+    ]
+
+    Event.rooms.through.objects.bulk_create(room_throughs)
+    Event.people.through.objects.bulk_create(people_throughs)
+    Event.display_layouts.through.objects.bulk_create(display_layout_throughs)
+
+    return create_events, rigging_events
+
+
+def materialize_serie(
+    serie: EventSerie,
+    manifest: PlanManifest,
+    occurrences: list,
+    room_ids: Optional[List[int]] = None,
+) -> List[Event]:
+    """
+    Create the events of the given serie from occurrences calculated from its manifest, with their rigging events,
+    rooms, people and display layouts. The occurrences must have been analyzed for collisions, such that the collision
+    resolution behaviour of the manifest can be applied. Returns the created root events.
+    """
+    if room_ids is None:
+        room_ids = list(manifest.rooms.values_list("id", flat=True))
+
+    create_events, rigging_events = _create_events(
+        serie,
+        manifest,
+        occurrences,
+        room_ids,
+        list(manifest.people.values_list("id", flat=True)),
+        list(manifest.display_layouts.values_list("id", flat=True)),
+    )
+
+    event_ids = [event.id for event in create_events + rigging_events]
+    transaction.on_commit(
+        lambda: serie_created.send(
+            sender=EventSerie, serie=serie, event_ids=event_ids, room_ids=room_ids
+        )
+    )
+
+    return create_events
+
+
+def update_materialized_serie(
+    serie: EventSerie,
+    predecessor: EventSerie,
+    manifest: PlanManifest,
+    occurrences: list,
+    room_ids: Optional[List[int]] = None,
+    person_archiving: Optional[Person] = None,
+) -> List[Event]:
+    """
+    Materialize the given serie as an update of its predecessor, keeping the events of the predecessor that the serie
+    still has an occurrence for. Occurrences are matched with the events of the predecessor by the date they start on.
+
+    Matched events are moved to the serie and updated in place, in bulk, along with their rigging events, rooms,
+    people and display layouts; only what differs is written. Occurrences without a matching event are created as in
+    materialize_serie, and events without a matching occurrence are archived with their rigging events. The
+    occurrences must have been analyzed for collisions, ignoring the predecessor. Returns the kept and created root
+    events.
+    """
+    if room_ids is None:
+        room_ids = list(manifest.rooms.values_list("id", flat=True))
+    people_ids = list(manifest.people.values_list("id", flat=True))
+    display_layout_ids = list(manifest.display_layouts.values_list("id", flat=True))
+
+    tz = manifest.tz
+    predecessor_events = defaultdict(list)
+    for event in (
+        Event.objects.filter(serie=predecessor)
+        .select_related("buffer_before_event", "buffer_after_event")
+        .order_by("start")
+    ):
+        predecessor_events[event.start.astimezone(tz).date()].append(event)
+
+    # The rooms the predecessor has booked, which are to be reloaded by the room occupancy index
+    predecessor_room_ids = set(
+        Event.rooms.through.objects.filter(
+            event_id__in=[
+                event_id
+                for events in predecessor_events.values()
+                for event in events
+                for event_id in (
+                    event.id,
+                    event.buffer_before_event_id,
+                    event.buffer_after_event_id,
+                )
+                if event_id is not None
+            ]
+        ).values_list("room_id", flat=True)
+    )
+
+    is_school_related = manifest.is_school_related
+    kept_events = []
+    added_occurrences = []
+    for occurrence in occurrences:
+        if occurrence.is_collision and manifest.collision_resolution_behaviour == 0:
+            continue
+
+        matches = predecessor_events.get(occurrence.start.astimezone(tz).date())
+        if matches:
+            kept_events.append(
+                _fill_event(
+                    matches.pop(0), serie, manifest, occurrence, is_school_related
+                )
+            )
+        else:
+            added_occurrences.append(occurrence)
+
+    removed_events = [
+        event for events in predecessor_events.values() for event in events
+    ]
+    archived_events = removed_events + [
+        getattr(event, attr)
+        for event in removed_events
+        for attr in _RIGGING_ATTRS.values()
+        if getattr(event, attr) is not None
+    ]
+
+    # Rigging events of kept events are updated in place; missing ones are created, and unconfigured ones archived
+    with dj_timezone.override(manifest.timezone):
+        exploded = explode_rigging_events(
+            [event.start for event in kept_events], manifest
+        )
+
+    updated_rigging_events = []
+    missing_positions = defaultdict(list)
+    for position, attr in _RIGGING_ATTRS.items():
+        for index, event in enumerate(kept_events):
+            rigging_event = getattr(event, attr)
+            if position not in exploded:
+                if rigging_event is not None:
+                    archived_events.append(rigging_event)
+                    setattr(event, attr, None)
+                continue
+
+            if rigging_event is None:
+                missing_positions[event.id].append(position)
+                continue
+
+            start, end = exploded[position][index]
+            updated_rigging_events.append(
+                _fill_rigging_event(
+                    rigging_event, position, event, manifest, start, end
+                )
+            )
+
+    # bulk_update skips save, which would otherwise have audited the events and touched their modified timestamps
+    updated_by, modified = _auditing_person(), dj_timezone.now()
+    for event in kept_events + updated_rigging_events:
+        event.updated_by = updated_by
+        event.modified = modified
+
+    Event.objects.bulk_update(
+        kept_events,
+        _SERIE_EVENT_FIELDS
+        + ["buffer_before_event", "buffer_after_event"]
+        + _AUDIT_FIELDS,
+    )
+    Event.objects.bulk_update(
+        updated_rigging_events, _RIGGING_EVENT_FIELDS + _AUDIT_FIELDS
+    )
+
+    Event.objects.filter(pk__in=[event.pk for event in archived_events]).update(
+        is_archived=True,
+        archived_by=person_archiving,
+        archived_when=datetime.now(),
+    )
+    if archived_events:
+        archived = {Event: [event.pk for event in archived_events]}
+        transaction.on_commit(
+            lambda: objects_archived.send(sender=EventSerie, archived=archived)
+        )
+
+    event_room_ids = {
+        event.id: _event_room_ids(manifest, event, room_ids) for event in kept_events
+    }
+    with dj_timezone.override(manifest.timezone):
+        _create_rigging_events(
+            kept_events, manifest, event_room_ids, positions=missing_positions
+        )
+
+    rigging_room_ids = {
+        rigging_event.id: event_room_ids[event.id]
+        for event in kept_events
+        for rigging_event in (event.buffer_before_event, event.buffer_after_event)
+        if rigging_event is not None
+    }
+    _set_relation(Event.rooms, {**event_room_ids, **rigging_room_ids})
+    _set_relation(Event.people, {event.id: people_ids for event in kept_events})
+    _set_relation(
+        Event.display_layouts,
+        {event.id: display_layout_ids for event in kept_events},
+    )
+
+    created_events, created_rigging_events = _create_events(
+        serie,
+        manifest,
+        added_occurrences,
+        room_ids,
+        people_ids,
+        display_layout_ids,
+    )
+
+    event_ids = [
+        event.id for event in kept_events + created_events + created_rigging_events
+    ] + [
+        rigging_event.id
+        for event in kept_events
+        for rigging_event in (event.buffer_before_event, event.buffer_after_event)
+        if rigging_event is not None
+    ]
+    transaction.on_commit(
+        lambda: serie_created.send(
+            sender=EventSerie,
+            serie=serie,
+            event_ids=event_ids,
+            room_ids=list(set(room_ids) | predecessor_room_ids),
+        )
+    )
+
+    return kept_events + created_events
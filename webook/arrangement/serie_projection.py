@@ -0,0 +1,156 @@
+"""serie_projection.py
+
+Rolling projection of event series that have no stop date.
+
+When a serie without a stop date is created, it is projected (materialized into events) a set amount of months
+into the future. As time passes the projection has to be pushed forward, such that there always are events for the
+coming months. This is done by periodically extending each serie by the months that have been uncovered since it was
+last extended -- and only those months; existing events are never recalculated, re-analyzed or re-saved.
+
+Extension is idempotent. Events of the serie that already exist in the newly uncovered window are recognized by their
+serie positional hash, and are not created again.
+
+"""
+
+import calendar
+import copy
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.utils import timezone as dj_timezone
+from pytz import timezone
+
+from webook.arrangement.models import Event, EventSerie, PlanManifest
+from webook.arrangement.serie_materialization import materialize_serie
+from webook.utils.collision_analysis import analyze_collisions
+from webook.utils.serie_calculator import iter_serie
+from webook.utils.sph_gen import get_serie_positional_hash
+
+# The timezone series are calculated in; must be the same as the serie was created with (see CreateSerieForm)
+SERIE_TZ = timezone("Europe/Oslo")
+
+
+def _end_of_month(value: date) -> date:
+    return value.replace(day=calendar.monthrange(value.year, value.month)[1])
+
+
+def _months_into_future(serie_manifest: PlanManifest) -> int:
+    return max(serie_manifest.project_x_months_into_future or 1, 1)
+
+
+def projected_until(serie_manifest: PlanManifest) -> date:
+    """Get the last date that the given serie manifest has been projected until"""
+    if serie_manifest.projected_until is not None:
+        return serie_manifest.projected_until
+
+    # Mirrors the initial projection of the no stop date area strategy in serie_calculator
+    return _end_of_month(
+        serie_manifest.start_date
+        + relativedelta(months=_months_into_future(serie_manifest) - 1)
+    )
+
+
+def projection_horizon(serie_manifest: PlanManifest, today: date) -> date:
+    """Get the last date that the given serie manifest should be projected until, as of today"""
+    return _end_of_month(
+        max(serie_manifest.start_date, today)
+        + relativedelta(months=_months_into_future(serie_manifest) - 1)
+    )
+
+
+def serie_positional_hash(
+    serie_manifest: PlanManifest, title: str, start: datetime, end: datetime
+) -> str:
+    """Get the serie positional hash of an event of the serie with the given manifest"""
+    return get_serie_positional_hash(
+        serie_manifest.internal_uuid,
+        title,
+        start.astimezone(SERIE_TZ),
+        end.astimezone(SERIE_TZ),
+    )
+
+
+def manifest_stopping_within(
+    serie_manifest: PlanManifest, stop_within: date
+) -> PlanManifest:
+    """Get an (unsaved) copy of the given manifest that stops within the given date, instead of its own stop"""
+    window_manifest = copy.copy(serie_manifest)
+    window_manifest.recurrence_strategy = "StopWithin"
+    window_manifest.stop_within = stop_within
+
+    return window_manifest
+
+
+def extend_serie_projection(
+    serie: EventSerie, today: Optional[date] = None
+) -> List[Event]:
+    """
+    Extend the projection of the given serie (which must be a serie without a stop date) up until its projection
+    horizon as of today. Returns the created events -- if the serie is already projected until its horizon, nothing
+    is created.
+    """
+    manifest: PlanManifest = serie.serie_plan_manifest
+
+    if manifest.recurrence_strategy != "NoStopDate":
+        raise ValueError(f"Serie with id {serie.pk} has a stop date")
+    if serie.is_virtual:
+        # Virtual series are expanded when queried, and never materialized
+        return []
+
+    today = today or dj_timezone.localdate()
+    covered_until = projected_until(manifest)
+    horizon = projection_horizon(manifest, today)
+
+    if horizon <= covered_until:
+        return []
+
+    # Calculate the serie as if it stopped at the horizon, but only for the window that has not been covered yet
+    window_manifest = manifest_stopping_within(manifest, horizon)
+
+    window_start = covered_until + timedelta(days=1)
+    occurrences = [
+        occurrence
+        for occurrence in iter_serie(
+            window_manifest,
+            window_start,
+            horizon + timedelta(days=1),
+            tz=SERIE_TZ,
+        )
+        if occurrence.start.astimezone(SERIE_TZ).date() > covered_until
+    ]
+
+    with transaction.atomic():
+        existing_hashes = {
+            serie_positional_hash(manifest, title, start, end)
+            for title, start, end in Event.all_objects.filter(
+                serie=serie,
+                start__gte=SERIE_TZ.localize(
+                    datetime.combine(window_start, datetime.min.time())
+                ),
+            ).values_list("title", "start", "end")
+        }
+        occurrences = [
+            occurrence
+            for occurrence in occurrences
+            if serie_positional_hash(
+                manifest, manifest.title, occurrence.start, occurrence.end
+            )
+            not in existing_hashes
+        ]
+
+        room_ids = list(manifest.rooms.values_list("id", flat=True))
+
+        for occurrence in occurrences:
+            occurrence.rooms = room_ids
+
+        # Only the new slice of the serie is analyzed; the existing events have been analyzed when created
+        _ = analyze_collisions(occurrences, ignore_serie_pk=serie.pk)
+
+        create_events = materialize_serie(serie, manifest, occurrences, room_ids)
+
+        PlanManifest.objects.filter(pk=manifest.pk).update(projected_until=horizon)
+        manifest.projected_until = horizon
+
+    return create_events
@@ -1,8 +1,24 @@
-from django.db.models.signals import post_save, pre_delete
-from django.dispatch import receiver
+from datetime import timedelta
 
-from webook.arrangement.models import Room, RoomPreset
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from webook.arrangement.models import Arrangement, Event, EventSerie, Room, RoomPreset
 from webook.screenshow.models import ScreenResource, ScreenGroup
+from webook.utils.bulk_operation import current_bulk_operation, defer
+from webook.utils.calendar_cache import calendar_week_cache
+from webook.utils.collision_analysis import bump_person_versions
+from webook.utils.room_occupancy import room_occupancy_index
+
+# Sent once the events of a serie have been created in bulk (see serie_materialization), in place of the post_save
+# and m2m_changed signals of each of its events. Provides serie, event_ids (root and rigging events) and room_ids.
+serie_created = Signal()
+
+# Sent once the dependents of an archived object have been archived in bulk (see archive_cascade), in place of the
+# post_save signals of each of them. Provides archived, the ids of the archived dependents per model.
+objects_archived = Signal()
 
 
 @receiver(post_save, sender=Room)
@@ -12,12 +28,22 @@ def on_room_handler(sender, instance, created, **kwargs):
 
     if created and instance.has_screen:
         """If room newly created and has screen then it is inserted as screen resource"""
-        ScreenResource.objects.create(screen_model=screen_name, room_id=instance.id, generated_name=generated_name,  status=ScreenResource.ScreenStatus.AVAILABLE)
+        ScreenResource.objects.create(
+            screen_model=screen_name,
+            room_id=instance.id,
+            generated_name=generated_name,
+            status=ScreenResource.ScreenStatus.AVAILABLE,
+        )
     elif not created and instance.has_screen:
         """If room updated and has screen then it is inserted only if has_screen changed to true"""
         screen = ScreenResource.objects.filter(room__pk=instance.id)
         if not screen:
-            ScreenResource.objects.create(screen_model=screen_name, room_id=instance.id, generated_name=generated_name,  status=ScreenResource.ScreenStatus.AVAILABLE)
+            ScreenResource.objects.create(
+                screen_model=screen_name,
+                room_id=instance.id,
+                generated_name=generated_name,
+                status=ScreenResource.ScreenStatus.AVAILABLE,
+            )
     elif not created and not instance.has_screen:
         """logic for deleting room from screen resource"""
         screen = ScreenResource.objects.filter(room__pk=instance.id)
@@ -39,6 +65,230 @@ def on_room_preset_delete(sender, instance, **kwargs):
         screen.delete()
 
 
+@receiver(post_save, sender=Event)
+def on_event_saved(sender, instance, created, **kwargs):
+    """
+    Keep the room occupancy index up to date with the times of the event. The rooms of a new event are set after it
+    has been created.
+    """
+    if created:
+        return
+    transaction.on_commit(
+        lambda: room_occupancy_index.event_changed(
+            instance, instance.rooms.values_list("id", flat=True)
+        )
+    )
+
+
+@receiver(pre_delete, sender=Event)
+def on_event_delete(sender, instance, **kwargs):
+    room_ids = list(instance.rooms.values_list("id", flat=True))
+    transaction.on_commit(
+        lambda: room_occupancy_index.event_removed(instance.pk, room_ids)
+    )
+
+
+@receiver(m2m_changed, sender=Event.rooms.through)
+def on_event_rooms_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep the room occupancy index up to date with the rooms of events"""
+    if reverse:
+        # The events of a room have been changed
+        if action in ("post_add", "post_remove", "post_clear"):
+            transaction.on_commit(lambda: room_occupancy_index.invalidate([instance.pk]))
+    elif action == "pre_clear":
+        room_ids = list(instance.rooms.values_list("id", flat=True))
+        transaction.on_commit(
+            lambda: room_occupancy_index.event_removed(instance.pk, room_ids)
+        )
+    elif action == "post_add":
+        transaction.on_commit(
+            lambda: room_occupancy_index.event_changed(instance, pk_set)
+        )
+    elif action == "post_remove":
+        transaction.on_commit(
+            lambda: room_occupancy_index.event_removed(instance.pk, pk_set)
+        )
+
+
+def _people_of_events(event_ids):
+    return set(Event.people.through.objects.filter(event_id__in=event_ids).values_list("person_id", flat=True))
+
+
+def _bump_versions_of_people_of_events(event_ids):
+    bump_person_versions(_people_of_events(event_ids))
+
+
+def _people_of_events_changed(event_ids):
+    """
+    Bump the versions of the bookings of the people of the given events, once the transaction or bulk operation has
+    ended. The versions are only of use where they are shared between processes (see collision_analysis).
+    """
+    if not settings.USE_REDIS:
+        return
+    if current_bulk_operation() is not None:
+        for event_id in event_ids:
+            defer(_bump_versions_of_people_of_events, event_id)
+        return
+    transaction.on_commit(lambda: _bump_versions_of_people_of_events(event_ids))
+
+
+def _people_changed(person_ids):
+    if settings.USE_REDIS:
+        transaction.on_commit(lambda: bump_person_versions(person_ids))
+
+
+@receiver(post_save, sender=Event)
+def on_event_saved_bump_people(sender, instance, created, **kwargs):
+    """The people of a new event are set after it has been created"""
+    if not created:
+        _people_of_events_changed([instance.pk])
+
+
+@receiver(pre_delete, sender=Event)
+def on_event_delete_bump_people(sender, instance, **kwargs):
+    if settings.USE_REDIS:
+        _people_changed(_people_of_events([instance.pk]))
+
+
+@receiver(m2m_changed, sender=Event.people.through)
+def on_event_people_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep the versions of the bookings of people up to date with the people of events"""
+    if reverse:
+        # The events of a person have been changed
+        if action in ("post_add", "post_remove", "post_clear"):
+            _people_changed([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        _people_changed(pk_set)
+    elif action == "pre_clear" and settings.USE_REDIS:
+        _people_changed(_people_of_events([instance.pk]))
+
+
+def _invalidate_rooms_of_virtual_series(serie_ids):
+    """The occurrences of virtual series are expanded along with the rooms they book (see room_occupancy)"""
+    room_occupancy_index.invalidate(
+        set(
+            EventSerie.all_objects.filter(pk__in=serie_ids, is_virtual=True).values_list(
+                "serie_plan_manifest__rooms", flat=True
+            )
+        )
+        - {None}
+    )
+
+
+@receiver(post_save, sender=EventSerie)
+def on_event_serie_saved(sender, instance, **kwargs):
+    """Virtual series book the rooms of their manifest, from when they are created until they are archived"""
+    if not instance.is_virtual:
+        return
+    if not defer(_invalidate_rooms_of_virtual_series, instance.pk):
+        transaction.on_commit(lambda: _invalidate_rooms_of_virtual_series([instance.pk]))
+
+
+@receiver(post_save, sender=Event)
+def on_event_of_serie_saved(sender, instance, **kwargs):
+    """Events of a virtual serie, or degraded from it, replace the occurrence of the serie on their date"""
+    for serie_id in {instance.serie_id, instance.associated_serie_id} - {None}:
+        if not defer(_invalidate_rooms_of_virtual_series, serie_id):
+            transaction.on_commit(lambda serie_id=serie_id: _invalidate_rooms_of_virtual_series([serie_id]))
+
+
+@receiver(serie_created)
+def on_serie_created(sender, serie, event_ids, room_ids, **kwargs):
+    """The room bookings of the serie have been created in bulk, without the signals that keep the index up to date"""
+    room_occupancy_index.invalidate(room_ids)
+    if settings.USE_REDIS:
+        _bump_versions_of_people_of_events(event_ids)
+
+    # The events of an updated serie keep the local date they start on, which may be the day before or after in the
+    # timezone of the calendar weeks; the neighbouring weeks of those days are invalidated as well
+    starts = _starts_of_events(event_ids)
+    _invalidate_calendar_weeks(
+        [start + timedelta(days=offset) for start in starts for offset in (-1, 0, 1)]
+    )
+
+
+@receiver(objects_archived)
+def on_objects_archived(sender, archived, **kwargs):
+    """The archived events no longer book their rooms, and archived rooms are no longer booked"""
+    room_ids = set(archived.get(Room, []))
+    if Event in archived:
+        room_ids |= set(
+            Event.rooms.through.objects.filter(event_id__in=archived[Event]).values_list("room_id", flat=True)
+        )
+    if room_ids:
+        room_occupancy_index.invalidate(room_ids)
+    if Event in archived and settings.USE_REDIS:
+        _bump_versions_of_people_of_events(archived[Event])
+
+    event_ids = set(archived.get(Event, []))
+    if Arrangement in archived:
+        event_ids |= set(
+            Event.all_objects.filter(arrangement_id__in=archived[Arrangement]).values_list("id", flat=True)
+        )
+    if event_ids:
+        _invalidate_calendar_weeks(_starts_of_events(event_ids))
+
+
+def _starts_of_events(event_ids):
+    return list(Event.all_objects.filter(pk__in=event_ids).values_list("start", flat=True))
+
+
+def _invalidate_calendar_weeks(moments):
+    """Invalidate the calendar weeks the given moments fall in, once the transaction or bulk operation has ended"""
+    weeks = calendar_week_cache.weeks_of(moments)
+    if current_bulk_operation() is not None:
+        for week in weeks:
+            defer(calendar_week_cache.invalidate_weeks, week)
+        return
+
+    transaction.on_commit(lambda: calendar_week_cache.invalidate_weeks(weeks))
+
+
+@receiver(post_save, sender=Event)
+def on_event_saved_invalidate_calendar(sender, instance, **kwargs):
+    """Invalidate the calendar weeks the event starts in, and started in when it was loaded"""
+    _invalidate_calendar_weeks([instance.start, getattr(instance, "_loaded_start", None)])
+    instance._loaded_start = instance.start
+
+
+@receiver(pre_delete, sender=Event)
+def on_event_delete_invalidate_calendar(sender, instance, **kwargs):
+    _invalidate_calendar_weeks([instance.start])
+
+
+@receiver(m2m_changed, sender=Event.rooms.through)
+@receiver(m2m_changed, sender=Event.people.through)
+def on_event_resources_changed_invalidate_calendar(sender, instance, action, reverse, pk_set, **kwargs):
+    """The rooms and people of events are part of their calendar rows"""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            _invalidate_calendar_weeks([instance.start])
+    elif action in ("post_add", "post_remove"):
+        # The events of a room or person have been changed
+        _invalidate_calendar_weeks(_starts_of_events(pk_set))
+    elif action == "pre_clear":
+        event_ids = sender.objects.filter(**{f"{instance._meta.model_name}_id": instance.pk}).values_list(
+            "event_id", flat=True
+        )
+        _invalidate_calendar_weeks(_starts_of_events(list(event_ids)))
+
+
+def _invalidate_calendar_weeks_of_arrangements(arrangement_ids):
+    calendar_week_cache.invalidate_weeks(
+        calendar_week_cache.weeks_of(
+            Event.all_objects.filter(arrangement_id__in=arrangement_ids).values_list("start", flat=True)
+        )
+    )
+
+
+@receiver(post_save, sender=Arrangement)
+def on_arrangement_saved_invalidate_calendar(sender, instance, created, **kwargs):
+    """The name and location of arrangements are part of the calendar rows of their events"""
+    if created or defer(_invalidate_calendar_weeks_of_arrangements, instance.pk):
+        return
+    transaction.on_commit(lambda: _invalidate_calendar_weeks_of_arrangements([instance.pk]))
+
+
 def _generate_name(name):
     words = name.split(" ")
     words_lower = [word.lower().replace(",", "").replace(".", "").replace("+", "") for word in words]
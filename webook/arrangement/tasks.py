@@ -0,0 +1,98 @@
+import json
+from datetime import date
+from typing import List
+
+from celery import shared_task, states
+from django.contrib.auth import get_user_model
+from django.utils import timezone as dj_timezone
+from django_celery_results.models import TaskResult
+
+from webook.arrangement.forms.exclusivity_analysis.serie_manifest_form import (
+    CreateSerieForm,
+)
+from webook.arrangement.models import EventSerie
+from webook.arrangement.serie_projection import extend_serie_projection
+from webook.logger import logger
+
+
+@shared_task(name="extend_serie_projection")
+def extend_serie_projection_task(serie_pk: int):
+    """Extend the projection of the event serie with the given pk, up until its projection horizon as of today"""
+    serie = EventSerie.objects.select_related("arrangement", "serie_plan_manifest").get(
+        pk=serie_pk
+    )
+
+    created_events = extend_serie_projection(serie)
+
+    logger.info(
+        f"Extended projection of event serie with id {serie_pk} by {len(created_events)} events"
+    )
+
+
+@shared_task(name="extend_all_serie_projections")
+def extend_all_serie_projections():
+    """
+    Extend the projection of all event series without a stop date. Each serie is extended in its own task.
+    Intended to be run periodically; extending a serie that is already projected until its horizon does nothing.
+    """
+    serie_pks = EventSerie.objects.filter(
+        serie_plan_manifest__recurrence_strategy="NoStopDate", is_virtual=False
+    ).values_list("pk", flat=True)
+
+    for serie_pk in serie_pks:
+        extend_serie_projection_task.delay(serie_pk)
+
+
+@shared_task(bind=True, name="create_event_serie")
+def create_event_serie_task(
+    self, form_data: dict, user_pk: int, exclusions: List[str]
+) -> dict:
+    """
+    Create an event serie from the given CreateSerieForm data, on behalf of the user with the given pk.
+    The progress -- the amount of occurrences expanded, analyzed and written -- is stored in the PROGRESS state of the
+    task as it goes, and the result is the progress along with the id of the created serie.
+    """
+    form = CreateSerieForm(data=form_data)
+    if not form.is_valid():
+        raise ValueError(form.errors.as_json())
+
+    user = get_user_model().objects.get(pk=user_pk)
+    progress = {"expanded": 0, "analyzed": 0, "written": 0}
+
+    def report_progress(stage: str, count: int):
+        progress[stage] = count
+        self.update_state(state="PROGRESS", meta=progress)
+
+    # The serie is calculated in the timezone of the user, as it would be in a request by the user
+    with dj_timezone.override(user.timezone):
+        serie_id = form.save(
+            form,
+            user=user,
+            exclusions=[date.fromisoformat(exclusion) for exclusion in exclusions],
+            progress=report_progress,
+        )
+
+    logger.info(f"Created event serie with id {serie_id} in task {self.request.id}")
+
+    return {"serie_id": serie_id, **progress}
+
+
+def serie_creation_progress(job_id: str) -> dict:
+    """
+    Get the status and progress of the serie creation job (create_event_serie_task) with the given id, as stored by
+    django_celery_results. Includes the id of the serie once created, and the error if the job has failed.
+    """
+    task_result = TaskResult.objects.filter(task_id=job_id).first()
+    if task_result is None:
+        # The job has not been picked up by a worker yet
+        return {"status": states.PENDING}
+
+    result = json.loads(task_result.result) if task_result.result else None
+
+    if task_result.status == states.FAILURE:
+        exc_message = (result or {}).get("exc_message")
+        if isinstance(exc_message, (list, tuple)):
+            exc_message = ", ".join(str(message) for message in exc_message)
+        return {"status": task_result.status, "error": exc_message}
+
+    return {"status": task_result.status, **(result or {})}
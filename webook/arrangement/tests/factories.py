@@ -0,0 +1,50 @@
+from factory import Sequence, SubFactory
+from factory.django import DjangoModelFactory
+
+from webook.arrangement.models import Arrangement, Audience, Location, Person, Room
+
+
+class LocationFactory(DjangoModelFactory):
+
+    name = "Unit Test"
+
+    class Meta:
+        model = Location
+
+
+class AudienceFactory(DjangoModelFactory):
+
+    name = "Unit Test"
+
+    class Meta:
+        model = Audience
+
+
+class ArrangementFactory(DjangoModelFactory):
+
+    name = "Unit Test"
+    location = SubFactory(LocationFactory)
+    audience = SubFactory(AudienceFactory)
+
+    class Meta:
+        model = Arrangement
+
+
+class RoomFactory(DjangoModelFactory):
+
+    name = Sequence(lambda n: f"Room {n}")
+    location = SubFactory(LocationFactory)
+    max_capacity = 10
+
+    class Meta:
+        model = Room
+
+
+class PersonFactory(DjangoModelFactory):
+
+    first_name = "Unit"
+    last_name = "Tester"
+    personal_email = Sequence(lambda n: f"{n}@test.com")
+
+    class Meta:
+        model = Person
@@ -3,7 +3,7 @@ from typing import List
 
 import pytz
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone as dj_timezone
 from django.utils.translation import gettext_lazy as _
@@ -29,9 +29,15 @@ from webook.arrangement.forms.exclusivity_analysis.serie_manifest_form import (
 )
 from webook.arrangement.views.generic_views.json_form_view import JsonFormView
 from webook.authorization_mixins import PlannerAuthorizationMixin
-from webook.utils.collision_analysis import CollisionRecord, analyze_collisions
+from webook.utils.collision_analysis import (
+    CollisionRecord,
+    analyze_collisions,
+    analyze_serie_collisions,
+    iter_ndjson,
+    iter_serie_collisions,
+    serie_analysis_events,
+)
 from webook.utils.serie_calculator import _Event, calculate_serie
-from webook.utils.sph_gen import get_serie_positional_hash
 
 
 class CollisionAnalysisFormView(JsonFormView):
@@ -53,59 +59,30 @@ class AnalyzeNonExistentSerieManifest(
         manifest = form.as_plan_manifest()
         calculated_serie: List[_Event] = calculate_serie(manifest)
 
-        converted_events: List[EventDTO] = []
-
         rooms_list = [int(room.id) for room in manifest.rooms.all()]
-        for ev in calculated_serie:
-            event_dto = EventDTO(
-                title=ev.title,
-                start=ev.start,
-                end=ev.end,
-                rooms=rooms_list,
-                before_buffer_title=manifest.before_buffer_title,
-                before_buffer_date_offset=manifest.before_buffer_date_offset,
-                before_buffer_start=manifest.before_buffer_start,
-                before_buffer_end=manifest.before_buffer_end,
-                after_buffer_title=manifest.after_buffer_title,
-                after_buffer_date_offset=manifest.after_buffer_date_offset,
-                after_buffer_start=manifest.after_buffer_start,
-                after_buffer_end=manifest.after_buffer_end,
-                is_resolution=True,
+        people_list = [int(person.id) for person in manifest.people.all()]
+        converted_events: List[EventDTO] = serie_analysis_events(
+            manifest, calculated_serie, rooms_list, people_list
+        )
+
+        pk_of_preceding_event_serie = manifest._predecessor_serie
+
+        if self.request.GET.get("stream"):
+            # Stream the records as NDJSON as they are found, ending with a summary line (see iter_ndjson)
+            records = iter_serie_collisions(
+                manifest.internal_uuid,
+                converted_events,
+                ignore_serie_pk=pk_of_preceding_event_serie,
             )
-            rigging_events: dict = event_dto.generate_rigging_events()
-            events = []
-            event_dto.serie_positional_hash: str = get_serie_positional_hash(
-                manifest.internal_uuid, event_dto.title, event_dto.start, event_dto.end
+            return StreamingHttpResponse(
+                iter_ndjson(records, dj_timezone.get_current_timezone()),
+                content_type="application/x-ndjson",
             )
 
-            rigging_before_event = rigging_events.get("before", None)
-            if rigging_before_event is not None:
-                rigging_before_event.is_rigging = True
-                rigging_before_event.sph_of_root_event = event_dto.serie_positional_hash
-                rigging_before_event.serie_positional_hash = (
-                    rigging_before_event.generate_serie_positional_hash(
-                        manifest.internal_uuid
-                    )
-                )
-                events.append(rigging_before_event)
-            rigging_after_event = rigging_events.get("after", None)
-            if rigging_after_event is not None:
-                rigging_after_event.is_rigging = True
-                rigging_after_event.sph_of_root_event = event_dto.serie_positional_hash
-                rigging_after_event.serie_positional_hash = (
-                    rigging_after_event.generate_serie_positional_hash(
-                        manifest.internal_uuid
-                    )
-                )
-                events.append(rigging_after_event)
-
-            events.append(event_dto)
-
-            converted_events += events
-
-        pk_of_preceding_event_serie = manifest._predecessor_serie
-        records = analyze_collisions(
-            converted_events, ignore_serie_pk=pk_of_preceding_event_serie
+        records = analyze_serie_collisions(
+            manifest.internal_uuid,
+            converted_events,
+            ignore_serie_pk=pk_of_preceding_event_serie,
         )
         return JsonResponse([vars(record) for record in records], safe=False)
 
@@ -8,7 +8,6 @@ from typing import Any, Dict
 from dateutil import parser
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core import exceptions, serializers
-from django.db import connection
 from django.db.models import query
 from django.db.models.query import QuerySet
 from django.forms import BaseModelForm
@@ -32,6 +31,7 @@ from django.views.generic import (
 from django.views.generic.edit import DeleteView, FormView
 
 from webook.arrangement.dto.event import EventDTO
+from webook.arrangement.event_queries import get_arrangements_in_period_json
 from webook.arrangement.facilities.calendar import analysis_strategies
 from webook.arrangement.forms.event_forms import CreateEventForm, UpdateEventForm
 from webook.arrangement.forms.file_forms import (
@@ -143,7 +143,7 @@ class GetCollisionAnalysisView(LoginRequiredMixin, View):
         )
 
         events = []
-        for record in generated_report.records.all():
+        for record in generated_report.records.select_related("collided_with_event"):
             events.append(record.collided_with_event)
 
         response = serializers.serialize("json", events)
@@ -387,9 +387,6 @@ class GetArrangementsInPeriod(LoginRequiredMixin, ListView):
     """Get all arrangements happening in a given period"""
 
     def get(self, request, *args, **kwargs):
-        serializable_arrangements = []
-        results = []
-
         start = self.request.GET.get("start", None)
         end = self.request.GET.get("end", None)
 
@@ -405,92 +402,8 @@ class GetArrangementsInPeriod(LoginRequiredMixin, ListView):
                 content_type="application/json",
             )
 
-        db_vendor = connection.vendor
-
-        with connection.cursor() as cursor:
-            if db_vendor == "postgresql":
-                cursor.execute(
-                    f"""   SELECT audience.icon_class as audience_icon, arr.name as arrangement_name, audience.name as audience, audience.slug as audience_slug, (resp.first_name || ' ' || resp.last_name) as mainPlannerName,
-                                arr.id as arrangement_pk, ev.id as event_pk, arr.slug as slug, ev.title as name, ev.start as starts, arr.created as created_when, ev.association_type as association_type,
-                                ev.end as ends, loc.name as location, loc.slug as location_slug, arrtype.name as arrangement_type, arrtype.slug as arrangement_type_slug, evserie.id as evserie_id, status.name as status_name, status.color as status_color,
-                                status.slug as status_slug, ev.expected_visitors as expected_visitors,
-                                ev.buffer_after_event_id as after_buffer_ev_id, ev.buffer_before_event_id as before_buffer_ev_id,
-                                (SELECT EXISTS(SELECT id from arrangement_event WHERE buffer_before_event_id = ev.id OR buffer_after_event_id = ev.id)) AS is_rigging,
-                                array_agg( DISTINCT room.name) as room_names,
-                                array_agg( DISTINCT participants.first_name || ' ' || participants.last_name ) as people_names,
-                                (array_to_string(array_agg(DISTINCT room.slug ), ',') || ',' || array_to_string(array_agg(DISTINCT participants.slug), ',')) as slug_list
-                                from arrangement_arrangement as arr
-                                JOIN arrangement_event as ev on ev.arrangement_id = arr.id
-                                JOIN arrangement_location as loc on loc.id = arr.location_id
-                                LEFT JOIN arrangement_person as resp on resp.id = ev.responsible_id
-                                LEFT JOIN arrangement_arrangementtype as arrtype on arrtype.id = ev.arrangement_type_id
-                                LEFT JOIN arrangement_audience as audience on audience.id = ev.audience_id
-                                LEFT JOIN arrangement_statustype as status on status.id = ev.status_id
-                                LEFT JOIN arrangement_event_people as evp on evp.event_id = ev.id
-                                LEFT JOIN arrangement_person as participants on participants.id = evp.person_id
-                                LEFT JOIN arrangement_event_rooms as evr on evr.event_id = ev.id
-                                LEFT JOIN arrangement_room as room on room.id = evr.room_id
-                                LEFT JOIN arrangement_eventserie as evserie on evserie.id = ev.serie_id
-                                WHERE arr.is_archived = false AND ev.start > %s AND ev.end < %s AND ev.is_archived = false
-                                GROUP BY 
-                                    event_pk, audience.icon_class, audience.name, audience.slug,
-                                    resp.first_name, resp.last_name, arr.id, ev.id, arr.slug,
-                                    loc.name, loc.slug, arrtype.name, arrtype.slug, evserie.id,
-                                    status.name, status.color, status.slug, arr.expected_visitors
-                            """,
-                    [start, end],
-                )
-            elif db_vendor == "sqlite":
-                cursor.execute(
-                    f"""	SELECT audience.icon_class as audience_icon, arr.name as arrangement_name, audience.name as audience, audience.slug as audience_slug, resp.first_name || " " || resp.last_name as mainPlannerName,
-                            arr.id as arrangement_pk, ev.id as event_pk, arr.slug as slug, ev.title as name, ev.start as starts, arr.created as created_when, ev.association_type as association_type,
-                            ev.end as ends, loc.name as location, loc.slug as location_slug, arrtype.name as arrangement_type, arrtype.slug as arrangement_type_slug, evserie.id as evserie_id, status.name as status_name, status.color as status_color,
-                            ev.buffer_after_event_id as after_buffer_ev_id, ev.buffer_before_event_id as before_buffer_ev_id,
-                            (SELECT EXISTS(SELECT id from arrangement_event WHERE buffer_before_event_id = ev.id OR buffer_after_event_id = ev.id)) AS is_rigging,
-                            GROUP_CONCAT( DISTINCT room.name) as room_names, 
-                            GROUP_CONCAT( DISTINCT participants.first_name || " " || participants.last_name ) as people_names,
-                            GROUP_CONCAT(DISTINCT room.slug ) || "," || GROUP_CONCAT(DISTINCT participants.slug) as slug_list
-                            from arrangement_arrangement as arr 
-                            JOIN arrangement_arrangementtype as arrtype on arrtype.id = arr.arrangement_type_id
-                            JOIN arrangement_location as loc on loc.id = arr.location_id
-                            JOIN arrangement_person as resp on resp.id = arr.responsible_id
-                            JOIN arrangement_audience as audience on audience.id = arr.audience_id
-                            JOIN arrangement_event as ev on ev.arrangement_id = arr.id
-                            left join arrangement_statustype as status on status.id = ev.status_id
-                            LEFT JOIN arrangement_event_people as evp on evp.event_id = ev.id
-                            LEFT JOIN arrangement_person as participants on participants.id = evp.person_id
-                            LEFT JOIN arrangement_event_rooms as evr on evr.event_id = ev.id
-                            LEFT JOIN arrangement_room as room on room.id = evr.room_id
-                            LEFT JOIN arrangement_eventserie as evserie on evserie.id = ev.serie_id
-                            WHERE arr.is_archived = 0 AND ev.start > %s AND ev.end < %s AND ev.is_archived = 0
-                            GROUP BY event_pk""",
-                    [start, end],
-                )
-            columns = [column[0] for column in cursor.description]
-            for row in cursor.fetchall():
-                m = dict(zip(columns, row))
-
-                m["slug_list"] = (
-                    m["slug_list"].split(",") if m["slug_list"] is not None else []
-                )
-                if db_vendor == "sqlite":
-                    m["room_names"] = (
-                        m["room_names"].split(",")
-                        if m["room_names"] is not None
-                        else []
-                    )
-                    m["people_names"] = (
-                        m["people_names"].split(",")
-                        if m["people_names"] is not None
-                        else []
-                    )
-                results.append(m)
-
-        for i in results:
-            serializable_arrangements.append(i)
-
         return HttpResponse(
-            json.dumps(serializable_arrangements, default=json_serial),
+            get_arrangements_in_period_json(start, end),
             content_type="application/json",
         )
 
@@ -0,0 +1,269 @@
+"""virtual_series.py
+
+Expansion of virtual event series.
+
+A virtual serie is not materialized into events when it is created; it is stored as its plan manifest only, together
+with the exceptions to it. Its occurrences are instead expanded on the fly for the period a calendar asks for, and
+merged with the events that are stored in the database.
+
+The exceptions of a virtual serie are:
+    - Exclusions (EventSerieExclusion), dates on which the serie has no occurrence.
+    - Events of the serie, or degraded from it, that are stored in the database. Such an event replaces the occurrence
+      on its date.
+
+Expanded occurrences have the same shape as the rows of the calendar queries in event_queries, with event_pk set to
+None, is_virtual set to True, and the serie positional hash of the occurrence included such that it can be told apart
+from the other occurrences of its serie.
+
+The occurrences also book the rooms and people of their serie. Collision analysis and room availability see them
+through VirtualSerieCalendar, which the room occupancy index and load_person_calendars load along with the bookings
+of the stored events, and expand for the periods they are asked for.
+
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db.models import Q
+from pytz import utc
+
+from webook.arrangement.models import Event, EventSerie, EventSerieExclusion
+from webook.arrangement.serie_projection import (
+    SERIE_TZ,
+    manifest_stopping_within,
+    serie_positional_hash,
+)
+from webook.utils.serie_calculator import iter_serie
+
+
+def _as_aware(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return utc.localize(value)
+    return value
+
+
+def _exception_dates(
+    series: List[EventSerie],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Dict[int, Set[date]]:
+    """Get the dates on which each of the given series has an exception, in the given period if any"""
+    serie_ids = [serie.id for serie in series]
+    exception_dates = defaultdict(set)
+
+    exclusions = EventSerieExclusion.objects.filter(serie_id__in=serie_ids)
+    events = Event.all_objects.filter(
+        Q(serie_id__in=serie_ids) | Q(associated_serie_id__in=serie_ids)
+    )
+    if start is not None and end is not None:
+        exclusions = exclusions.filter(
+            date__gte=start.astimezone(SERIE_TZ).date(),
+            date__lte=end.astimezone(SERIE_TZ).date(),
+        )
+        events = events.filter(start__gte=start - timedelta(days=1), start__lte=end)
+
+    for serie_id, exclusion_date in exclusions.values_list("serie_id", "date"):
+        exception_dates[serie_id].add(exclusion_date)
+
+    # Archived events count as well; an occurrence that has been deleted should not reappear
+    for serie_id, associated_serie_id, event_start in events.values_list(
+        "serie_id", "associated_serie_id", "start"
+    ):
+        exception_dates[serie_id or associated_serie_id].add(
+            event_start.astimezone(SERIE_TZ).date()
+        )
+
+    return exception_dates
+
+
+def _serie_row(serie: EventSerie) -> dict:
+    """Get the calendar row fields that all occurrences of the given serie share"""
+    manifest = serie.serie_plan_manifest
+    arrangement = serie.arrangement
+    audience = manifest.audience or arrangement.audience
+    rooms = list(manifest.rooms.all())
+    people = list(manifest.people.all())
+
+    return {
+        "audience_icon": audience.icon_class if audience else None,
+        "arrangement_name": arrangement.name,
+        "audience": audience.name if audience else None,
+        "audience_slug": audience.slug if audience else None,
+        "mainPlannerName": (
+            f"{manifest.responsible.first_name} {manifest.responsible.last_name}"
+            if manifest.responsible
+            else None
+        ),
+        "arrangement_pk": arrangement.id,
+        "event_pk": None,
+        "slug": arrangement.slug,
+        "name": manifest.title,
+        "created_when": arrangement.created,
+        "association_type": Event.NO_ASSOCIATION,
+        "location": arrangement.location.name,
+        "location_slug": arrangement.location.slug,
+        "arrangement_type": (
+            manifest.arrangement_type.name if manifest.arrangement_type else None
+        ),
+        "arrangement_type_slug": (
+            manifest.arrangement_type.slug if manifest.arrangement_type else None
+        ),
+        "evserie_id": serie.id,
+        "status_name": manifest.status.name if manifest.status else None,
+        "status_color": manifest.status.color if manifest.status else None,
+        "status_slug": manifest.status.slug if manifest.status else None,
+        "expected_visitors": manifest.expected_visitors,
+        "after_buffer_ev_id": None,
+        "before_buffer_ev_id": None,
+        "is_rigging": False,
+        "room_names": [room.name for room in rooms],
+        "services": [],
+        "preconfigurations": [],
+        "people_names": [
+            f"{person.first_name} {person.last_name}" for person in people
+        ],
+        "slug_list": [room.slug for room in rooms] + [person.slug for person in people],
+        "is_virtual": True,
+    }
+
+
+def get_virtual_occurrences_in_period(
+    start: datetime, end: datetime, person_id: Optional[int] = None
+) -> List[dict]:
+    """
+    Expand the occurrences of all virtual series that start after start and end before end. If person_id is given,
+    only the occurrences of series the person takes part in are expanded.
+    """
+    start = _as_aware(start)
+    end = _as_aware(end)
+
+    series = EventSerie.objects.filter(
+        is_virtual=True,
+        arrangement__is_archived=False,
+        serie_plan_manifest__start_date__lte=end.astimezone(SERIE_TZ).date(),
+    )
+    if person_id is not None:
+        series = series.filter(serie_plan_manifest__people__id=person_id)
+
+    series = list(
+        series.select_related(
+            "arrangement__location",
+            "arrangement__audience",
+            "serie_plan_manifest__audience",
+            "serie_plan_manifest__arrangement_type",
+            "serie_plan_manifest__status",
+            "serie_plan_manifest__responsible",
+        ).prefetch_related("serie_plan_manifest__rooms", "serie_plan_manifest__people")
+    )
+    if not series:
+        return []
+
+    exception_dates = _exception_dates(series, start, end)
+    rows = []
+
+    for serie in series:
+        manifest = serie.serie_plan_manifest
+        serie_row = _serie_row(serie)
+        window_manifest = manifest_stopping_within(
+            manifest, end.astimezone(SERIE_TZ).date()
+        )
+
+        for occurrence in iter_serie(window_manifest, start, end, tz=SERIE_TZ):
+            if not (occurrence.start > start and occurrence.end < end):
+                continue
+            if (
+                occurrence.start.astimezone(SERIE_TZ).date()
+                in exception_dates[serie.id]
+            ):
+                continue
+
+            rows.append(
+                {
+                    **serie_row,
+                    "starts": occurrence.start,
+                    "ends": occurrence.end,
+                    "serie_positional_hash": serie_positional_hash(
+                        manifest, manifest.title, occurrence.start, occurrence.end
+                    ),
+                }
+            )
+
+    return rows
+
+
+class VirtualSerieCalendar:
+    """The bookings of the occurrences of a virtual serie, expanded for the periods they are asked for"""
+
+    def __init__(self, serie: EventSerie, exception_dates: Set[date]):
+        self.serie_id = serie.id
+        self.manifest = serie.serie_plan_manifest
+        self.exception_dates = exception_dates
+
+    def bookings(
+        self, start: datetime, end: datetime
+    ) -> List[Tuple[str, str, datetime, datetime]]:
+        """
+        Get the (serie positional hash, title, start, end) of the occurrences that start before or at end, and end at
+        or after start, ordered by start
+        """
+        start = _as_aware(start)
+        end = _as_aware(end)
+        window_manifest = manifest_stopping_within(
+            self.manifest, end.astimezone(SERIE_TZ).date()
+        )
+
+        return [
+            (
+                serie_positional_hash(
+                    self.manifest, self.manifest.title, occurrence.start, occurrence.end
+                ),
+                self.manifest.title,
+                occurrence.start,
+                occurrence.end,
+            )
+            for occurrence in iter_serie(window_manifest, start, end, tz=SERIE_TZ)
+            if occurrence.start <= end
+            and occurrence.end >= start
+            and occurrence.start.astimezone(SERIE_TZ).date() not in self.exception_dates
+        ]
+
+
+def load_virtual_serie_calendars(
+    room_ids: Iterable[int] = (), person_ids: Iterable[int] = ()
+) -> Tuple[
+    Dict[int, List[VirtualSerieCalendar]], Dict[int, List[VirtualSerieCalendar]]
+]:
+    """
+    Load the calendars of the virtual series that book any of the given rooms or people, as the calendars of each
+    room and of each person. Rooms and people without virtual series are left out.
+    """
+    room_ids, person_ids = set(room_ids), set(person_ids)
+    series = list(
+        EventSerie.objects.filter(
+            Q(serie_plan_manifest__rooms__in=room_ids)
+            | Q(serie_plan_manifest__people__in=person_ids),
+            is_virtual=True,
+            arrangement__is_archived=False,
+        )
+        .distinct()
+        .select_related("serie_plan_manifest")
+        .prefetch_related("serie_plan_manifest__rooms", "serie_plan_manifest__people")
+    )
+
+    room_calendars, person_calendars = defaultdict(list), defaultdict(list)
+    if not series:
+        return room_calendars, person_calendars
+
+    exception_dates = _exception_dates(series)
+    for serie in series:
+        calendar = VirtualSerieCalendar(serie, exception_dates[serie.id])
+        manifest = serie.serie_plan_manifest
+        for room in manifest.rooms.all():
+            if room.id in room_ids:
+                room_calendars[room.id].append(calendar)
+        for person in manifest.people.all():
+            if person.id in person_ids:
+                person_calendars[person.id].append(calendar)
+
+    return room_calendars, person_calendars
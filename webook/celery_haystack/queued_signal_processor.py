@@ -1,6 +1,20 @@
 import logging
 from haystack.signals import RealtimeSignalProcessor
 
+from webook.utils.bulk_operation import current_bulk_operation, defer
+
+
+def _update_objects_in_batches(items):
+    """Enqueue one update of the search index for each model of the given (model name, id) items"""
+    from webook.celery_haystack.tasks import update_objects
+
+    ids_of_models = {}
+    for model_name, id in items:
+        ids_of_models.setdefault(model_name, []).append(id)
+
+    for model_name, ids in ids_of_models.items():
+        update_objects.delay(ids=ids, model_name=model_name)
+
 
 class QueuedSignalProcessor(RealtimeSignalProcessor):
     def setup(self):
@@ -16,6 +30,15 @@ class QueuedSignalProcessor(RealtimeSignalProcessor):
             self.enqueue_delete, dispatch_uid="queued_signal_processor"
         )
 
+        from webook.arrangement.signals import objects_archived, serie_created
+
+        serie_created.connect(
+            self.enqueue_serie_created, dispatch_uid="queued_signal_processor"
+        )
+        objects_archived.connect(
+            self.enqueue_objects_archived, dispatch_uid="queued_signal_processor"
+        )
+
     def teardown(self):
         # Disconnect the QueuedSignalProcessor from the Django signal processor
         from django.db.models import signals
@@ -26,6 +49,15 @@ class QueuedSignalProcessor(RealtimeSignalProcessor):
         signals.post_delete.disconnect(
             self.enqueue_delete, dispatch_uid="queued_signal_processor"
         )
+
+        from webook.arrangement.signals import objects_archived, serie_created
+
+        serie_created.disconnect(
+            self.enqueue_serie_created, dispatch_uid="queued_signal_processor"
+        )
+        objects_archived.disconnect(
+            self.enqueue_objects_archived, dispatch_uid="queued_signal_processor"
+        )
         # Reconnect the Haystack signal processor
         super(QueuedSignalProcessor, self).teardown()
 
@@ -40,6 +72,12 @@ class QueuedSignalProcessor(RealtimeSignalProcessor):
                 )
             return
 
+        # Within a bulk operation the saved objects are indexed in one batch per model, when it has ended
+        if defer(
+            _update_objects_in_batches, (instance.__class__.__name__, instance.id)
+        ):
+            return
+
         update_object.delay(id=instance.id, model_name=instance.__class__.__name__)
 
     def enqueue_delete(self, sender, instance, **kwargs):
@@ -53,3 +91,31 @@ class QueuedSignalProcessor(RealtimeSignalProcessor):
             return
 
         remove_object.delay(id=instance.id, model=instance.__class__.__name__)
+
+    def enqueue_serie_created(self, sender, serie, event_ids, **kwargs):
+        # Enqueue the save operation of all the events of the serie, which were created in bulk
+        from webook.celery_haystack.tasks import update_objects
+
+        if current_bulk_operation() is not None:
+            for id in event_ids:
+                defer(_update_objects_in_batches, ("Event", id))
+            return
+
+        update_objects.delay(ids=event_ids, model_name="Event")
+
+    def enqueue_objects_archived(self, sender, archived, **kwargs):
+        # Enqueue the save operation of the dependents of an archived object, which were archived in bulk
+        from webook.celery_haystack.tasks import MODEL_DICT
+
+        items = [
+            (model.__name__, id)
+            for model, ids in archived.items()
+            if model.__name__ in MODEL_DICT
+            for id in ids
+        ]
+        if current_bulk_operation() is not None:
+            for item in items:
+                defer(_update_objects_in_batches, item)
+            return
+
+        _update_objects_in_batches(items)
@@ -1,3 +1,5 @@
+from typing import List
+
 from celery import shared_task
 import django.apps
 
@@ -16,6 +18,17 @@ def update_object(id: int, model_name: str):
         ).update_object(instance)
 
 
+@shared_task
+def update_objects(ids: List[int], model_name: str):
+    from haystack import connections
+
+    instances = list(MODEL_DICT[model_name].objects.filter(id__in=ids))
+    for alias in connections.connections_info.keys():
+        index = connections[alias].get_unified_index().get_index(MODEL_DICT[model_name])
+        for instance in instances:
+            index.update_object(instance)
+
+
 @shared_task
 def remove_object(id: int, model_name: str):
     from haystack import connections
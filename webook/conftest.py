@@ -1,6 +1,16 @@
+from typing import Iterable, List
+
 import pytest
+from django.apps import apps
 from django.test import RequestFactory
+from pytz import timezone
 
+from webook.arrangement.models import Arrangement, Event, Location, Person, Room
+from webook.arrangement.tests.factories import (
+    ArrangementFactory,
+    LocationFactory,
+    PersonFactory,
+)
 from webook.users.models import User
 from webook.users.tests.factories import UserFactory
 
@@ -14,10 +24,111 @@ def media_storage(settings, tmpdir):
 def user() -> User:
     return UserFactory()
 
+
 @pytest.fixture
 def user2() -> User:
     return UserFactory()
 
+
 @pytest.fixture
 def request_factory() -> RequestFactory:
     return RequestFactory()
+
+
+@pytest.fixture
+def tz():
+    """The timezone of the dated bookings of tests"""
+    return timezone("Europe/Oslo")
+
+
+@pytest.fixture
+def location() -> Location:
+    return LocationFactory()
+
+
+@pytest.fixture
+def arrangement(location) -> Arrangement:
+    return ArrangementFactory(location=location)
+
+
+@pytest.fixture
+def person() -> Person:
+    return PersonFactory()
+
+
+@pytest.fixture
+def create_events(arrangement):
+    """
+    Create events in bulk, booking the given rooms and people, without the signals of saving them one by one. Events
+    without an arrangement are of the arrangement of the test.
+    """
+
+    def create(
+        events: Iterable[Event],
+        rooms: Iterable[Room] = (),
+        people: Iterable[Person] = (),
+    ) -> List[Event]:
+        events, rooms, people = list(events), list(rooms), list(people)
+        for event in events:
+            if event.arrangement_id is None:
+                event.arrangement = arrangement
+        created = Event.objects.bulk_create(events)
+        Event.rooms.through.objects.bulk_create(
+            [
+                Event.rooms.through(event_id=event.id, room_id=room.id)
+                for event in created
+                for room in rooms
+            ]
+        )
+        Event.people.through.objects.bulk_create(
+            [
+                Event.people.through(event_id=event.id, person_id=person.id)
+                for event in created
+                for person in people
+            ]
+        )
+        return created
+
+    return create
+
+
+@pytest.fixture
+def no_search_indexing():
+    """Disconnect search indexing of saved models, as the search backend is not available to the tests"""
+    signal_processor = apps.get_app_config("haystack").signal_processor
+    signal_processor.teardown()
+    yield
+    signal_processor.setup()
+
+
+@pytest.fixture
+def room_occupancy_history():
+    """Have the room occupancy index hold the bookings of the past decade, which the dated bookings of tests are in"""
+    from datetime import timedelta
+
+    from webook.utils.room_occupancy import room_occupancy_index
+
+    history = room_occupancy_index.history
+    room_occupancy_index.history = timedelta(days=3653)
+    room_occupancy_index.clear()
+    yield room_occupancy_index
+    room_occupancy_index.history = history
+    room_occupancy_index.clear()
+
+
+@pytest.fixture
+def shared_room_occupancy(settings):
+    """
+    Have the room occupancy index share the versions of rooms through the cache, as it does through Redis in
+    production; without Redis the index is bypassed
+    """
+    from django.core.cache import cache
+
+    from webook.utils.room_occupancy import room_occupancy_index
+
+    settings.USE_REDIS = True
+    cache.clear()
+    room_occupancy_index.clear()
+    yield room_occupancy_index
+    cache.clear()
+    room_occupancy_index.clear()
@@ -3,6 +3,44 @@ from django.dispatch import receiver
 from .tasks import synchronize_user_calendar
 
 from webook.arrangement.models import Event, PlanManifest
+from webook.arrangement.signals import objects_archived
+from webook.users.models import User
+from webook.utils.bulk_operation import current_bulk_operation, defer
+
+
+def _synchronize_calendars_of_people(person_pks):
+    """Synchronize the calendar of the (first) user of each of the given people"""
+    users_of_people = {}
+    for person_pk, user_pk in (
+        User.objects.filter(person_id__in=person_pks)
+        .order_by("pk")
+        .values_list("person_id", "pk")
+    ):
+        users_of_people.setdefault(person_pk, user_pk)
+
+    for user_pk in dict.fromkeys(users_of_people.values()):
+        synchronize_user_calendar.delay(user_pk)
+
+
+def _synchronize_calendars_of_events(event_pks):
+    # The events of series are synchronized through their manifests
+    _synchronize_calendars_of_people(
+        set(
+            Event.people.through.objects.filter(
+                event_id__in=event_pks, event__serie__isnull=True
+            ).values_list("person_id", flat=True)
+        )
+    )
+
+
+def _synchronize_calendars_of_manifests(manifest_pks):
+    _synchronize_calendars_of_people(
+        set(
+            PlanManifest.people.through.objects.filter(
+                planmanifest_id__in=manifest_pks
+            ).values_list("person_id", flat=True)
+        )
+    )
 
 
 @receiver(post_save, sender=Event)
@@ -10,6 +48,10 @@ def on_event_handler(sender, instance, created, **kwargs):
     if instance.serie:
         return
 
+    # Within a bulk operation the calendars are synchronized once per user, when it has ended
+    if defer(_synchronize_calendars_of_events, instance.pk):
+        return
+
     people = list(instance.people.all())
 
     for person in people:
@@ -20,9 +62,26 @@ def on_event_handler(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=PlanManifest)
 def on_event_serie_handler(sender, instance, created, **kwargs):
+    if defer(_synchronize_calendars_of_manifests, instance.pk):
+        return
+
     people = instance.people.all()
 
     for person in people:
         user = person.user_set.first()
         if user:
             synchronize_user_calendar.delay(user.pk)
+
+
+@receiver(objects_archived)
+def on_objects_archived_handler(sender, archived, **kwargs):
+    event_pks = archived.get(Event, [])
+    if not event_pks:
+        return
+
+    if current_bulk_operation() is not None:
+        for pk in event_pks:
+            defer(_synchronize_calendars_of_events, pk)
+        return
+
+    _synchronize_calendars_of_events(event_pks)
@@ -22,7 +22,9 @@ class ArchiveableMixin(models.Model):
     all_objects = models.Manager()
 
     def archive(self, person_archiving_this: Optional[Person] = None):
-        """Archive this object"""
+        """Archive this object, and its dependents (see get_archive_dependents)"""
+        from webook.arrangement.archive_cascade import archive_dependents
+
         self.is_archived = True
         self.archived_by = person_archiving_this
         self.archived_when = datetime.now()
@@ -31,6 +33,7 @@ class ArchiveableMixin(models.Model):
         if callable(on_archive):
             on_archive(person_archiving_this)
 
+        archive_dependents(self, person_archiving_this, self.archived_when)
         self.save()
 
     is_archived = models.BooleanField(verbose_name="Is archived", default=False)
@@ -153,10 +156,10 @@ class School(TimeStampedModel, ArchiveableMixin):
 
     audiences = models.ManyToManyField(Audience)
 
-    def on_archive(self, person_archiving_this):
-        # Archive all bookings for this school
-        for booking in self.bookings.all():
-            booking.archive(person_archiving_this)
+    @classmethod
+    def get_archive_dependents(cls, ids):
+        # Archive all bookings for these schools
+        return [OnlineBooking.objects.filter(school_id__in=ids)]
 
     def __str__(self):
         name = self.name
@@ -175,14 +178,13 @@ class County(TimeStampedModel, ArchiveableMixin):
     # Designates whether schools in this county are enabled for online booking
     school_enabled = models.BooleanField(default=False)
 
-    def on_archive(self, person_archiving_this):
-        # Archive all schools in this county
-        for school in self.schools_in_county.all():
-            school.archive(person_archiving_this)
-
-        # Archive all city segments in this county
-        for segment in self.city_segments.all():
-            segment.archive(person_archiving_this)
+    @classmethod
+    def get_archive_dependents(cls, ids):
+        # Archive all schools and city segments in these counties
+        return [
+            School.objects.filter(county_id__in=ids),
+            CitySegment.objects.filter(county_id__in=ids),
+        ]
 
     def __str__(self):
         return self.name
@@ -194,10 +196,10 @@ class CitySegment(TimeStampedModel, ArchiveableMixin):
         "County", on_delete=models.CASCADE, related_name="city_segments"
     )
 
-    def on_archive(self, person_archiving_this):
-        # Archive all schools in this segment
-        for school in self.schools_in_segment.all():
-            school.archive(person_archiving_this)
+    @classmethod
+    def get_archive_dependents(cls, ids):
+        # Archive all schools in these segments
+        return [School.objects.filter(city_segment_id__in=ids)]
 
     def __str__(self):
         return self.name
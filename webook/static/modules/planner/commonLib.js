@@ -4,6 +4,31 @@ export const _NATIVE_ARRANGEMENT = Symbol("NATIVE_ARRANGEMENT");
 export const _NATIVE_LOCATION = Symbol("NATIVE_LOCATION");
 export const _NATIVE_PERSON = Symbol("NATIVE_PERSON");
 
+// Occurrences of virtual series have no event pk; they are keyed on their serie positional hash, with this prefix
+const _VIRTUAL_KEY_PREFIX = "virtual-";
+
+/**
+ * Get the key of the given arrangement in the arrangement store; the pk of its event, or the serie positional hash
+ * of it if it is an occurrence of a virtual serie
+ * @param {*} arrangement
+ * @returns
+ */
+export function arrangementStoreKey(arrangement) {
+    if (arrangement.is_virtual) {
+        return _VIRTUAL_KEY_PREFIX + arrangement.serie_positional_hash;
+    }
+    return arrangement.event_pk;
+}
+
+/**
+ * Check if the given store key (or pk) is that of an occurrence of a virtual serie, which has no event to inspect
+ * @param {*} key
+ * @returns
+ */
+export function isVirtualKey(key) {
+    return String(key).startsWith(_VIRTUAL_KEY_PREFIX);
+}
+
 
 
 /**
@@ -195,7 +220,7 @@ export class ArrangementStore extends BaseStore {
         return fetch(this._sourceUrl + query_string)
             .then(response => response.json())
             .then(obj => { obj.forEach((arrangement) => {
-                this._store.set(arrangement.event_pk, arrangement);
+                this._store.set(arrangementStoreKey(arrangement), arrangement);
             })});
     }
 
@@ -213,7 +238,7 @@ export class ArrangementStore extends BaseStore {
      */
     _mapArrangementToFullCalendarEvent(arrangement) {
         const slugClass = writeSlugClass(arrangement.slug);
-        const pkClass = "pk:" + arrangement.event_pk;
+        const pkClass = "pk:" + arrangementStoreKey(arrangement);
 
         return new FullCalendarEvent({
             title: arrangement.name,
@@ -231,6 +256,7 @@ export class ArrangementStore extends BaseStore {
                 arrangementType: arrangement.arrangement_type,
                 isSerie: !!arrangement.evserie_id,
                 isRigging: arrangement.is_rigging,
+                isVirtual: !!arrangement.is_virtual,
             },
         });
     }
@@ -240,12 +266,13 @@ export class ArrangementStore extends BaseStore {
      * @param {*} slug 
      */
     get({pk, get_as } = {}) {
-        if (this._store.has(parseInt(pk)) === false) {
+        const key = isVirtualKey(pk) ? pk : parseInt(pk);
+        if (this._store.has(key) === false) {
             console.error(`Can not get arrangement with pk '${pk}' as pk is not known.`)
             return;
         }
 
-        const arrangement = this._store.get(parseInt(pk));
+        const arrangement = this._store.get(key);
         
         if (get_as === _FC_EVENT) {
             return this._mapArrangementToFullCalendarEvent(arrangement);
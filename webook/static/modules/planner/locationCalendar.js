@@ -1,5 +1,5 @@
 import { HeaderGenerator } from "./calendar_utilities/header_generator.js";
-import { ArrangementStore, CalendarFilter, FullCalendarBased, LocationStore, StandardColorProvider, _FC_EVENT, _FC_RESOURCE, _NATIVE_ARRANGEMENT } from "./commonLib.js";
+import { ArrangementStore, CalendarFilter, FullCalendarBased, LocationStore, StandardColorProvider, _FC_EVENT, _FC_RESOURCE, _NATIVE_ARRANGEMENT, isVirtualKey } from "./commonLib.js";
 export class LocationCalendar extends FullCalendarBased {
 
     constructor({ calendarElement,
@@ -88,6 +88,8 @@ export class LocationCalendar extends FullCalendarBased {
         let _this = this;
         $(elementToBindWith).on('click', (ev) => {
             let pk = _this._findEventPkFromEl(ev.currentTarget);
+            if (isVirtualKey(pk))
+                return;
             this.eventInspectorUtility.inspect(pk);
         })
     }
@@ -188,7 +190,7 @@ export class LocationCalendar extends FullCalendarBased {
                         <div class='text-center'>
                             <i class='fas fa-user'></i>&nbsp;
                         </div>
-                        ${arrangement.mainplannername}
+                        ${arrangement.mainPlannerName}
                     </div>
                     <div class='col-6 mt-2 text-center'>
                         <div class='text-center'>
@@ -229,6 +231,8 @@ export class LocationCalendar extends FullCalendarBased {
         let _this = this;
         $(elementToBindWith).on('click', (ev) => {
             let pk = _this._findEventPkFromEl(ev.currentTarget);
+            if (isVirtualKey(pk))
+                return;
             this.eventInspectorUtility.inspect(pk);
         })
     }
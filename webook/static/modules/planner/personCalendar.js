@@ -1,5 +1,5 @@
 import { HeaderGenerator } from "./calendar_utilities/header_generator.js";
-import { ArrangementStore, CalendarFilter, FullCalendarBased, PersonStore, StandardColorProvider, _FC_EVENT, _FC_RESOURCE, _NATIVE_ARRANGEMENT } from "./commonLib.js";
+import { ArrangementStore, CalendarFilter, FullCalendarBased, PersonStore, StandardColorProvider, _FC_EVENT, _FC_RESOURCE, _NATIVE_ARRANGEMENT, isVirtualKey } from "./commonLib.js";
 
 export class PersonCalendar extends FullCalendarBased {
 
@@ -72,6 +72,8 @@ export class PersonCalendar extends FullCalendarBased {
         let _this = this;
         $(elementToBindWith).on('click', (ev) => {
             let pk = _this._findEventPkFromEl(ev.currentTarget);
+            if (isVirtualKey(pk))
+                return;
             this.eventInspectorUtility.inspect(pk);
         })
     }
@@ -172,7 +174,7 @@ export class PersonCalendar extends FullCalendarBased {
                         <div class='text-center'>
                             <i class='fas fa-user'></i>&nbsp;
                         </div>
-                        ${arrangement.mainplannername}
+                        ${arrangement.mainPlannerName}
                     </div>
                     <div class='col-6 mt-2 text-center'>
                         <div class='text-center'>
@@ -236,10 +238,10 @@ export class PersonCalendar extends FullCalendarBased {
                                 name: "<i class='fas fa-search'></i>&nbsp; Inspiser arrangement",
                                 isHtmlName: true,
                                 callback: (key, opt) => {
-                                    let pk = parseInt(_this._findEventPkFromEl(opt.$trigger[0]));
+                                    let pk = _this._findEventPkFromEl(opt.$trigger[0]);
 
                                     let arrangement = _this._ARRANGEMENT_STORE.get({
-                                        pk: parseInt(pk),
+                                        pk: pk,
                                         get_as: _NATIVE_ARRANGEMENT
                                     });
                             
@@ -251,6 +253,8 @@ export class PersonCalendar extends FullCalendarBased {
                                 isHtmlName: true,
                                 callback: (key, opt) => {
                                     let pk = _this._findEventPkFromEl(opt.$trigger[0]);
+                                    if (isVirtualKey(pk))
+                                        return;
                                     this.eventInspector.inspect(pk);
                                 }
                             },
@@ -299,6 +303,8 @@ export class PersonCalendar extends FullCalendarBased {
                                     }).then((result) => {
                                         if (result.isConfirmed) {
                                             let pk = _this._findEventPkFromEl(opt.$trigger[0]);
+                                            if (isVirtualKey(pk))
+                                                return;
 
                                             let formData = new FormData();
                                             formData.append("eventIds", String(pk));
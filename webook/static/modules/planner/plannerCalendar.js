@@ -2,7 +2,7 @@ import { HeaderGenerator, ViewClassifiers } from "./calendar_utilities/header_ge
 import {
     ArrangementStore, CalendarFilter, FullCalendarBased, LocationStore,
     PersonStore, StandardColorProvider, _FC_EVENT,
-    _NATIVE_ARRANGEMENT
+    _NATIVE_ARRANGEMENT, isVirtualKey
 } from "./commonLib.js";
 // import { FilterDialog } from "./filterDialog.js";
 
@@ -224,6 +224,9 @@ export class PlannerCalendar extends FullCalendarBased {
 
     _listenToInspectEvent() {
         document.addEventListener("plannerCalendar.inspectEvent", (e) => {
+            // Occurrences of virtual series have no event to inspect
+            if (isVirtualKey(e.detail.event_pk))
+                return;
             this.eventInspectorUtility.inspect(e.detail.event_pk);
         })
     }
@@ -386,7 +389,7 @@ export class PlannerCalendar extends FullCalendarBased {
                         <div class='text-center'>
                             <i class='fas fa-user'></i>&nbsp;
                         </div>
-                        ${arrangement.mainplannername}
+                        ${arrangement.mainPlannerName}
                     </div>
                     <div class='col-6 mt-2 text-center'>
                         <div class='text-center'>
@@ -429,6 +432,8 @@ export class PlannerCalendar extends FullCalendarBased {
         let _this = this;
         $(elementToBindWith).on('click', (ev) => {
             let pk = _this._findEventPkFromEl(ev.currentTarget);
+            if (isVirtualKey(pk))
+                return;
             this.eventInspectorUtility.inspect(pk);
         })
     }
@@ -793,6 +798,8 @@ export class PlannerCalendar extends FullCalendarBased {
                         callback: (key, opt) => {
                             if (!opt.event || opt.event.backgroundColor !== "prussianblue") {
                                 let pk = _this._findEventPkFromEl(opt.$trigger[0]);
+                                if (isVirtualKey(pk))
+                                    return;
                                 this.eventInspectorUtility.inspect(pk);
                             }
                         }
@@ -845,6 +852,8 @@ export class PlannerCalendar extends FullCalendarBased {
                             }).then((result) => {
                                 if (result.isConfirmed) {
                                     let pk = _this._findEventPkFromEl(opt.$trigger[0]);
+                                    if (isVirtualKey(pk))
+                                        return;
 
                                     let formData = new FormData();
                                     formData.append("eventIds", String(pk));
@@ -925,6 +934,8 @@ export class PlannerCalendar extends FullCalendarBased {
             console.log("Event clicked.")
 
             let pk = _this._findEventPkFromEl(event.currentTarget);
+            if (isVirtualKey(pk))
+                return;
             _this.eventInspectorUtility.inspect(pk);
         });
 
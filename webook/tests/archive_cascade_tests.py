@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from webook.arrangement.archive_cascade import plan_archive_cascade
+from webook.arrangement.models import Arrangement, Audience, Event, Location, Room
+from webook.arrangement.signals import objects_archived
+from webook.arrangement.tests.factories import AudienceFactory, RoomFactory
+
+
+@pytest.mark.django_db
+def test_archive_cascade_archives_dependents_in_bulk(
+    no_search_indexing,
+    tz,
+    location,
+    arrangement,
+    person,
+    create_events,
+    django_assert_max_num_queries,
+    django_capture_on_commit_callbacks,
+):
+    """Test that archiving a location archives its arrangements' events and rooms with one UPDATE per model"""
+    rooms = [RoomFactory(location=location) for _ in range(3)]
+    audience = arrangement.audience
+    nested_audience = AudienceFactory(name="Nested", parent=audience)
+    arrangement.audience = nested_audience
+    arrangement.save()
+    start = tz.localize(datetime(2025, 1, 6, 9, 0))
+    events = create_events(
+        Event(
+            title=f"Event {i}",
+            start=start + timedelta(days=i),
+            end=start + timedelta(days=i, hours=1),
+            is_archived=i == 3,
+        )
+        for i in range(4)
+    )
+
+    assert plan_archive_cascade(Audience, [audience.id]) == {
+        Audience: {nested_audience.id}
+    }
+    assert plan_archive_cascade(Location, [location.id]) == {
+        Room: {room.id for room in rooms}
+    }
+
+    sent = []
+
+    def on_objects_archived(sender, archived, **kwargs):
+        sent.append((sender, archived))
+
+    objects_archived.connect(on_objects_archived)
+    try:
+        with django_capture_on_commit_callbacks(execute=True):
+            # Planning the events, archiving them, saving the arrangement; regardless of the amount of events
+            with django_assert_max_num_queries(4):
+                arrangement.archive(person)
+    finally:
+        objects_archived.disconnect(on_objects_archived)
+
+    assert sent == [
+        (Arrangement, {Event: [event.id for event in events[:3]]}),
+    ]
+    assert not Event.objects.filter(arrangement=arrangement).exists()
+    assert set(
+        Event.all_objects.filter(arrangement=arrangement).values_list(
+            "archived_by", flat=True
+        )
+    ) == {person.id, None}
+
+    location.archive(person)
+    assert not Room.objects.filter(location=location).exists()
+    assert Location.all_objects.get(id=location.id).is_archived
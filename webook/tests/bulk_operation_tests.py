@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from django.db import transaction
+
+import webook.graph_integration.signals as graph_signals
+from webook.arrangement.models import Event
+from webook.utils.bulk_operation import bulk_operation, defer, memoized
+
+
+@pytest.mark.django_db
+def test_bulk_operation_batches_side_effects_until_commit(
+    no_search_indexing,
+    tz,
+    user,
+    person,
+    create_events,
+    monkeypatch,
+    django_capture_on_commit_callbacks,
+):
+    """Test that the calendar of a user is synchronized once, after commit, however many of their events are saved"""
+    synchronized = []
+    monkeypatch.setattr(
+        graph_signals,
+        "synchronize_user_calendar",
+        SimpleNamespace(delay=synchronized.append),
+    )
+
+    user.person = person
+    user.save()
+
+    start = tz.localize(datetime(2025, 1, 6, 9, 0))
+    events = create_events(
+        (
+            Event(
+                title=f"Event {i}",
+                start=start + timedelta(days=i),
+                end=start + timedelta(days=i, hours=1),
+            )
+            for i in range(3)
+        ),
+        people=[person],
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic(), bulk_operation():
+            for event in events[:2]:
+                event.save()
+            # Nested operations join the outermost one
+            with bulk_operation():
+                events[2].save()
+
+            assert synchronized == []
+
+    assert synchronized == [user.pk]
+
+    # The side effects of an operation that is rolled back are discarded along with its writes
+    with django_capture_on_commit_callbacks(execute=True):
+        with pytest.raises(RuntimeError):
+            with transaction.atomic(), bulk_operation():
+                events[0].save()
+                raise RuntimeError()
+
+    assert synchronized == [user.pk]
+
+
+@pytest.mark.django_db
+def test_defer_and_memoized_within_bulk_operation(django_capture_on_commit_callbacks):
+    """Test that deferred items are deduplicated, and memoized values computed once, for the duration of an operation"""
+    computed, flushed = [], []
+
+    def compute():
+        computed.append(None)
+        return len(computed)
+
+    # Outside of bulk operations side effects are carried out at once, and values computed every time
+    assert defer(flushed.append, "item") is False
+    assert memoized("key", compute) == 1
+    assert memoized("key", compute) == 2
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with bulk_operation():
+            assert memoized("key", compute) == 3
+            assert memoized("key", compute) == 3
+            for item in ("a", "b", "a"):
+                assert defer(flushed.append, item) is True
+
+            assert flushed == []
+
+    assert flushed == [["a", "b"]]
+    assert memoized("key", compute) == 4
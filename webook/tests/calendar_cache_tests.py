@@ -0,0 +1,102 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from django.core.cache import cache
+
+from webook.arrangement.event_queries import cached_calendar_json, calendar_rows
+from webook.arrangement.models import Event
+from webook.utils.calendar_cache import CalendarWeekCache, calendar_week_cache
+
+
+@pytest.mark.django_db
+def test_calendar_weeks_are_cached_and_invalidated_by_changes_to_their_events(
+    no_search_indexing,
+    tz,
+    person,
+    create_events,
+    django_assert_num_queries,
+    django_capture_on_commit_callbacks,
+):
+    """Test that periods are stitched from cached weeks, and that changes invalidate the weeks of the changed events"""
+    cache.clear()
+    monday = tz.localize(datetime(2025, 1, 6, 9, 0))
+    events = create_events(
+        Event(
+            title=title,
+            start=monday + offset,
+            end=monday + offset + timedelta(hours=2),
+        )
+        for title, offset in (
+            ("Before the period", timedelta(days=-2)),
+            ("First week", timedelta(days=1)),
+            ("Second week", timedelta(days=8)),
+            ("Across the end of the period", timedelta(days=13, hours=13)),
+        )
+    )
+
+    period = (
+        tz.localize(datetime(2025, 1, 6)).isoformat(),
+        tz.localize(datetime(2025, 1, 20)).isoformat(),
+    )
+
+    def titles(person_id=None):
+        return sorted(
+            row["name"] for row in json.loads(cached_calendar_json(*period, person_id))
+        )
+
+    # The three weeks of the period are loaded with one query, and served from the cache afterwards
+    with django_assert_num_queries(1):
+        assert titles() == ["First week", "Second week"]
+    with django_assert_num_queries(0):
+        assert titles() == ["First week", "Second week"]
+    assert calendar_week_cache.stats()["hits"] >= 3
+
+    event = Event.objects.get(pk=events[2].pk)
+    with django_capture_on_commit_callbacks(execute=True):
+        event.title = "Moved to the first week"
+        event.start -= timedelta(days=7)
+        event.end -= timedelta(days=7)
+        event.save()
+
+    # Both weeks the event has been in are loaded again, and the rows of the others are kept
+    misses = calendar_week_cache.stats()["misses"]
+    with django_assert_num_queries(1):
+        assert titles() == ["First week", "Moved to the first week"]
+    assert calendar_week_cache.stats()["misses"] == misses + 2
+
+    assert titles(person.id) == []
+    with django_capture_on_commit_callbacks(execute=True):
+        events[1].people.add(person)
+    assert titles(person.id) == ["First week"]
+    assert titles() == sorted(row["name"] for row in calendar_rows(*period))
+
+
+@pytest.mark.parametrize("use_redis, loads", [(False, 2), (True, 1)])
+def test_calendar_weeks_are_cached_briefly_without_redis(
+    settings, tz, use_redis, loads
+):
+    """Test that without Redis, where the cache of each worker is invalidated by its own changes only, weeks expire"""
+    settings.USE_REDIS = use_redis
+    cache.clear()
+    week_cache = CalendarWeekCache(timeout=600, local_timeout=0)
+    monday = tz.localize(datetime(2025, 1, 6, 9, 0))
+    loaded = []
+
+    def load(start, end):
+        loaded.append((start, end))
+        return [
+            {
+                "name": "Unit Test",
+                "starts": monday.isoformat(),
+                "ends": (monday + timedelta(hours=2)).isoformat(),
+            }
+        ]
+
+    period = (tz.localize(datetime(2025, 1, 6)), tz.localize(datetime(2025, 1, 13)))
+    for _ in range(2):
+        assert [
+            row["name"]
+            for row in json.loads(week_cache.rows_json(*period, "all", load))
+        ] == ["Unit Test"]
+    assert len(loaded) == loads
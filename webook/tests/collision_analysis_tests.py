@@ -0,0 +1,669 @@
+import json
+import random
+from datetime import date, datetime, time as time_of_day, timedelta
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+from django.utils.timezone import override as timezone_override
+from pytz import utc
+
+from webook.arrangement.dto.event import EventDTO
+from webook.arrangement.facilities.calendar.analysis_strategies import (
+    generate_collision_analysis_report,
+)
+from webook.arrangement.models import (
+    CollisionAnalysisRecord,
+    Event,
+    EventSerie,
+    PlanManifest,
+    Room,
+)
+from webook.arrangement.tests.factories import (
+    ArrangementFactory,
+    PersonFactory,
+    RoomFactory,
+)
+import webook.utils.collision_analysis as collision_analysis
+from webook.utils.collision_analysis import (
+    CollisionRecord,
+    RoomCalendar,
+    _analyze_multiple_events,
+    analyze_batch_collisions,
+    analyze_collisions,
+    analyze_serie_collisions,
+    explode_rigging_events,
+    iter_ndjson,
+    iter_serie_collisions,
+)
+from webook.utils.room_occupancy import room_occupancy_index
+
+
+def _event(id, title, start, end, rooms=()):
+    return SimpleNamespace(
+        id=id,
+        title=title,
+        start=start,
+        end=end,
+        rooms=list(rooms),
+        is_collision=False,
+        serie_positional_hash=f"sph-{title}",
+        sph_of_root_event=None,
+    )
+
+
+def _room_calendars(tz, rng: random.Random, room_count: int, events_per_room: int):
+    first = tz.localize(datetime(2025, 1, 1, 8, 0))
+    calendars = {}
+    for room_id in range(1, room_count + 1):
+        events = []
+        for i in range(events_per_room):
+            start = first + timedelta(minutes=15 * rng.randrange(365 * 24 * 4))
+            end = start + timedelta(minutes=15 * rng.randrange(1, 5 * 4))
+            # Events are read from the database in UTC
+            events.append(
+                _event(
+                    room_id * 100000 + i,
+                    f"Existing {i}",
+                    start.astimezone(utc),
+                    end.astimezone(utc),
+                )
+            )
+        calendars[room_id] = RoomCalendar(
+            SimpleNamespace(id=room_id, name=f"Room {room_id}"), events
+        )
+    return calendars
+
+
+def _weekly_serie(tz, rooms):
+    first = tz.localize(datetime(2025, 1, 6, 9, 0))
+    return [
+        _event(
+            None,
+            f"Serie {week}",
+            first + timedelta(weeks=week),
+            first + timedelta(weeks=week, hours=3),
+            rooms,
+        )
+        for week in range(52)
+    ]
+
+
+def _analyze_by_comparing_all(events, rooms, room_ids):
+    """Reference implementation; compares every event against every event in each room"""
+    records = []
+    for event in events:
+        for room_id in [value for value in room_ids if value in event.rooms]:
+            room_calendar = rooms[room_id]
+            for r_event in room_calendar.events:
+                if event.id is not None and r_event.id == event.id:
+                    continue
+                if r_event.start < event.end and r_event.end > event.start:
+                    records.append(
+                        CollisionRecord(
+                            event_a_title=event.title,
+                            event_a_start=event.start,
+                            event_a_end=event.end,
+                            event_b_title=r_event.title,
+                            event_b_start=r_event.start,
+                            event_b_end=r_event.end,
+                            contested_resource_id=room_calendar.room.id,
+                            contested_resource_name=room_calendar.room.name,
+                            my_serie_position_hash=event.serie_positional_hash,
+                            parent_serie_position_hash=event.sph_of_root_event,
+                            is_rigging=None,
+                            event_a_id=event.id,
+                            event_b_id=r_event.id,
+                        )
+                    )
+    return records
+
+
+def test_analyze_multiple_events_matches_comparing_all(tz):
+    """Test that the indexed collision analysis gives the same records, in the same order, as comparing all events"""
+    rng = random.Random(7)
+    for _ in range(20):
+        rooms = _room_calendars(tz, rng, room_count=3, events_per_room=300)
+        events = _weekly_serie(tz, rooms=[1, 3])
+        # Some events of the serie may already exist, and should not collide with themselves
+        events[5].id = rooms[1].events[0].id
+        rooms[1].events[0].start, rooms[1].events[0].end = (
+            events[5].start,
+            events[5].end,
+        )
+        # A booking that spans most of the year, and one that ends before it starts
+        rooms[2].events[0].end = rooms[2].events[0].start + timedelta(days=300)
+        rooms[3].events[0].start, rooms[3].events[0].end = (
+            rooms[3].events[0].end,
+            rooms[3].events[0].start,
+        )
+
+        expected = _analyze_by_comparing_all(events, rooms, [1, 2, 3])
+        actual = _analyze_multiple_events(events, rooms, [1, 2, 3])
+
+        assert actual == expected
+        assert [event.is_collision for event in events] == [
+            any(record.event_a_title == event.title for record in expected)
+            for event in events
+        ]
+
+
+def test_analyze_multiple_events_against_a_busy_room(tz):
+    """Test a year long weekly serie against a busy room with a year long booking, where comparing all events is slow"""
+    rng = random.Random(7)
+    rooms = _room_calendars(tz, rng, room_count=1, events_per_room=20000)
+    year_long = rooms[1].events[0]
+    year_long.start = tz.localize(datetime(2025, 1, 1)).astimezone(utc)
+    year_long.end = year_long.start + timedelta(days=365)
+    events = _weekly_serie(tz, rooms=[1])
+
+    expected = _analyze_by_comparing_all(events, rooms, [1])
+    actual = _analyze_multiple_events(events, rooms, [1])
+
+    assert actual == expected
+    assert all(
+        any(
+            record.event_a_title == event.title and record.event_b_id == year_long.id
+            for record in actual
+        )
+        for event in events
+    )
+
+
+def test_analyze_multiple_events_against_empty_calendars(tz):
+    """Test that events in rooms without bookings, or in no rooms at all, collide with nothing"""
+    rooms = {1: RoomCalendar(SimpleNamespace(id=1, name="Room 1"), [])}
+    events = _weekly_serie(tz, rooms=[1]) + _weekly_serie(tz, rooms=[])
+
+    assert _analyze_multiple_events(events, rooms, [1]) == []
+    assert not any(event.is_collision for event in events)
+
+
+def test_iter_ndjson_summarizes_no_records(tz):
+    """Test that a stream without records has the summary line only"""
+    assert [json.loads(line) for line in iter_ndjson([], tz)] == [
+        {
+            "summary": {
+                "count": 0,
+                "earliest": None,
+                "latest": None,
+                "resources": [],
+            }
+        }
+    ]
+
+
+@pytest.mark.django_db
+def test_analyze_collisions_loads_room_calendars_in_one_query(
+    no_search_indexing,
+    shared_room_occupancy,
+    room_occupancy_history,
+    tz,
+    location,
+    arrangement,
+    create_events,
+    django_assert_num_queries,
+):
+    """
+    Test that the calendars of all exclusive rooms are loaded in one query, leaving out archived and ignored events
+    """
+    serie = EventSerie.objects.create(
+        arrangement=arrangement,
+        serie_plan_manifest=PlanManifest.objects.create(
+            start_date=date(2025, 1, 6),
+            start_time=datetime(2025, 1, 6, 9).time(),
+            end_time=datetime(2025, 1, 6, 12).time(),
+        ),
+    )
+    rooms = [RoomFactory(location=location, is_exclusive=True) for _ in range(12)]
+    RoomFactory(name="Shared", location=location)
+
+    first = tz.localize(datetime(2025, 1, 6, 9, 0))
+    create_events(
+        (
+            Event(
+                title=f"Booked {i}",
+                start=first + timedelta(days=i),
+                end=first + timedelta(days=i, hours=2),
+                is_archived=i == 1,
+                serie=serie if i == 2 else None,
+            )
+            for i in range(4)
+        ),
+        rooms=rooms,
+    )
+
+    room_occupancy_index.clear()
+    bookings = room_occupancy_index.bookings(
+        [room.id for room in rooms],
+        first,
+        first + timedelta(days=7),
+        ignore_serie_pk=serie.pk,
+    )
+    assert set(bookings) == {room.id for room in rooms}
+    assert all(
+        [title for _, title, _, _ in room_bookings] == ["Booked 0", "Booked 3"]
+        for room_bookings in bookings.values()
+    )
+
+    # Drop the rooms from the index and their mirrors, such that they are loaded from the database
+    room_occupancy_index.clear()
+    cache.clear()
+    events = _weekly_serie(tz, rooms=[room.id for room in Room.objects.all()])[:2]
+    # One query for the exclusive rooms, one for all of their calendars, and one for the virtual series booking them
+    with django_assert_num_queries(3):
+        records = analyze_collisions(events, ignore_serie_pk=serie.pk)
+
+    assert len(records) == len(rooms)
+    assert {record.event_b_title for record in records} == {"Booked 0"}
+    assert [event.is_collision for event in events] == [True, False]
+
+    # Once loaded, the calendars are served from the room occupancy index
+    events = _weekly_serie(tz, rooms=[room.id for room in Room.objects.all()])[:2]
+    with django_assert_num_queries(1):
+        assert len(analyze_collisions(events, ignore_serie_pk=serie.pk)) == len(rooms)
+
+
+@pytest.mark.django_db
+def test_analyze_collisions_finds_double_booked_people(
+    no_search_indexing,
+    room_occupancy_history,
+    tz,
+    location,
+    arrangement,
+    create_events,
+    django_assert_num_queries,
+):
+    """Test that people are analyzed alongside rooms, and that a report of the collisions is created in bulk"""
+    other_arrangement = ArrangementFactory(
+        name="Other", location=location, audience=arrangement.audience
+    )
+    room = RoomFactory(name="Room", location=location, is_exclusive=True)
+    shared_room = RoomFactory(name="Shared", location=location)
+    people = [PersonFactory(last_name=f"Tester {i}") for i in range(3)]
+
+    first = tz.localize(datetime(2025, 1, 6, 9, 0))
+
+    def at(title, hours, **kwargs):
+        return Event(
+            title=title,
+            start=first + timedelta(hours=hours),
+            end=first + timedelta(hours=hours + 2),
+            **kwargs,
+        )
+
+    (focused,) = create_events([at("Focused", 0)], rooms=[room], people=people[:2])
+    (booked,) = create_events(
+        [at("Booked", 1, arrangement=other_arrangement)],
+        rooms=[shared_room],
+        people=people[:1],
+    )
+    create_events(
+        [at("Elsewhere", 4, arrangement=other_arrangement)], people=people[1:2]
+    )
+
+    room_occupancy_index.clear()
+    candidate = EventDTO(
+        title="Candidate",
+        start=first + timedelta(hours=1, minutes=30),
+        end=first + timedelta(hours=2, minutes=30),
+        rooms=[room.id, shared_room.id],
+        people=[people[0].id, people[2].id],
+    )
+    # One query for the exclusive rooms, one for their calendars, and one for the calendars of all the people, along
+    # with one each for the virtual series booking the rooms and the people
+    with django_assert_num_queries(5):
+        records = analyze_collisions([candidate])
+
+    assert sorted(
+        (record.dimension, record.contested_resource_name, record.event_b_title)
+        for record in records
+    ) == [
+        (CollisionAnalysisRecord.DIMENSION_PERSON, "Unit Tester 0", "Booked"),
+        (CollisionAnalysisRecord.DIMENSION_PERSON, "Unit Tester 0", "Focused"),
+        (CollisionAnalysisRecord.DIMENSION_ROOM, "Room", "Focused"),
+    ]
+    assert candidate.is_collision
+
+    report = generate_collision_analysis_report(arrangement)
+    assert [
+        (
+            record.dimension,
+            record.originator_event_id,
+            record.collided_with_event_id,
+            record.conflicted_person_id,
+            record.conflicted_room_id,
+        )
+        for record in report.records.all()
+    ] == [
+        (
+            CollisionAnalysisRecord.DIMENSION_PERSON,
+            focused.id,
+            booked.id,
+            people[0].id,
+            None,
+        )
+    ]
+
+
+def _serie_occurrences(tz, rooms, end_time_of_week=None):
+    """A weekly serie of events with a rigging event before each, as the collision analysis endpoints build them"""
+    first = tz.localize(datetime(2025, 1, 6, 9, 0))
+    events = []
+    for week in range(30):
+        start = first + timedelta(weeks=week)
+        end = start + timedelta(hours=3)
+        if end_time_of_week and week in end_time_of_week:
+            end = end_time_of_week[week]
+
+        root = EventDTO(title=f"Serie {week}", start=start, end=end, rooms=rooms)
+        root.serie_positional_hash = f"sph-{week}-{end.isoformat()}"
+        rigging = EventDTO(
+            title=f"Rigging {week}",
+            start=start - timedelta(hours=1),
+            end=start,
+            rooms=rooms,
+            is_rigging=True,
+            sph_of_root_event=root.serie_positional_hash,
+            serie_positional_hash=f"rigging-{root.serie_positional_hash}",
+        )
+        events += [rigging, root]
+    return events
+
+
+@pytest.mark.django_db
+def test_analyze_serie_collisions_reanalyzes_changed_occurrences_only(
+    no_search_indexing, shared_room_occupancy, tz, location, create_events, monkeypatch
+):
+    """Test that analyzing an edited serie only analyzes the occurrences that changed, with the same results"""
+    room = RoomFactory(location=location, is_exclusive=True)
+    first = tz.localize(datetime(2025, 1, 6, 9, 0))
+    create_events(
+        (
+            Event(
+                title=f"Booked {week}",
+                start=first + timedelta(weeks=week, hours=2, minutes=30),
+                end=first + timedelta(weeks=week, hours=4),
+            )
+            for week in (3, 10)
+        ),
+        rooms=[room],
+    )
+    room_occupancy_index.clear()
+
+    expected = analyze_collisions(_serie_occurrences(tz, [room.id]))
+
+    analyzed = []
+    iter_collisions = collision_analysis.iter_collisions
+
+    def counting_analysis(events, *args, **kwargs):
+        if events:
+            analyzed.append(len(events))
+        return iter_collisions(events, *args, **kwargs)
+
+    monkeypatch.setattr(collision_analysis, "iter_collisions", counting_analysis)
+
+    serie_uuid = "unit-test-incremental"
+    records = analyze_serie_collisions(serie_uuid, _serie_occurrences(tz, [room.id]))
+    assert analyzed == [60]
+    assert records == expected
+    assert [record.event_b_title for record in records] == ["Booked 3", "Booked 10"]
+
+    # Ending one occurrence earlier moves it out of its collision; only it is analyzed again
+    edited = _serie_occurrences(
+        tz, [room.id], end_time_of_week={3: first + timedelta(weeks=3, hours=2)}
+    )
+    records = analyze_serie_collisions(serie_uuid, edited)
+    assert analyzed == [60, 2]
+    assert [record.event_b_title for record in records] == ["Booked 10"]
+    assert [event.is_collision for event in edited].count(True) == 1
+
+    # A change to the bookings of the room makes the serie be analyzed in full again
+    room_occupancy_index.invalidate([room.id])
+    assert analyze_serie_collisions(serie_uuid, edited) == records
+    assert analyzed == [60, 2, 60]
+
+
+@pytest.mark.django_db
+def test_analyze_serie_collisions_reuses_records_only_with_shared_versions(
+    no_search_indexing,
+    settings,
+    tz,
+    arrangement,
+    person,
+    monkeypatch,
+    django_capture_on_commit_callbacks,
+):
+    """
+    Test that the records of a serie are reused only where the versions of bookings are shared between processes, and
+    that changes to the bookings of the people of the serie have it analyzed again
+    """
+
+    def occurrences():
+        events = _serie_occurrences(tz, [])
+        for event in events:
+            event.people = [person.id]
+        return events
+
+    analyzed = []
+    iter_collisions = collision_analysis.iter_collisions
+
+    def counting_analysis(events, *args, **kwargs):
+        if events:
+            analyzed.append(len(events))
+        return iter_collisions(events, *args, **kwargs)
+
+    monkeypatch.setattr(collision_analysis, "iter_collisions", counting_analysis)
+    serie_uuid = "unit-test-shared-versions"
+
+    # Without Redis another worker could have booked the person unseen; the serie is analyzed in full every time
+    settings.USE_REDIS = False
+    analyze_serie_collisions(serie_uuid, occurrences())
+    analyze_serie_collisions(serie_uuid, occurrences())
+    assert analyzed == [60, 60]
+
+    settings.USE_REDIS = True
+    cache.clear()
+    assert analyze_serie_collisions(serie_uuid, occurrences()) == []
+    assert analyze_serie_collisions(serie_uuid, occurrences()) == []
+    assert analyzed == [60, 60, 60]
+
+    first = tz.localize(datetime(2025, 1, 6, 9, 0))
+    with django_capture_on_commit_callbacks(execute=True):
+        booked = Event.objects.create(
+            title="Booked",
+            arrangement=arrangement,
+            start=first + timedelta(weeks=2),
+            end=first + timedelta(weeks=2, hours=1),
+        )
+        booked.people.add(person)
+
+    records = analyze_serie_collisions(serie_uuid, occurrences())
+    assert analyzed == [60, 60, 60, 60]
+    assert [record.event_b_title for record in records] == ["Booked"]
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_iter_ndjson_streams_records_and_a_summary(
+    no_search_indexing, tz, location, create_events
+):
+    """Test that the NDJSON stream has a line per record, in the given timezone, and ends with a summary"""
+    room = RoomFactory(name="Room", location=location, is_exclusive=True)
+    first = tz.localize(datetime(2025, 1, 6, 9, 0))
+    create_events(
+        (
+            Event(
+                title=f"Booked {week}",
+                start=first + timedelta(weeks=week, hours=1),
+                end=first + timedelta(weeks=week, hours=2),
+            )
+            for week in (2, 7)
+        ),
+        rooms=[room],
+    )
+    room_occupancy_index.clear()
+
+    lines = [
+        json.loads(line)
+        for line in iter_ndjson(
+            iter_serie_collisions(
+                "unit-test-ndjson", _serie_occurrences(tz, [room.id])
+            ),
+            tz,
+        )
+    ]
+
+    assert [line["event_b_title"] for line in lines[:-1]] == ["Booked 2", "Booked 7"]
+    assert lines[0]["event_a_start"] == "2025-01-20T09:00:00+01:00"
+    assert lines[-1] == {
+        "summary": {
+            "count": 2,
+            "earliest": "2025-01-20T09:00:00+01:00",
+            "latest": "2025-02-24T12:00:00+01:00",
+            "resources": [
+                {
+                    "dimension": CollisionAnalysisRecord.DIMENSION_ROOM,
+                    "id": room.id,
+                    "name": "Room",
+                    "count": 2,
+                }
+            ],
+        }
+    }
+
+
+@pytest.mark.django_db
+def test_analyze_batch_collisions_between_manifests(
+    no_search_indexing,
+    room_occupancy_history,
+    tz,
+    location,
+    create_events,
+    django_assert_num_queries,
+):
+    """Test that a batch of series is analyzed against the existing events and against each other, in one load"""
+    room, other_room = [
+        RoomFactory(name=name, location=location, is_exclusive=True)
+        for name in ("Room", "Other room")
+    ]
+    first = tz.localize(datetime(2025, 1, 6, 9, 0))
+    (booking,) = create_events(
+        [
+            Event(
+                title="Booked",
+                start=first + timedelta(weeks=1),
+                end=first + timedelta(weeks=1, hours=1),
+            )
+        ],
+        rooms=[room],
+    )
+    room_occupancy_index.clear()
+
+    mondays = _serie_occurrences(tz, [room.id])[:6]
+    # A serie in the other room, that shares the room with the mondays in its second week
+    others = _serie_occurrences(tz, [other_room.id])[:6]
+    for event in others[2:4]:
+        event.rooms = [room.id, other_room.id]
+
+    # One query for the exclusive rooms, one for their calendars, and one for the virtual series booking them
+    with django_assert_num_queries(3):
+        monday_records, other_records = analyze_batch_collisions(
+            [(mondays, None), (others, None)]
+        )
+
+    expected = [
+        ("Rigging 1", "Rigging 1", others[2].serie_positional_hash),
+        ("Serie 1", "Booked", booking.id),
+        ("Serie 1", "Serie 1", others[3].serie_positional_hash),
+    ]
+    assert [
+        (record.event_a_title, record.event_b_title, record.event_b_id)
+        for record in monday_records
+    ] == expected
+    assert [
+        (record.event_a_title, record.event_b_title, record.event_b_id)
+        for record in other_records
+    ] == [
+        ("Rigging 1", "Rigging 1", mondays[2].serie_positional_hash),
+        ("Serie 1", "Booked", booking.id),
+        ("Serie 1", "Serie 1", mondays[3].serie_positional_hash),
+    ]
+    assert [event.is_collision for event in mondays] == [
+        False,
+        False,
+        True,
+        True,
+        False,
+        False,
+    ]
+
+    # A single batch is analyzed as by analyze_collisions
+    assert analyze_batch_collisions([(_serie_occurrences(tz, [room.id]), None)]) == [
+        analyze_collisions(_serie_occurrences(tz, [room.id]))
+    ]
+
+
+def test_explode_rigging_events_for_a_whole_serie(tz):
+    """Test that the rigging of a serie is exploded in one pass, matching the rigging of its events one by one"""
+    buffers = SimpleNamespace(
+        before_buffer_title=None,
+        before_buffer_date=None,
+        before_buffer_date_offset=1,
+        before_buffer_start=time_of_day(18, 0),
+        before_buffer_end=time_of_day(20, 30),
+        after_buffer_title="Nedrigging",
+        after_buffer_date=None,
+        after_buffer_date_offset=None,
+        after_buffer_start=time_of_day(12, 0),
+        after_buffer_end=None,
+    )
+    # Weekly events across the beginning of daylight saving time, at the end of March
+    starts = [
+        tz.localize(datetime(2025, 3, 17, 9, 0)) + timedelta(weeks=week)
+        for week in range(3)
+    ]
+
+    # Not marked with django_db; accessing the database fails the test
+    exploded = explode_rigging_events(starts, buffers, tz=tz)
+
+    # The after rigging has no end, and is left out
+    assert exploded == {
+        "before": [
+            (
+                tz.localize(datetime(2025, 3, day, 18, 0)),
+                tz.localize(datetime(2025, 3, day, 20, 30)),
+            )
+            for day in (16, 23, 30)
+        ]
+    }
+    assert [start.utcoffset() for start, _ in exploded["before"]] == [
+        timedelta(hours=1),
+        timedelta(hours=1),
+        timedelta(hours=2),
+    ]
+
+    for start, (rigging_start, rigging_end) in zip(starts, exploded["before"]):
+        event = EventDTO(title="Event", start=start, end=start, **vars(buffers))
+        with timezone_override(tz):
+            rigging_events = event.generate_rigging_events()
+        assert set(rigging_events) == {"root", "before"}
+        assert rigging_events["before"].title == "Opprigging for Event"
+        assert (rigging_events["before"].start, rigging_events["before"].end) == (
+            rigging_start,
+            rigging_end,
+        )
+
+    # Rigging with a date of its own is on that date for all the events
+    buffers.after_buffer_end = time_of_day(13, 0)
+    buffers.after_buffer_date = date(2025, 4, 1)
+    assert (
+        explode_rigging_events(starts, buffers, tz=tz)["after"]
+        == [
+            (
+                tz.localize(datetime(2025, 4, 1, 12, 0)),
+                tz.localize(datetime(2025, 4, 1, 13, 0)),
+            )
+        ]
+        * 3
+    )
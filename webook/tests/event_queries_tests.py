@@ -0,0 +1,100 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from webook.arrangement.event_queries import (
+    _compile_calendar_query,
+    calendar_json,
+    calendar_rows,
+)
+from webook.arrangement.models import Event
+from webook.arrangement.tests.factories import PersonFactory, RoomFactory
+
+
+@pytest.mark.django_db
+def test_calendar_rows_aggregate_rooms_and_people_per_event(
+    no_search_indexing,
+    tz,
+    location,
+    arrangement,
+    create_events,
+    django_assert_num_queries,
+):
+    """Test that the calendar query has one row per event, with its rooms and people, and whether it is rigging"""
+    rooms = [
+        RoomFactory(name=name, location=location) for name in ("Hall, East", "Stage")
+    ]
+    people = [PersonFactory(first_name=first_name) for first_name in ("Unit", "Other")]
+    arrangement.responsible = people[0]
+    arrangement.save()
+
+    start = tz.localize(datetime(2025, 1, 6, 9, 0))
+    rigging, event, archived, outside = [
+        Event(
+            title=title,
+            audience=arrangement.audience,
+            responsible=people[0],
+            start=start + offset,
+            end=start + offset + timedelta(hours=1),
+            is_archived=title == "Archived",
+        )
+        for title, offset in (
+            ("Rigging", timedelta(hours=-1)),
+            ("Event", timedelta(0)),
+            ("Archived", timedelta(hours=2)),
+            ("Outside", timedelta(days=7)),
+        )
+    ]
+    create_events([rigging], people=people[1:])
+    event.buffer_before_event = rigging
+    create_events([event], rooms=rooms, people=people)
+    create_events([archived, outside])
+
+    period = (
+        tz.localize(datetime(2025, 1, 6)).isoformat(),
+        tz.localize(datetime(2025, 1, 7)).isoformat(),
+    )
+    with django_assert_num_queries(1):
+        rows = sorted(calendar_rows(*period), key=lambda row: row["event_pk"])
+
+    assert [
+        (
+            row["name"],
+            row["is_rigging"],
+            sorted(row["room_names"]),
+            sorted(row["people_names"]),
+            sorted(row["slug_list"]),
+        )
+        for row in rows
+    ] == [
+        ("Rigging", True, [], ["Other Tester"], [people[1].slug]),
+        (
+            "Event",
+            False,
+            ["Hall, East", "Stage"],
+            ["Other Tester", "Unit Tester"],
+            sorted([room.slug for room in rooms] + [person.slug for person in people]),
+        ),
+    ]
+    assert rows[1]["mainPlannerName"] == "Unit Tester"
+    assert rows[1]["before_buffer_ev_id"] == rigging.id
+
+    assert [
+        row["event_pk"] for row in calendar_rows(*period, person_id=people[0].id)
+    ] == [event.id]
+    assert (
+        json.loads(calendar_json(*period, person_id=people[0].id))[0]["people_names"]
+        == rows[1]["people_names"]
+    )
+
+
+def test_calendar_query_is_aggregated_to_json_on_postgresql():
+    """Test that the calendar query is compiled once per dialect, aggregating the rows into JSON on PostgreSQL"""
+    query = _compile_calendar_query("postgresql", False)
+
+    assert query is _compile_calendar_query("postgresql", False)
+    assert "json_agg(calendar)" in query
+    assert "array_agg(DISTINCT name)" in query
+    assert "person_id = %s" in _compile_calendar_query("postgresql", True)
+    assert "json_group_array(json_object(" in _compile_calendar_query("sqlite", False)
@@ -0,0 +1,136 @@
+from datetime import datetime
+
+import pytest
+from django.contrib.auth.models import Group
+
+from webook.arrangement.models import (
+    Arrangement,
+    ArrangementType,
+    Event,
+    EventSerie,
+    PlanManifest,
+)
+from webook.arrangement.tests.factories import RoomFactory
+from webook.onlinebooking.models import OnlineBookingSettings
+
+
+def _manifest(arrangement: Arrangement, **kwargs) -> dict:
+    """A plan manifest for a serie of the given arrangement, as posted to the event serie API"""
+    return {
+        "arrangement_pk": arrangement.pk,
+        "audience": arrangement.audience_id,
+        "arrangement_type": ArrangementType.objects.create(name="Unit Test").pk,
+        "location": arrangement.location_id,
+        "status": None,
+        "exclusions": [],
+        "expected_visitors": 0,
+        "title": "Unit Test",
+        "pattern": "daily",
+        "pattern_strategy": "daily__every_x_day",
+        "recurrence_strategy": "StopWithin",
+        "start_date": "2025-01-06",
+        "start_time": "09:00",
+        "end_time": "14:00",
+        "stop_within": "2025-01-25",
+        "meeting_place": None,
+        "meeting_place_en": None,
+        "rooms": [],
+        "interval": 1,
+        **kwargs,
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "impossibility",
+    [
+        # A serie of every 0th day never progresses
+        {"interval": 0},
+        # Far more occurrences than the infinite loop threshold allows
+        {
+            "pattern_strategy": "daily__every_weekday",
+            "recurrence_strategy": "StopAfterXInstances",
+            "stop_within": None,
+            "stop_after_x_occurences": 1_000_000,
+        },
+    ],
+)
+def test_impossible_serie_manifests_are_rejected(
+    no_search_indexing, client, user, arrangement, impossibility
+):
+    """
+    Test that the prediction, collision analysis and creation of a serie manifest that can not give a sensible serie
+    are rejected as bad requests, and that no plan manifest is left behind by creating it
+    """
+    user.groups.add(Group.objects.get_or_create(name="planners")[0])
+    client.force_login(user)
+    manifest = _manifest(arrangement, **impossibility)
+
+    def post(path, data):
+        response = client.post(
+            f"/api/arrangement/event_serie/{path}",
+            data,
+            content_type="application/json",
+        )
+        assert response.status_code == 400, path
+        assert response.json()["detail"]
+
+    post("predict", manifest)
+    post("collisionAnalysis", manifest)
+    post("collisionAnalysis/batch", [manifest])
+    post("collisionAnalysis/stream", manifest)
+
+    manifests = PlanManifest.objects.count()
+    post("create", manifest)
+    assert PlanManifest.objects.count() == manifests
+    assert not EventSerie.objects.exists()
+
+
+@pytest.mark.django_db
+def test_serie_manifests_are_analyzed_and_created(
+    no_search_indexing, client, user, person, location, arrangement, create_events, tz
+):
+    """Test that a serie manifest is predicted, analyzed against the existing events, and created as a serie"""
+    OnlineBookingSettings.objects.create(
+        title_format="", location=None, status_type=None, arrangement_type=None
+    )
+    user.person = person
+    user.groups.add(Group.objects.get_or_create(name="planners")[0])
+    user.save()
+    client.force_login(user)
+    room = RoomFactory(name="Room", location=location, is_exclusive=True)
+    create_events(
+        [
+            Event(
+                title="Booked",
+                start=tz.localize(datetime(2025, 1, 8, 13, 0)),
+                end=tz.localize(datetime(2025, 1, 8, 15, 0)),
+            )
+        ],
+        rooms=[room],
+    )
+    manifest = _manifest(arrangement, rooms=[room.id])
+
+    def post(path, data):
+        response = client.post(
+            f"/api/arrangement/event_serie/{path}",
+            data,
+            content_type="application/json",
+        )
+        assert response.status_code == 200, path
+        return response.json()
+
+    assert post("predict", manifest) == {
+        "count": 20,
+        "first_date": "2025-01-06",
+        "last_date": "2025-01-25",
+    }
+    assert [
+        (record["event_b_title"], record["contested_resource_name"])
+        for record in post("collisionAnalysis", manifest)
+    ] == [("Booked", "Room")]
+
+    serie = EventSerie.objects.get(pk=post("create", manifest))
+    assert serie.arrangement == arrangement
+    # The colliding occurrence is left out of the serie
+    assert Event.objects.filter(serie=serie).count() == 19
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from webook.arrangement.models import Event
+from webook.arrangement.periods import PeriodsOverlap, room_bookings
+from webook.arrangement.tests.factories import RoomFactory
+
+
+@pytest.mark.django_db
+def test_overlap_queries_fall_back_to_comparing_start_and_end(
+    no_search_indexing, tz, location, create_events
+):
+    """Test the overlap queries on databases without range indexes, with both ends of the periods inclusive"""
+    room = RoomFactory(location=location)
+
+    first = tz.localize(datetime(2025, 1, 6, 9, 0))
+    create_events(
+        (
+            Event(
+                title=f"Event {i}",
+                start=first + timedelta(hours=i),
+                end=first + timedelta(hours=i + 1),
+                is_archived=i == 2,
+            )
+            for i in range(4)
+        ),
+        rooms=[room],
+    )
+
+    period = (first + timedelta(hours=1), first + timedelta(hours=2, minutes=30))
+    assert sorted(
+        Event.objects.get_in_period(*period).values_list("title", flat=True)
+    ) == ["Event 0", "Event 1"]
+
+    assert [
+        title
+        for _, _, _, _, title, _ in room_bookings([room.id], *period).order_by(
+            "event_id"
+        )
+    ] == ["Event 0", "Event 1"]
+    assert len(room_bookings([room.id])) == 3
+
+
+def test_periods_overlap_compiles_to_range_overlap():
+    """Test that the overlap expression matches the expressions of the GiST period indexes"""
+
+    class Compiler:
+        def compile(self, expression):
+            return expression.name, []
+
+    class Column:
+        def __init__(self, name):
+            self.name = name
+
+        def resolve_expression(self, *args, **kwargs):
+            return self
+
+    overlap = PeriodsOverlap(*[Column(name) for name in ("a", "b", "c", "d")])
+    assert overlap.as_sql(Compiler(), None) == (
+        "tstzrange(least(a, b), greatest(a, b), '[]') && tstzrange(c, d, '[]')",
+        [],
+    )
@@ -0,0 +1,130 @@
+import json
+import re
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from django.db import connection
+
+from webook.arrangement.event_queries import _compile_calendar_query
+from webook.arrangement.models import Event
+from webook.arrangement.periods import room_bookings
+from webook.arrangement.tests.factories import ArrangementFactory, RoomFactory
+
+# Words that may follow the name of a table without being its alias
+_SQL_KEYWORDS = {
+    "AS",
+    "WHERE",
+    "JOIN",
+    "LEFT",
+    "INNER",
+    "ON",
+    "GROUP",
+    "ORDER",
+    "LIMIT",
+    "UNION",
+}
+
+
+def _event_table_names(sql: str) -> List[str]:
+    """Get the names the event table goes by in the given query; its own, and its aliases"""
+    aliases = re.findall(
+        r'\barrangement_event"?\s+(?:AS\s+)?"?(\w+)', sql, re.IGNORECASE
+    )
+    return ["arrangement_event"] + [
+        alias for alias in aliases if alias.upper() not in _SQL_KEYWORDS
+    ]
+
+
+def _sequential_scans_of_events(sql: str, params) -> List[str]:
+    """Get the steps of the plan of the given query that scan the event table sequentially"""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # The seeded dataset is small enough to be scanned; what matters is whether an index can serve the query
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+
+            scans, nodes = [], [plan[0]["Plan"]]
+            while nodes:
+                node = nodes.pop()
+                nodes.extend(node.get("Plans", []))
+                if (
+                    node["Node Type"] == "Seq Scan"
+                    and node["Relation Name"] == "arrangement_event"
+                ):
+                    scans.append(f"Seq Scan on {node['Alias']}")
+            return scans
+
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        names = _event_table_names(sql)
+        return [
+            detail
+            for _, _, _, detail in cursor.fetchall()
+            if any(re.fullmatch(rf"SCAN {name}\b.*", detail) for name in names)
+        ]
+
+
+@pytest.fixture
+def seeded_events(no_search_indexing, tz, location, arrangement, create_events):
+    """A year of events in a few arrangements, some of them archived, and the planner statistics of them"""
+    rooms = [RoomFactory(location=location) for _ in range(5)]
+    arrangements = [arrangement] + [
+        ArrangementFactory(
+            name=f"Arrangement {i}", location=location, audience=arrangement.audience
+        )
+        for i in range(1, 4)
+    ]
+
+    first = tz.localize(datetime(2025, 1, 1, 9, 0))
+    events = [
+        Event(
+            title=f"Event {i}",
+            arrangement=arrangements[i % len(arrangements)],
+            start=first + timedelta(hours=i * 7),
+            end=first + timedelta(hours=i * 7 + 1),
+            is_archived=i % 10 == 0,
+        )
+        for i in range(1250)
+    ]
+    for i, room in enumerate(rooms):
+        create_events(events[i :: len(rooms)], rooms=[room])
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+    return arrangements, rooms
+
+
+@pytest.mark.django_db
+def test_calendar_and_collision_queries_do_not_scan_the_event_table(seeded_events, tz):
+    """Test that the key queries on events are served by indexes, rather than by a scan of the event table"""
+    arrangements, rooms = seeded_events
+    start = tz.localize(datetime(2025, 3, 3))
+    end = start + timedelta(days=7)
+
+    queries = {
+        "events in period": Event.objects.get_in_period(start, end).query,
+        "events of arrangement": Event.objects.filter(arrangement=arrangements[0])
+        .order_by("start")
+        .query,
+        "events of arrangement in period": Event.objects.filter(
+            arrangement=arrangements[0], start__gte=start, start__lte=end
+        ).query,
+        "room bookings in period": room_bookings([rooms[0].id], start, end).query,
+    }
+    plans = {
+        name: _sequential_scans_of_events(*query.sql_with_params())
+        for name, query in queries.items()
+    }
+
+    adapted = [
+        connection.ops.adapt_datetimefield_value(value) for value in (start, end)
+    ]
+    plans["calendar"] = _sequential_scans_of_events(
+        _compile_calendar_query(connection.vendor, False), adapted
+    )
+
+    assert plans == {name: [] for name in plans}
@@ -0,0 +1,105 @@
+from datetime import datetime, time, timedelta
+
+import numpy as np
+import pytest
+
+from webook.arrangement.models import BusinessHour, Event
+from webook.arrangement.tests.factories import RoomFactory
+from webook.utils.room_availability import (
+    SLOT,
+    FreeWindow,
+    _bookings_bitmap,
+    find_free_windows,
+)
+from webook.utils.room_occupancy import room_occupancy_index
+
+
+@pytest.fixture
+def at(tz):
+    """The wall time of the given day of January 2025"""
+
+    def at(day, hour, minute=0):
+        return tz.localize(datetime(2025, 1, day, hour, minute))
+
+    return at
+
+
+def test_bookings_bitmap_rounds_bookings_out_to_whole_slots(at):
+    """Test that a booking occupies every slot it overlaps, even partially"""
+    start = at(6, 8)
+    bitmap = _bookings_bitmap(
+        [
+            (start + timedelta(minutes=7), start + timedelta(minutes=11)),
+            (start - timedelta(hours=1), start + SLOT),
+        ],
+        start,
+        6,
+    )
+
+    assert bitmap.tolist() == [False, False, False, True, True, True]
+    assert np.all(_bookings_bitmap([], start, 6))
+
+
+@pytest.mark.django_db
+def test_find_free_windows_across_rooms_and_people(
+    no_search_indexing,
+    room_occupancy_history,
+    tz,
+    at,
+    location,
+    person,
+    create_events,
+    django_assert_num_queries,
+):
+    """Test that free windows are where all rooms and people are free, within the business hours of the rooms"""
+    room_a, room_b = [RoomFactory(name=name, location=location) for name in ("A", "B")]
+    room_a.business_hours.set(
+        [
+            BusinessHour.objects.create(
+                day_of_week=day,
+                start_of_business_hours=time(8),
+                end_of_business_hours=time(16),
+            )
+            for day in range(5)
+        ]
+    )
+
+    create_events([Event(title="A", start=at(6, 8), end=at(6, 10))], rooms=[room_a])
+    create_events(
+        [Event(title="B", start=at(6, 11), end=at(6, 12, 30))], rooms=[room_b]
+    )
+    create_events(
+        [Event(title="Person", start=at(6, 13), end=at(6, 14))], people=[person]
+    )
+
+    room_occupancy_index.clear()
+    # One query for the bookings of the rooms, one for those of the people, one each for the virtual series booking
+    # them, and one for each of their business hours
+    with django_assert_num_queries(6):
+        windows = find_free_windows(
+            [room_a.id, room_b.id],
+            timedelta(hours=2),
+            at(6, 0),
+            at(9, 0),
+            person_ids=[person.id],
+            count=2,
+            tz=tz,
+        )
+
+    assert windows == [
+        FreeWindow(start=at(6, 14), end=at(6, 16), free_until=at(6, 16)),
+        FreeWindow(start=at(7, 8), end=at(7, 10), free_until=at(7, 16)),
+    ]
+
+    # Without the person, the run from the end of the booking of room B is long enough
+    assert find_free_windows(
+        [room_a.id, room_b.id],
+        timedelta(minutes=90),
+        at(6, 0),
+        at(9, 0),
+        count=1,
+        tz=tz,
+    ) == [FreeWindow(start=at(6, 12, 30), end=at(6, 14), free_until=at(6, 16))]
+
+    with pytest.raises(ValueError):
+        find_free_windows([room_a.id], timedelta(0), at(6, 0), at(9, 0))
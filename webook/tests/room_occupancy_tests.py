@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db.models.signals import post_save
+from django.utils.timezone import now as timezone_now
+
+from webook.arrangement.models import Event
+from webook.arrangement.tests.factories import RoomFactory
+from webook.utils.room_occupancy import RoomOccupancyIndex, room_occupancy_index
+
+
+def _titles(room, start, end):
+    return [
+        title
+        for _, title, _, _ in room_occupancy_index.bookings([room.id], start, end)[
+            room.id
+        ]
+    ]
+
+
+@pytest.mark.django_db
+def test_room_occupancy_index_is_maintained_from_signals(
+    no_search_indexing,
+    shared_room_occupancy,
+    room_occupancy_history,
+    tz,
+    location,
+    create_events,
+    django_assert_num_queries,
+    django_capture_on_commit_callbacks,
+):
+    """Test that changes to the bookings of a loaded room are applied to the index, without reloading the room"""
+    room = RoomFactory(location=location)
+
+    start = tz.localize(datetime(2025, 1, 6, 9, 0))
+    first, second = create_events(
+        Event(
+            title=title,
+            start=start + timedelta(days=i),
+            end=start + timedelta(days=i, hours=2),
+        )
+        for i, title in enumerate(["First", "Second"])
+    )
+    period = (start, start + timedelta(days=7))
+
+    room_occupancy_index.clear()
+    # One query for the bookings of the room, and one for the virtual series booking it
+    with django_assert_num_queries(2):
+        assert _titles(room, *period) == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first.rooms.add(room)
+        second.rooms.add(room)
+    with django_assert_num_queries(0):
+        assert _titles(room, *period) == ["First", "Second"]
+
+    # Queryset updates send no signals of their own; the saved instance is announced by hand
+    Event.objects.filter(pk=second.pk).update(start=start + timedelta(days=8))
+    second.start = start + timedelta(days=8)
+    second.end = start + timedelta(days=8, hours=2)
+    with django_capture_on_commit_callbacks(execute=True):
+        post_save.send(sender=Event, instance=second, created=False)
+    with django_assert_num_queries(0):
+        assert _titles(room, *period) == ["First"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first.rooms.remove(room)
+    with django_assert_num_queries(0):
+        assert _titles(room, *period) == []
+
+    # Changes to the events of the room from the side of the room invalidate the room
+    with django_capture_on_commit_callbacks(execute=True):
+        room.event_set.add(first)
+    with django_assert_num_queries(2):
+        assert _titles(room, *period) == ["First"]
+
+    assert room_occupancy_index.stats()["rooms"] == 1
+
+
+@pytest.mark.django_db
+def test_room_occupancy_index_holds_bookings_after_its_horizon(
+    no_search_indexing,
+    shared_room_occupancy,
+    location,
+    create_events,
+    django_assert_num_queries,
+):
+    """Test that past bookings are left out of the index, and that queries before the horizon go to the database"""
+    room = RoomFactory(location=location)
+
+    now = timezone_now().replace(microsecond=0)
+    create_events(
+        (
+            Event(title=title, start=now + start, end=now + end)
+            for title, start, end in (
+                ("Past", timedelta(days=-100), timedelta(days=-100, hours=2)),
+                ("Ongoing", timedelta(days=-200), timedelta(days=10)),
+                ("Upcoming", timedelta(days=2), timedelta(days=2, hours=2)),
+            )
+        ),
+        rooms=[room],
+    )
+
+    room_occupancy_index.clear()
+    upcoming = (now, now + timedelta(days=7))
+    with django_assert_num_queries(2):
+        assert _titles(room, *upcoming) == ["Ongoing", "Upcoming"]
+    assert room_occupancy_index.stats()["bookings"] == 2
+
+    past = (now - timedelta(days=101), now - timedelta(days=99))
+    with django_assert_num_queries(1):
+        assert _titles(room, *past) == ["Past", "Ongoing"]
+    with django_assert_num_queries(0):
+        assert _titles(room, *upcoming) == ["Ongoing", "Upcoming"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("use_redis", [False, True])
+def test_room_occupancy_changes_are_seen_by_other_processes(
+    no_search_indexing,
+    room_occupancy_history,
+    settings,
+    tz,
+    location,
+    create_events,
+    use_redis,
+):
+    """Test that a change to the bookings of a room through one index is seen through another, as in another worker"""
+    settings.USE_REDIS = use_redis
+    cache.clear()
+    room = RoomFactory(location=location)
+    start = tz.localize(datetime(2025, 1, 6, 9, 0))
+    (event,) = create_events(
+        [Event(title="Booked", start=start, end=start + timedelta(hours=2))],
+        rooms=[room],
+    )
+
+    history = timedelta(days=3653)
+    worker, other_worker = RoomOccupancyIndex(300, history), RoomOccupancyIndex(
+        300, history
+    )
+    period = (start, start + timedelta(days=1))
+
+    def titles(index):
+        return [title for _, title, _, _ in index.bookings([room.id], *period)[room.id]]
+
+    assert titles(worker) == titles(other_worker) == ["Booked"]
+
+    Event.objects.filter(pk=event.pk).update(start=start + timedelta(days=7))
+    event.start = start + timedelta(days=7)
+    event.end = start + timedelta(days=7, hours=2)
+    worker.event_changed(event, [room.id])
+
+    assert titles(worker) == []
+    assert titles(other_worker) == []
+    cache.clear()
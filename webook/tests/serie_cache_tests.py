@@ -0,0 +1,53 @@
+from datetime import date, time
+
+from pytz import timezone
+
+from webook.arrangement.models import PlanManifest
+from webook.utils.serie_cache import SerieExpansionCache, serie_cache_key
+import webook.utils.serie_calculator as sc
+
+
+def _manifest(**kwargs) -> PlanManifest:
+    return PlanManifest(
+        pattern="daily",
+        title="Unit Test",
+        pattern_strategy="daily__every_x_day",
+        recurrence_strategy="StopWithin",
+        start_time=time(9, 0),
+        end_time=time(14, 0),
+        start_date=date(2024, 11, 1),
+        stop_within=date(2024, 11, 30),
+        interval=1,
+        **kwargs,
+    )
+
+
+def test_serie_cache_key_covers_expansion_fields():
+    """Test that manifests that expand differently get different keys, and equal manifests get equal keys"""
+    tz = timezone("Europe/Oslo")
+    key = serie_cache_key(_manifest(), tz)
+
+    assert key == serie_cache_key(_manifest(), tz)
+    assert key != serie_cache_key(_manifest(arbitrator=2), tz)
+    assert key != serie_cache_key(_manifest(), timezone("UTC"))
+    assert key != serie_cache_key(_manifest(), tz, [date(2024, 11, 5)])
+
+
+def test_serie_cache_copy_on_read_and_eviction():
+    """Test that cached expansions are handed out as copies, and that the cache is bounded by event count"""
+    cache = SerieExpansionCache(max_events=40)
+    tz = timezone("Europe/Oslo")
+
+    first = cache.get_or_calculate(_manifest(), tz, None, sc._calculate_serie)
+    first[0].is_collision = True
+    second = cache.get_or_calculate(_manifest(), tz, None, sc._calculate_serie)
+
+    assert second == first
+    assert not hasattr(second[0], "is_collision")
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    # 30 + 30 events does not fit within 40, so the least recently used expansion is evicted
+    cache.get_or_calculate(_manifest(monday=True), tz, None, sc._calculate_serie)
+    assert cache.stats()["entries"] == 1
+    cache.get_or_calculate(_manifest(), tz, None, sc._calculate_serie)
+    assert cache.stats()["misses"] == 3
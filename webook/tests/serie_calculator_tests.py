@@ -257,3 +257,263 @@ def test_generate_with_non_standard_tz():
 
     results: list = sc.calculate_serie(serie_manifest=manifest, tz=tz)
     assert results[0].start.tzinfo.zone == "America/New_York"
+
+
+def test_iter_serie_matches_calculate_serie_in_window():
+    """Test that the windowed generator yields the same events as calculate_serie does in the window"""
+    tz = timezone("Europe/Oslo")
+    manifests = [
+        PlanManifest(
+            pattern="weekly",
+            title="Unit Test",
+            pattern_strategy="weekly__standard",
+            recurrence_strategy="StopWithin",
+            start_time=time(9, 0),
+            end_time=time(14, 0),
+            start_date=date(2024, 11, 1),
+            stop_within=date(2026, 11, 30),
+            interval=2,
+            monday=True,
+            wednesday=True,
+        ),
+        PlanManifest(
+            pattern="daily",
+            title="Unit Test",
+            pattern_strategy="daily__every_weekday",
+            recurrence_strategy="StopAfterXInstances",
+            start_time=time(9, 0),
+            end_time=time(14, 0),
+            start_date=date(2024, 11, 3),
+            stop_after_x_occurences=300,
+        ),
+        PlanManifest(
+            pattern="monthly",
+            title="Unit Test",
+            pattern_strategy="month__every_arbitrary_date_of_month",
+            recurrence_strategy="NoStopDate",
+            start_time=time(9, 0),
+            end_time=time(14, 0),
+            start_date=date(2024, 10, 2),
+            project_x_months_into_future=36,
+            interval=1,
+            arbitrator=4,
+        ),
+    ]
+
+    window_start = tz.localize(datetime(2025, 3, 1))
+    window_end = tz.localize(datetime(2025, 4, 1))
+
+    for manifest in manifests:
+        expected = [
+            (e.start, e.end)
+            for e in sc.calculate_serie(serie_manifest=manifest)
+            if e.end > window_start and e.start < window_end
+        ]
+        results = [
+            (e.start, e.end) for e in sc.iter_serie(manifest, window_start, window_end)
+        ]
+
+        assert len(expected) > 0
+        assert results == expected
+
+
+def test_iter_serie_seeks_past_cycle_threshold():
+    """Test that the windowed generator does not cycle through the serie leading up to the window"""
+    manifest = PlanManifest(
+        pattern="daily",
+        title="Unit Test",
+        pattern_strategy="daily__every_x_day",
+        recurrence_strategy="StopWithin",
+        start_time=time(9, 0),
+        end_time=time(14, 0),
+        start_date=date(2024, 1, 1),
+        stop_within=date(2070, 12, 31),
+        interval=1,
+    )
+
+    # Cycling from the start of the serie would trip the infinite loop threshold long before reaching 2065
+    results = list(sc.iter_serie(manifest, date(2065, 3, 1), date(2065, 4, 1)))
+
+    assert len(results) == 31
+    assert results[0].start == timezone("Europe/Oslo").localize(
+        datetime(2065, 3, 1, 9, 0)
+    )
+
+
+def test_vectorized_expansion_matches_cycling():
+    """Test that the vectorized strategies produce the exact same events as cycling does, also across DST transitions"""
+    tz = timezone("America/New_York")
+
+    def cycled(manifest):
+        scope = sc._get_scope(manifest, tz)
+        cursor = sc._CycleCursor(
+            cycle=0,
+            date=tz.localize(datetime.combine(scope.start_date, datetime.min.time())),
+            instances=0,
+            occurrences=0,
+        )
+        events = list(sc._run_cycles(manifest, scope, cursor, tz))
+        if scope.stop_within_date:
+            events = [
+                e for e in events if e.start.date() <= scope.stop_within_date.date()
+            ]
+        if scope.instance_limit:
+            events = events[: scope.instance_limit]
+        return events
+
+    for pattern_strategy in sc.vectorized_strategies:
+        for recurrence_strategy in ["StopWithin", "StopAfterXInstances", "NoStopDate"]:
+            manifest = PlanManifest(
+                pattern="vectorized",
+                title="Unit Test",
+                pattern_strategy=pattern_strategy,
+                recurrence_strategy=recurrence_strategy,
+                start_time=time(2, 30),
+                end_time=time(23, 30),
+                start_date=date(2024, 2, 28),
+                stop_within=date(2025, 11, 3),
+                stop_after_x_occurences=250,
+                project_x_months_into_future=14,
+                interval=3,
+                tuesday=True,
+                saturday=True,
+                sunday=True,
+            )
+
+            expected = [(e.start, e.end, e.start.tzinfo) for e in cycled(manifest)]
+            results = [
+                (e.start, e.end, e.start.tzinfo)
+                for e in sc.calculate_serie(serie_manifest=manifest, tz=tz)
+            ]
+
+            assert len(expected) > 0
+            assert results == expected
+
+
+def test_calculate_serie_with_exclusions():
+    """Test that events on excluded dates are left out, both for vectorized and cycled patterns"""
+    exclusions = [date(2024, 11, 5), date(2024, 12, 2)]
+
+    for pattern_strategy in [
+        "daily__every_weekday",
+        "month__every_x_day_every_y_month",
+    ]:
+        manifest = PlanManifest(
+            pattern="exclusions",
+            title="Unit Test",
+            pattern_strategy=pattern_strategy,
+            recurrence_strategy="StopWithin",
+            start_time=time(9, 0),
+            end_time=time(14, 0),
+            start_date=date(2024, 11, 1),
+            stop_within=date(2024, 12, 31),
+            interval=1,
+            day_of_month=2,
+        )
+
+        all_events = sc.calculate_serie(serie_manifest=manifest)
+        results = sc.calculate_serie(serie_manifest=manifest, exclusions=exclusions)
+
+        assert results == [e for e in all_events if e.start.date() not in exclusions]
+        assert len(results) < len(all_events)
+
+
+def test_predict_serie_matches_calculate_serie():
+    """Test that the predicted count, first and last date match the calculated serie"""
+    manifests = [
+        PlanManifest(
+            pattern="weekly",
+            title="Unit Test",
+            pattern_strategy="weekly__standard",
+            recurrence_strategy="StopWithin",
+            start_time=time(9, 0),
+            end_time=time(14, 0),
+            start_date=date(2024, 11, 1),
+            stop_within=date(2026, 11, 30),
+            interval=2,
+            monday=True,
+            wednesday=True,
+        ),
+        PlanManifest(
+            pattern="monthly",
+            title="Unit Test",
+            pattern_strategy="month__every_arbitrary_date_of_month",
+            recurrence_strategy="NoStopDate",
+            start_time=time(9, 0),
+            end_time=time(14, 0),
+            start_date=date(2024, 10, 2),
+            project_x_months_into_future=36,
+            interval=1,
+            arbitrator=4,
+            day_of_week=2,
+        ),
+        PlanManifest(
+            pattern="yearly",
+            title="Unit Test",
+            pattern_strategy="yearly__every_x_of_month",
+            recurrence_strategy="StopAfterXInstances",
+            start_time=time(9, 0),
+            end_time=time(14, 0),
+            start_date=date(2024, 10, 2),
+            stop_after_x_occurences=12,
+            interval=1,
+            day_of_month=17,
+            month=5,
+        ),
+    ]
+    exclusions = [date(2024, 11, 4), date(2026, 11, 30), date(2024, 10, 30)]
+
+    for manifest in manifests:
+        events = sc.calculate_serie(serie_manifest=manifest, exclusions=exclusions)
+        prediction = sc.predict_serie(manifest, exclusions=exclusions)
+
+        assert prediction.count == len(events)
+        assert prediction.first_date == events[0].start.date()
+        assert prediction.last_date == events[-1].start.date()
+
+
+def test_predict_serie_rejects_degenerate_manifests():
+    """Test that manifests that can not give a sensible serie are rejected without being cycled through"""
+
+    def create_manifest(**kwargs):
+        return PlanManifest(
+            **{
+                "pattern": "degenerate",
+                "title": "Unit Test",
+                "recurrence_strategy": "StopWithin",
+                "start_time": time(9, 0),
+                "end_time": time(14, 0),
+                "start_date": date(2024, 11, 1),
+                "stop_within": date(2025, 11, 1),
+                **kwargs,
+            }
+        )
+
+    for manifest in [
+        create_manifest(pattern_strategy="daily__every_x_day", interval=0),
+        create_manifest(pattern_strategy="weekly__standard", interval=1),
+        create_manifest(
+            pattern_strategy="month__every_x_day_every_y_month",
+            interval=1,
+            day_of_month=0,
+        ),
+        create_manifest(
+            pattern_strategy="yearly__every_x_of_month",
+            interval=0,
+            day_of_month=30,
+            month=2,
+        ),
+    ]:
+        with pytest.raises(sc.ImpossibleSerieException):
+            sc.predict_serie(manifest)
+        with pytest.raises(sc.ImpossibleSerieException):
+            sc.calculate_serie(serie_manifest=manifest)
+
+    # Far more cycles than the threshold allows, which is known before cycling
+    with pytest.raises(sc.LikelyInfiniteLoopException):
+        sc.predict_serie(
+            create_manifest(
+                pattern_strategy="daily__every_weekday",
+                stop_within=date(2100, 1, 1),
+            )
+        )
@@ -0,0 +1,122 @@
+import json
+
+import pytest
+from celery import states
+from django_celery_results.models import TaskResult
+
+from webook.arrangement.models import ArrangementType, Event, EventSerie
+from webook.arrangement.tasks import create_event_serie_task, serie_creation_progress
+from webook.arrangement.tests.factories import RoomFactory
+from webook.onlinebooking.models import OnlineBookingSettings
+from webook.utils.serie_calculator import ImpossibleSerieException
+
+
+def _form_data(arrangement, rooms=(), **kwargs) -> dict:
+    """A serie manifest of the given arrangement, as sent to the job by the endpoint; the form data in its JSON form"""
+    return {
+        "internal_uuid": "unit-test",
+        "pattern": "daily",
+        "patternRoutine": "daily__every_x_day",
+        "timeAreaMethod": "StopWithin",
+        "startDate": "2025-01-06",
+        "startTime": "09:00:00",
+        "endTime": "14:00:00",
+        "stopWithin": "2025-01-17",
+        "interval": 1,
+        "expectedVisitors": 0,
+        "title": "Unit Test",
+        "audience": arrangement.audience_id,
+        "arrangement_type": ArrangementType.objects.create(name="Unit Test").id,
+        "rooms": [room.id for room in rooms],
+        "arrangementPk": arrangement.id,
+        **kwargs,
+    }
+
+
+@pytest.mark.django_db
+def test_create_event_serie_task_reports_progress(
+    no_search_indexing, user, location, arrangement, monkeypatch
+):
+    """Test that a serie is created by the job, which reports the occurrences it has expanded, analyzed and written"""
+    OnlineBookingSettings.objects.create(
+        title_format="", location=None, status_type=None, arrangement_type=None
+    )
+    form_data = _form_data(
+        arrangement,
+        [RoomFactory(location=location)],
+        before_buffer_start="08:00:00",
+        before_buffer_end="09:00:00",
+    )
+
+    states_reported = []
+    monkeypatch.setattr(
+        create_event_serie_task,
+        "update_state",
+        lambda state, meta: states_reported.append((state, dict(meta))),
+    )
+
+    result = create_event_serie_task.apply(
+        args=(form_data, user.pk, ["2025-01-08"])
+    ).get()
+
+    serie_events = Event.objects.filter(serie_id=result["serie_id"])
+    assert serie_events.count() == 11
+    assert result == {
+        "serie_id": result["serie_id"],
+        "expanded": 11,
+        "analyzed": 11,
+        "written": 11,
+    }
+    assert states_reported == [
+        ("PROGRESS", progress)
+        for progress in (
+            {"expanded": 11, "analyzed": 0, "written": 0},
+            {"expanded": 11, "analyzed": 11, "written": 0},
+            {"expanded": 11, "analyzed": 11, "written": 11},
+        )
+    ]
+    assert all(event.buffer_before_event is not None for event in serie_events)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "changes, exception",
+    [
+        # A serie of every 0th day never progresses
+        ({"interval": 0}, ImpossibleSerieException),
+        ({"startDate": "not a date"}, ValueError),
+    ],
+)
+def test_create_event_serie_task_fails_on_invalid_series(
+    no_search_indexing, user, arrangement, changes, exception
+):
+    """Test that the job fails on a manifest that is invalid, or can not give a sensible serie, creating no serie"""
+    result = create_event_serie_task.apply(
+        args=(_form_data(arrangement, **changes), user.pk, [])
+    )
+
+    assert result.state == states.FAILURE
+    assert isinstance(result.result, exception)
+    assert not EventSerie.objects.exists()
+
+
+@pytest.mark.django_db
+def test_serie_creation_progress():
+    """Test that the progress of serie creation jobs is read from the results stored by django_celery_results"""
+    assert serie_creation_progress("unknown") == {"status": states.PENDING}
+
+    progress = {"expanded": 100, "analyzed": 40, "written": 0}
+    TaskResult.objects.create(
+        task_id="running", status="PROGRESS", result=json.dumps(progress)
+    )
+    assert serie_creation_progress("running") == {"status": "PROGRESS", **progress}
+
+    TaskResult.objects.create(
+        task_id="failed",
+        status=states.FAILURE,
+        result=json.dumps({"exc_type": "ValueError", "exc_message": ["Invalid serie"]}),
+    )
+    assert serie_creation_progress("failed") == {
+        "status": states.FAILURE,
+        "error": "Invalid serie",
+    }
@@ -0,0 +1,197 @@
+from datetime import date, time
+
+import pytest
+from crum import impersonate
+from django.db.models.signals import post_save
+
+from webook.arrangement.models import Event, EventSerie, PlanManifest
+from webook.arrangement.tests.factories import RoomFactory
+from webook.arrangement.serie_materialization import (
+    materialize_serie,
+    update_materialized_serie,
+)
+from webook.arrangement.signals import serie_created
+from webook.onlinebooking.models import OnlineBookingSettings
+from webook.utils.collision_analysis import analyze_collisions
+from webook.utils.serie_calculator import calculate_serie
+
+
+@pytest.mark.django_db
+def test_materialize_serie_in_bulk(
+    no_search_indexing,
+    user,
+    location,
+    arrangement,
+    person,
+    django_assert_max_num_queries,
+    django_capture_on_commit_callbacks,
+):
+    """
+    Test that the events of a serie are created in bulk, with their rigging, and one serie_created signal, audited as
+    the person of the current user
+    """
+    OnlineBookingSettings.objects.create(
+        title_format="", location=None, status_type=None, arrangement_type=None
+    )
+    room = RoomFactory(location=location)
+    manifest = PlanManifest.objects.create(
+        pattern="daily",
+        title="Unit Test",
+        pattern_strategy="daily__every_x_day",
+        recurrence_strategy="StopWithin",
+        start_time=time(9, 0),
+        end_time=time(14, 0),
+        start_date=date(2025, 1, 6),
+        stop_within=date(2025, 1, 25),
+        interval=1,
+        timezone="Europe/Oslo",
+        before_buffer_start=time(8, 0),
+        before_buffer_end=time(9, 0),
+    )
+    manifest.rooms.set([room])
+    manifest.people.set([person])
+    user.person = person
+    user.save()
+    serie = EventSerie.objects.create(
+        arrangement=arrangement, serie_plan_manifest=manifest
+    )
+
+    occurrences = calculate_serie(manifest)
+    for occurrence in occurrences:
+        occurrence.rooms = [room.id]
+    analyze_collisions(occurrences)
+
+    saved, sent = [], []
+
+    def on_saved(sender, instance, **kwargs):
+        saved.append(instance)
+
+    def on_serie_created(sender, **kwargs):
+        sent.append(kwargs)
+
+    post_save.connect(on_saved, sender=Event)
+    serie_created.connect(on_serie_created)
+    try:
+        # A handful of queries, however long the serie; SQLite splits the inserts of the events into batches of 10
+        with django_capture_on_commit_callbacks(execute=True), impersonate(user):
+            with django_assert_max_num_queries(12):
+                created = materialize_serie(serie, manifest, occurrences, [room.id])
+    finally:
+        post_save.disconnect(on_saved, sender=Event)
+        serie_created.disconnect(on_serie_created)
+
+    assert len(created) == len(occurrences) == 20
+    assert saved == []
+    assert len(sent) == 1
+    assert sent[0]["serie"] == serie
+    assert sorted(sent[0]["event_ids"]) == sorted(
+        Event.objects.filter(arrangement=serie.arrangement).values_list("id", flat=True)
+    )
+
+    for event in Event.objects.filter(serie=serie).select_related(
+        "buffer_before_event"
+    ):
+        rigging = event.buffer_before_event
+        assert rigging.title == "Opprigging for Unit Test"
+        assert event.created_by == rigging.created_by == person
+        assert rigging.end == event.start
+        assert list(rigging.rooms.all()) == [room]
+        assert list(event.rooms.all()) == [room]
+        assert list(event.people.all()) == [person]
+
+
+@pytest.mark.django_db
+def test_update_materialized_serie_keeps_unchanged_events(
+    no_search_indexing,
+    user,
+    location,
+    arrangement,
+    person,
+    django_capture_on_commit_callbacks,
+):
+    """
+    Test that updating a serie keeps the events that are still in it, creating and archiving only the difference, and
+    audits the kept events as updated by the person of the current user
+    """
+    OnlineBookingSettings.objects.create(
+        title_format="", location=None, status_type=None, arrangement_type=None
+    )
+    room_a, room_b = [RoomFactory(name=name, location=location) for name in ("A", "B")]
+
+    def materialized(room, **kwargs):
+        manifest = PlanManifest.objects.create(
+            **{
+                "pattern": "daily",
+                "title": "Unit Test",
+                "pattern_strategy": "daily__every_x_day",
+                "recurrence_strategy": "StopWithin",
+                "start_time": time(9, 0),
+                "end_time": time(14, 0),
+                "interval": 1,
+                "timezone": "Europe/Oslo",
+                "before_buffer_start": time(8, 0),
+                "before_buffer_end": time(9, 0),
+                **kwargs,
+            }
+        )
+        manifest.rooms.set([room])
+        serie = EventSerie.objects.create(
+            arrangement=arrangement, serie_plan_manifest=manifest
+        )
+        occurrences = calculate_serie(manifest)
+        for occurrence in occurrences:
+            occurrence.is_collision = False
+        return serie, manifest, occurrences
+
+    predecessor, manifest, occurrences = materialized(
+        room_a, start_date=date(2025, 1, 6), stop_within=date(2025, 1, 10)
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        old_events = {
+            event.start.date(): event
+            for event in materialize_serie(predecessor, manifest, occurrences)
+        }
+
+    # The serie is moved to room B, a day later, and with rigging after instead of before
+    serie, manifest, occurrences = materialized(
+        room_b,
+        start_date=date(2025, 1, 7),
+        stop_within=date(2025, 1, 11),
+        before_buffer_start=None,
+        before_buffer_end=None,
+        after_buffer_start=time(14, 0),
+        after_buffer_end=time(15, 0),
+    )
+    user.person = person
+    user.save()
+    with django_capture_on_commit_callbacks(execute=True), impersonate(user):
+        events = update_materialized_serie(serie, predecessor, manifest, occurrences)
+
+    assert len(events) == 5
+    kept = {event.start.date(): event for event in events}
+    assert {day: event.pk for day, event in kept.items() if day in old_events} == {
+        day: event.pk for day, event in old_events.items() if day != date(2025, 1, 6)
+    }
+
+    serie_events = Event.objects.filter(serie=serie).select_related(
+        "buffer_before_event", "buffer_after_event"
+    )
+    assert serie_events.count() == 5
+    for event in serie_events:
+        if event.start.date() in old_events:
+            assert event.updated_by == user.person
+            assert event.modified > old_events[event.start.date()].modified
+        assert list(event.rooms.all()) == [room_b]
+        assert event.buffer_before_event is None
+        assert event.buffer_after_event.start == event.end
+        assert list(event.buffer_after_event.rooms.all()) == [room_b]
+
+    # The event that is no longer in the serie is archived with its rigging, as are the rigging events before
+    removed = Event.all_objects.get(pk=old_events[date(2025, 1, 6)].pk)
+    assert removed.is_archived
+    assert Event.all_objects.get(pk=removed.buffer_before_event_id).is_archived
+    assert all(
+        Event.all_objects.get(pk=event.buffer_before_event_id).is_archived
+        for event in old_events.values()
+    )
+    assert not Event.objects.filter(serie=predecessor).exists()
@@ -0,0 +1,77 @@
+from datetime import date, time
+
+import pytest
+
+from webook.arrangement.models import Event, EventSerie, PlanManifest
+from webook.arrangement.serie_projection import (
+    extend_serie_projection,
+    projected_until,
+    projection_horizon,
+)
+from webook.onlinebooking.models import OnlineBookingSettings
+
+
+def _manifest(**kwargs) -> PlanManifest:
+    return PlanManifest(
+        **{
+            "pattern": "daily",
+            "title": "Unit Test",
+            "pattern_strategy": "daily__every_x_day",
+            "recurrence_strategy": "NoStopDate",
+            "start_time": time(9, 0),
+            "end_time": time(14, 0),
+            "start_date": date(2024, 11, 15),
+            "project_x_months_into_future": 2,
+            "interval": 1,
+            **kwargs,
+        }
+    )
+
+
+def test_projection_horizon():
+    """Test that a serie is initially projected by its configured amount of months, and moves with the month"""
+    manifest = _manifest()
+
+    assert projected_until(manifest) == date(2024, 12, 31)
+    assert projection_horizon(manifest, date(2024, 11, 30)) == date(2024, 12, 31)
+    assert projection_horizon(manifest, date(2024, 12, 1)) == date(2025, 1, 31)
+    assert projection_horizon(manifest, date(2025, 3, 20)) == date(2025, 4, 30)
+
+    manifest.projected_until = date(2025, 1, 31)
+    assert projected_until(manifest) == date(2025, 1, 31)
+
+
+@pytest.mark.django_db
+def test_extend_serie_projection_is_idempotent(no_search_indexing, arrangement):
+    """Test that a serie is extended by the newly uncovered month only, and that extending again creates nothing"""
+    OnlineBookingSettings.objects.create(
+        title_format="", location=None, status_type=None, arrangement_type=None
+    )
+    manifest = _manifest(
+        timezone="Europe/Oslo",
+        before_buffer_start=time(8, 0),
+        before_buffer_end=time(9, 0),
+    )
+    manifest.save()
+    serie = EventSerie.objects.create(
+        arrangement=arrangement, serie_plan_manifest=manifest
+    )
+
+    assert extend_serie_projection(serie, today=date(2024, 11, 30)) == []
+
+    created = extend_serie_projection(serie, today=date(2024, 12, 1))
+    assert len(created) == 31
+    assert {event.start.date() for event in created} == {
+        date(2025, 1, day) for day in range(1, 32)
+    }
+    assert all(
+        Event.objects.get(pk=event.pk).buffer_before_event.end == event.start
+        for event in created
+    )
+    assert PlanManifest.objects.get(pk=manifest.pk).projected_until == date(2025, 1, 31)
+
+    # Forgetting the coverage must not lead to the existing events being created again
+    PlanManifest.objects.filter(pk=manifest.pk).update(projected_until=None)
+    serie.serie_plan_manifest.projected_until = None
+    assert extend_serie_projection(serie, today=date(2024, 12, 1)) == []
+    assert Event.objects.filter(serie=serie).count() == 31
@@ -0,0 +1,38 @@
+import pytest
+
+from webook.arrangement.models import Room
+from webook.arrangement.tests.factories import RoomFactory
+from webook.utils.slug_allocation import allocate_slugs
+
+
+@pytest.mark.django_db
+def test_allocate_slugs_for_bulk_created_rooms(
+    no_search_indexing, location, django_assert_num_queries
+):
+    """Test that slugs are allocated as AutoSlugField would have, with one query per candidate slug"""
+    RoomFactory(name="Room", location=location)
+    RoomFactory(name="A" * 60, location=location)
+
+    rooms = [
+        Room(name=name, location=location, max_capacity=10)
+        for name in ("Room", "Room", "Room!", "Other", "A" * 60)
+    ]
+    # One query for each of the three candidates, and one for inserting the rooms
+    with django_assert_num_queries(4):
+        allocate_slugs(rooms)
+        Room.objects.bulk_create(rooms)
+
+    assert [room.slug for room in rooms] == [
+        "room-2",
+        "room-3",
+        "room-4",
+        "other",
+        "a" * 48 + "-2",
+    ]
+
+    # Slugs are allocated irrespective of the rooms being archived, as the field sees all rooms
+    rooms[3].archive()
+    room = Room(name="Other", location=location, max_capacity=10)
+    allocate_slugs([room])
+    room.save()
+    assert room.slug == "other-2"
@@ -0,0 +1,152 @@
+import json
+from datetime import date, datetime, time
+
+import pytest
+from django.core.cache import cache
+
+from webook.arrangement.dto.event import EventDTO
+from webook.arrangement.event_queries import get_arrangements_in_period_json
+
+from webook.arrangement.models import (
+    CollisionAnalysisRecord,
+    Event,
+    EventSerie,
+    EventSerieExclusion,
+    PlanManifest,
+)
+from webook.arrangement.tests.factories import RoomFactory
+from webook.arrangement.virtual_series import get_virtual_occurrences_in_period
+from webook.utils.collision_analysis import analyze_collisions
+from webook.utils.room_occupancy import room_occupancy_index
+
+
+@pytest.mark.django_db
+def test_virtual_occurrences_in_period(
+    no_search_indexing, tz, arrangement, create_events
+):
+    """Test that a virtual serie is expanded for the requested period only, leaving out its exceptions"""
+    manifest = PlanManifest.objects.create(
+        pattern="daily",
+        title="Unit Test",
+        internal_uuid="unit-test",
+        pattern_strategy="daily__every_x_day",
+        recurrence_strategy="NoStopDate",
+        start_time=time(9, 0),
+        end_time=time(14, 0),
+        start_date=date(2024, 11, 15),
+        project_x_months_into_future=1,
+        interval=1,
+    )
+    serie = EventSerie.objects.create(
+        arrangement=arrangement, serie_plan_manifest=manifest, is_virtual=True
+    )
+
+    EventSerieExclusion.objects.create(serie=serie, date=date(2025, 6, 3))
+    # An event degraded from the serie replaces the occurrence on its date
+    create_events(
+        [
+            Event(
+                title="Unit Test",
+                associated_serie=serie,
+                association_type=Event.DEGRADED_FROM_SERIE,
+                start=tz.localize(datetime(2025, 6, 5, 10, 0)),
+                end=tz.localize(datetime(2025, 6, 5, 15, 0)),
+            )
+        ]
+    )
+
+    occurrences = get_virtual_occurrences_in_period(
+        tz.localize(datetime(2025, 6, 1)), tz.localize(datetime(2025, 6, 8))
+    )
+
+    assert [occurrence["starts"].date() for occurrence in occurrences] == [
+        date(2025, 6, day) for day in (1, 2, 4, 6, 7)
+    ]
+    assert all(occurrence["is_virtual"] for occurrence in occurrences)
+    assert all(occurrence["evserie_id"] == serie.id for occurrence in occurrences)
+    assert len({occurrence["serie_positional_hash"] for occurrence in occurrences}) == 5
+
+    assert (
+        get_virtual_occurrences_in_period(
+            tz.localize(datetime(2024, 11, 1)), tz.localize(datetime(2024, 11, 15))
+        )
+        == []
+    )
+
+    # The planner feed has the stored events, followed by the virtual occurrences
+    cache.clear()
+    rows = json.loads(
+        get_arrangements_in_period_json(
+            tz.localize(datetime(2025, 6, 1)).isoformat(),
+            tz.localize(datetime(2025, 6, 8)).isoformat(),
+        )
+    )
+    assert [row.get("is_virtual", False) for row in rows] == [False] + [True] * 5
+    assert rows[1]["serie_positional_hash"] == occurrences[0]["serie_positional_hash"]
+
+
+@pytest.mark.django_db
+def test_virtual_occurrences_book_rooms_and_people(
+    no_search_indexing,
+    tz,
+    location,
+    arrangement,
+    person,
+    django_capture_on_commit_callbacks,
+):
+    """Test that collision analysis sees the occurrences of virtual series, leaving out their exceptions"""
+    room = RoomFactory(name="Room", location=location, is_exclusive=True)
+    manifest = PlanManifest.objects.create(
+        pattern="daily",
+        title="Virtual",
+        internal_uuid="unit-test",
+        pattern_strategy="daily__every_x_day",
+        recurrence_strategy="NoStopDate",
+        start_time=time(9, 0),
+        end_time=time(14, 0),
+        start_date=date(2025, 6, 1),
+        project_x_months_into_future=1,
+        interval=1,
+    )
+    manifest.rooms.add(room)
+    manifest.people.add(person)
+
+    period = (tz.localize(datetime(2025, 6, 2)), tz.localize(datetime(2025, 6, 5)))
+    room_occupancy_index.clear()
+    assert room_occupancy_index.bookings([room.id], *period) == {room.id: []}
+
+    # Creating the serie has the rooms it books loaded again
+    with django_capture_on_commit_callbacks(execute=True):
+        serie = EventSerie.objects.create(
+            arrangement=arrangement, serie_plan_manifest=manifest, is_virtual=True
+        )
+        EventSerieExclusion.objects.create(serie=serie, date=date(2025, 6, 3))
+
+    bookings = room_occupancy_index.bookings([room.id], *period)[room.id]
+    assert [(title, start.date()) for _, title, start, _ in bookings] == [
+        ("Virtual", date(2025, 6, day)) for day in (2, 4)
+    ]
+    assert room_occupancy_index.bookings(
+        [room.id], *period, ignore_serie_pk=serie.pk
+    ) == {room.id: []}
+
+    candidates = [
+        EventDTO(
+            title=f"Candidate {day}",
+            start=tz.localize(datetime(2025, 6, day, 13, 0)),
+            end=tz.localize(datetime(2025, 6, day, 15, 0)),
+            rooms=[room.id],
+            people=[person.id],
+        )
+        for day in (2, 3)
+    ]
+    records = analyze_collisions(candidates)
+
+    assert sorted(
+        (record.dimension, record.contested_resource_name, record.event_b_title)
+        for record in records
+    ) == [
+        (CollisionAnalysisRecord.DIMENSION_PERSON, "Unit Tester", "Virtual"),
+        (CollisionAnalysisRecord.DIMENSION_ROOM, "Room", "Virtual"),
+    ]
+    assert [candidate.is_collision for candidate in candidates] == [True, False]
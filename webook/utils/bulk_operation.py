@@ -0,0 +1,99 @@
+"""bulk_operation.py
+
+Batching of the side effects of saving models during bulk write operations.
+
+Saving a model sets off side effects through signals -- such as a Graph calendar synchronization for each of the
+people of a saved event, and a search indexing task for each saved object. When many objects are saved in one
+operation (a serie being created, an arrangement being archived with its events) those side effects are repeated for
+each object, while once per affected user or model would do.
+
+Within bulk_operation() the receivers of such signals defer their side effects to the operation instead of carrying
+them out, with defer(). The deferred side effects are carried out once the operation ends and its transaction has
+been committed, deduplicated and in batches; each deferred item is handed, together with the other items deferred to
+the same flush function, to that function once.
+
+    with bulk_operation():
+        for event in events:
+            event.save()
+
+Bulk operations may be nested, in which case the nested operations join the outermost one. bulk_operation() may also
+be used as a decorator.
+
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+from django.db import transaction
+
+_state = threading.local()
+
+
+class BulkOperation:
+    """The side effects deferred during a bulk operation, and values memoized for its duration"""
+
+    def __init__(self):
+        # The deferred items of each flush function, in the order they were first deferred
+        self.deferred: Dict[Callable[[List[Hashable]], Any], Dict[Hashable, None]] = {}
+        self.memo: Dict[Hashable, Any] = {}
+
+    def defer(self, flush: Callable[[List[Hashable]], Any], item: Hashable) -> None:
+        self.deferred.setdefault(flush, {})[item] = None
+
+    def flush(self) -> None:
+        deferred, self.deferred = self.deferred, {}
+        for flush, items in deferred.items():
+            flush(list(items))
+
+
+def current_bulk_operation() -> Optional[BulkOperation]:
+    """Get the bulk operation that is in progress in this thread, if any"""
+    return getattr(_state, "operation", None)
+
+
+def defer(flush: Callable[[List[Hashable]], Any], item: Hashable) -> bool:
+    """
+    Defer the given item to be handed to flush at the end of the bulk operation in progress. Returns False if there
+    is no bulk operation in progress, in which case the caller should carry out the side effect at once.
+    """
+    operation = current_bulk_operation()
+    if operation is None:
+        return False
+
+    operation.defer(flush, item)
+    return True
+
+
+def memoized(key: Hashable, compute: Callable[[], Any]) -> Any:
+    """Get the value of compute, computed once for the duration of the bulk operation in progress, if any"""
+    operation = current_bulk_operation()
+    if operation is None:
+        return compute()
+
+    if key not in operation.memo:
+        operation.memo[key] = compute()
+    return operation.memo[key]
+
+
+@contextmanager
+def bulk_operation() -> Iterator[BulkOperation]:
+    """
+    Defer the side effects of the signals sent within the block, carrying them out in batches when the block has
+    ended and the transaction it is in (if any) has been committed.
+    """
+    operation = current_bulk_operation()
+    if operation is not None:
+        # Nested operations join the outermost one, which flushes them all
+        yield operation
+        return
+
+    operation = BulkOperation()
+    _state.operation = operation
+    try:
+        yield operation
+    finally:
+        _state.operation = None
+        # What has been written outside of a transaction is written regardless of errors, and its side effects are
+        # due. Within a transaction that is rolled back, the flush is discarded along with the writes.
+        transaction.on_commit(operation.flush)
@@ -0,0 +1,202 @@
+"""calendar_cache.py
+
+Cache of the rows of the calendar query (see arrangement/event_queries.py), in buckets of ISO weeks.
+
+Navigating the calendar runs the calendar query for every week, month or year that is viewed, while the events in
+those periods rarely change between views. The rows are cached as pre-serialized JSON per ISO week and filter
+signature (all events, or the events of a person), and the rows of a period are stitched together from the buckets
+of the weeks it spans. The weeks that are not cached are loaded from the database with one query.
+
+A bucket holds the rows of the events that start in its week. The rows of a period are those rows of the buckets of
+the weeks from the week of its start to the week of its end, that start after the start of the period and end before
+its end; the same rows the calendar query selects for the period.
+
+Every week has a version, shared by the buckets of all filter signatures, which the buckets are keyed by. Changes to
+events, arrangements and the rooms and people of events give the weeks the affected events start in new versions
+(see arrangement/signals.py), orphaning their buckets. Buckets expire after settings.CALENDAR_CACHE_TIMEOUT
+regardless, which bounds how long changes made without signals (queryset updates, renamed rooms or people) go unseen.
+
+The buckets are kept in the default cache, which is Redis if settings.USE_REDIS, and local memory otherwise. Local
+memory is private to each worker process, and the versions of the weeks are private along with it; a change saved
+through one worker invalidates the weeks of that worker only. Without Redis the buckets therefore expire after the much
+shorter settings.CALENDAR_CACHE_LOCAL_TIMEOUT, trading most of the benefit of the cache across requests for bounding
+how long a worker serves a calendar that another worker has changed. The cache still spares the database when the
+calendar is navigated back and forth.
+
+"""
+
+import json
+import threading
+import uuid
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from dateutil import parser
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+# A row of a bucket; the start and end of the event of the row as timestamps, and the row serialized as JSON
+_Row = Tuple[float, float, str]
+
+_WEEK = timedelta(days=7)
+
+
+def _as_aware(moment: datetime) -> datetime:
+    if timezone.is_naive(moment):
+        return timezone.make_aware(moment, timezone.get_default_timezone())
+    return moment
+
+
+def _row_moment(value: str) -> datetime:
+    """Parse a start or end of a calendar row, which is in UTC if it has no offset (as SQLite stores them)"""
+    moment = parser.isoparse(value)
+    if timezone.is_naive(moment):
+        return moment.replace(tzinfo=dt_timezone.utc)
+    return moment
+
+
+def _week_of(moment: datetime) -> date:
+    """Get the Monday of the ISO week the given moment falls in, in the default timezone"""
+    day = timezone.localtime(_as_aware(moment), timezone.get_default_timezone()).date()
+    return day - timedelta(days=day.weekday())
+
+
+def _week_start(week: date) -> datetime:
+    return timezone.make_aware(
+        datetime.combine(week, time.min), timezone.get_default_timezone()
+    )
+
+
+def _week_name(week: date) -> str:
+    year, number, _ = week.isocalendar()
+    return f"{year}-W{number:02}"
+
+
+def _version_key(week: date) -> str:
+    return f"calendar_week:version:{_week_name(week)}"
+
+
+def _bucket_key(signature: str, week: date, version: str) -> str:
+    return f"calendar_week:{signature}:{_week_name(week)}:{version}"
+
+
+class CalendarWeekCache:
+    """A cache of the rows of the calendar query, in buckets of ISO weeks"""
+
+    def __init__(self, timeout: int, local_timeout: int):
+        self.timeout = timeout
+        self.local_timeout = local_timeout
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+
+    def _versions(self, weeks: List[date]) -> Dict[date, str]:
+        keys = {week: _version_key(week) for week in weeks}
+        cached = cache.get_many(list(keys.values()))
+
+        versions = {}
+        for week, key in keys.items():
+            version = cached.get(key)
+            if version is None:
+                # Versions are random rather than counted, such that a week whose version has been evicted does not
+                # get back a version it has had before
+                version = uuid.uuid4().hex
+                if not cache.add(key, version, None):
+                    version = cache.get(key, version)
+            versions[week] = version
+
+        return versions
+
+    def _load(
+        self, weeks: List[date], load: Callable[[datetime, datetime], List[dict]]
+    ) -> Dict[date, List[_Row]]:
+        """Load the buckets of the given consecutive weeks from the database"""
+        buckets = {week: [] for week in weeks}
+        for row in load(_week_start(weeks[0]), _week_start(weeks[-1] + _WEEK)):
+            start = _row_moment(row["starts"])
+            buckets[_week_of(start)].append(
+                (
+                    start.timestamp(),
+                    _row_moment(row["ends"]).timestamp(),
+                    json.dumps(row),
+                )
+            )
+
+        return buckets
+
+    def rows_json(
+        self,
+        start: datetime,
+        end: datetime,
+        signature: str,
+        load: Callable[[datetime, datetime], List[dict]],
+    ) -> str:
+        """
+        Get the calendar rows of the events that start after start and end before end, as a JSON array. signature
+        identifies the filter of the rows, and load(start, end) gets the calendar rows with that filter of the events
+        that start in the given period from the database.
+        """
+        start, end = _as_aware(start), _as_aware(end)
+
+        weeks = []
+        week = _week_of(start)
+        while _week_start(week) < end:
+            weeks.append(week)
+            week += _WEEK
+
+        versions = self._versions(weeks)
+        keys = {week: _bucket_key(signature, week, versions[week]) for week in weeks}
+        cached = cache.get_many(list(keys.values()))
+        buckets = {week: cached[key] for week, key in keys.items() if key in cached}
+
+        missing = [week for week in weeks if week not in buckets]
+        if missing:
+            # The weeks in between the missing weeks are loaded along with them, such that one query suffices
+            loaded = self._load(
+                weeks[weeks.index(missing[0]) : weeks.index(missing[-1]) + 1], load
+            )
+            buckets.update(loaded)
+            cache.set_many(
+                {keys[week]: rows for week, rows in loaded.items()}, self._timeout()
+            )
+
+        with self._lock:
+            self.hits += len(weeks) - len(missing)
+            self.misses += len(missing)
+
+        start, end = start.timestamp(), end.timestamp()
+        return (
+            "["
+            + ",".join(
+                row
+                for week in weeks
+                for row_start, row_end, row in buckets[week]
+                if row_start > start and row_end < end
+            )
+            + "]"
+        )
+
+    def weeks_of(self, moments: Iterable[datetime]) -> Set[date]:
+        """Get the weeks the given moments fall in, as the Mondays of the weeks"""
+        return {_week_of(moment) for moment in moments if isinstance(moment, datetime)}
+
+    def invalidate_weeks(self, weeks: Iterable[date]) -> None:
+        """Have the buckets of the given weeks, of all filter signatures, loaded again when they are next queried"""
+        cache.set_many({_version_key(week): uuid.uuid4().hex for week in weeks}, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def _timeout(self) -> int:
+        """Get the seconds buckets are cached; shorter when each worker has a cache of its own (see the module)"""
+        return self.timeout if settings.USE_REDIS else self.local_timeout
+
+
+calendar_week_cache = CalendarWeekCache(
+    timeout=getattr(settings, "CALENDAR_CACHE_TIMEOUT", 600),
+    local_timeout=getattr(settings, "CALENDAR_CACHE_LOCAL_TIMEOUT", 10),
+)
@@ -1,12 +1,30 @@
+import hashlib
+import json
+from bisect import bisect_left
 from collections import namedtuple
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Union
+from dataclasses import dataclass, field
+from datetime import datetime, time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 import pytz
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Q
+from django.utils import timezone as dj_timezone
 
-from webook.arrangement.models import Arrangement, Event, EventSerie, Room
+from webook.arrangement.dto.event import EventDTO
+from webook.arrangement.models import (
+    Arrangement,
+    CollisionAnalysisRecord,
+    Event,
+    EventSerie,
+    Person,
+    Room,
+)
+from webook.arrangement.periods import filter_overlapping
+from webook.utils.json_serial import json_serial
+from webook.utils.room_occupancy import room_occupancy_index
 
 
 @dataclass
@@ -23,19 +41,267 @@ class CollisionRecord:
     is_resolution: bool = False
     my_serie_position_hash: Optional[str] = None
     parent_serie_position_hash: Optional[str] = None
+    event_a_id: Optional[int] = None
+    event_b_id: Optional[int] = None
+    # The kind of resource that is contested; one of the dimensions of CollisionAnalysisRecord
+    dimension: str = CollisionAnalysisRecord.DIMENSION_ROOM
 
 
 RoomCalendar = namedtuple("RoomCalendar", ["room", "events"])
+# People are always exclusive; a person can not take part in two events at the same time
+PersonCalendar = namedtuple("PersonCalendar", ["person", "events"])
+# The fields of an event that collision analysis needs to know of the events that are already booked on a resource
+Booking = namedtuple("Booking", ["id", "title", "start", "end"])
+# A contested person; carries the name of the person without loading the full model
+PersonResource = namedtuple("PersonResource", ["id", "name"])
 
 
-def explode_rigging_events(event_to_explode: Event):
+class CalendarIndex:
     """
-    Explode the rigging events of a given event -- manifesting them for collision analysis
+    Index of the events in the calendar of a resource (a room or a person), for finding the events that overlap a
+    given period.
 
-    Returns a dict containing two keys, before and after, each key may have a value of an event, which is the exploded
-    rigging event. If the value is none, then there is no properly configured rigging event for this position relative to the given event.
+    The events are sorted by start, and laid out as an implicit binary search tree over the sorted array; the root of
+    a range of the array is its middle element, and each root holds the latest end of the events in its range. The
+    events that overlap a period start before the period end, which is found by bisection, and end after the period
+    start; ranges in which no event ends after the period start are skipped without being visited. A lookup thus
+    takes O(log n + k) for k overlapping events, regardless of how long the events in the calendar are.
     """
-    pass
+
+    def __init__(self, resource, events: List[Booking], dimension: str):
+        self.resource = resource
+        self.dimension = dimension
+
+        starts = [event.start for event in events]
+        self._positions = sorted(range(len(events)), key=starts.__getitem__)
+        self._events = [events[position] for position in self._positions]
+        self._starts = [starts[position] for position in self._positions]
+        self._max_ends = [event.end for event in self._events]
+        if self._events:
+            self._augment(0, len(self._events))
+
+    def _augment(self, lower: int, upper: int):
+        """Have the root of the range between lower and upper hold the latest end in it, and return that end"""
+        middle = (lower + upper) // 2
+        if lower < middle:
+            self._max_ends[middle] = max(
+                self._max_ends[middle], self._augment(lower, middle)
+            )
+        if middle + 1 < upper:
+            self._max_ends[middle] = max(
+                self._max_ends[middle], self._augment(middle + 1, upper)
+            )
+        return self._max_ends[middle]
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Booking]:
+        """Get the events that overlap the period between start and end, in the order of the calendar"""
+        upper = bisect_left(self._starts, end)
+
+        found = []
+        ranges = [(0, len(self._events))]
+        while ranges:
+            lower, range_upper = ranges.pop()
+            if lower >= min(range_upper, upper):
+                continue
+            middle = (lower + range_upper) // 2
+            if self._max_ends[middle] <= start:
+                continue
+
+            ranges.append((lower, middle))
+            if middle < upper:
+                if self._events[middle].end > start:
+                    found.append(middle)
+                ranges.append((middle + 1, range_upper))
+
+        return [self._events[i] for i in sorted(found, key=self._positions.__getitem__)]
+
+
+def load_person_calendars(
+    person_ids: List[int],
+    start: datetime,
+    end: datetime,
+    ignore_serie_pk: Optional[int] = None,
+) -> Dict[int, PersonCalendar]:
+    """
+    Load the calendars of the given people in the period between start and end, including the occurrences of the
+    virtual series they take part in. People that have no events in the period are left out. Events of the serie with
+    pk ignore_serie_pk are left out.
+    """
+    # Imported here, as the expansion of virtual series depends on collision analysis through serie projection
+    from webook.arrangement.virtual_series import load_virtual_serie_calendars
+
+    bookings = filter_overlapping(
+        Event.people.through.objects.filter(
+            person_id__in=person_ids, event__is_archived=False
+        ),
+        start,
+        end,
+        field_prefix="event__",
+    )
+    if ignore_serie_pk:
+        bookings = bookings.exclude(event__serie_id=ignore_serie_pk)
+
+    calendars: Dict[int, PersonCalendar] = {}
+    for (
+        person_id,
+        first_name,
+        middle_name,
+        last_name,
+        *booking,
+    ) in bookings.order_by("event_id").values_list(
+        "person_id",
+        "person__first_name",
+        "person__middle_name",
+        "person__last_name",
+        "event_id",
+        "event__title",
+        "event__start",
+        "event__end",
+    ):
+        if person_id not in calendars:
+            name = " ".join(
+                name for name in (first_name, middle_name, last_name) if name
+            )
+            calendars[person_id] = PersonCalendar(PersonResource(person_id, name), [])
+        calendars[person_id].events.append(Booking(*booking))
+
+    _, virtual_calendars = load_virtual_serie_calendars(person_ids=person_ids)
+    virtual_bookings = {
+        person_id: [
+            Booking(*occurrence)
+            for calendar in person_virtual_calendars
+            if calendar.serie_id != ignore_serie_pk
+            for occurrence in calendar.bookings(start, end)
+        ]
+        for person_id, person_virtual_calendars in virtual_calendars.items()
+    }
+    unnamed = [
+        person_id
+        for person_id, bookings in virtual_bookings.items()
+        if bookings and person_id not in calendars
+    ]
+    for person in Person.objects.filter(pk__in=unnamed).only(
+        "first_name", "middle_name", "last_name"
+    ):
+        calendars[person.id] = PersonCalendar(
+            PersonResource(person.id, person.full_name), []
+        )
+    for person_id, bookings in virtual_bookings.items():
+        if bookings and person_id in calendars:
+            calendars[person_id].events.extend(bookings)
+
+    return calendars
+
+
+# The positions of rigging events relative to the event they are rigging for, and the direction of their date offset
+RIGGING_POSITIONS = {"before": -1, "after": 1}
+
+_RIGGING_TITLE_PREFIXES = {"before": "Opprigging for ", "after": "Nedrigging for "}
+
+
+def rigging_title(position: str, buffers, root_title: str) -> str:
+    """Get the title of the rigging event at the given position, for an event with the given buffers and title"""
+    return getattr(buffers, f"{position}_buffer_title", None) or (
+        _RIGGING_TITLE_PREFIXES[position] + root_title
+    )
+
+
+def explode_rigging_events(
+    starts: List[datetime], buffers, tz=None
+) -> Dict[str, List[Tuple[datetime, datetime]]]:
+    """
+    Explode the rigging events of a serie of events, all having the buffer fields (see BufferFieldsMixin) of buffers,
+    manifesting them for collision analysis and creation. Does not access the database.
+
+    Returns a dict keyed by position (before and after), with the (start, end) of the rigging event of each of the
+    given events, in the order of starts. Positions that are not configured with both a start and end time are left
+    out. Rigging times are localized in tz, defaulting to the current timezone.
+    """
+    tz = pytz.timezone(str(tz or dj_timezone.get_current_timezone()))
+    # The rigging is on the date of the event as given, unless the buffers have a date of their own
+    days = np.array([start.date() for start in starts], dtype="datetime64[D]")
+
+    exploded = {}
+    for position, direction in RIGGING_POSITIONS.items():
+        start_time = getattr(buffers, f"{position}_buffer_start")
+        end_time = getattr(buffers, f"{position}_buffer_end")
+        if start_time is None or end_time is None:
+            # We need both start and end to generate a rigging event
+            continue
+
+        rigging_days = days
+        buffer_date = getattr(buffers, f"{position}_buffer_date", None)
+        if buffer_date:
+            if isinstance(buffer_date, datetime):
+                buffer_date = buffer_date.date()
+            rigging_days = np.full(len(days), np.datetime64(buffer_date, "D"))
+
+        date_offset = getattr(buffers, f"{position}_buffer_date_offset", None) or 0
+        rigging_days = (rigging_days + direction * date_offset).astype("datetime64[us]")
+
+        rigging_starts = (rigging_days + _time_of_day(start_time)).tolist()
+        rigging_ends = (rigging_days + _time_of_day(end_time)).tolist()
+        exploded[position] = [
+            (tz.localize(start), tz.localize(end))
+            for start, end in zip(rigging_starts, rigging_ends)
+        ]
+
+    return exploded
+
+
+def _time_of_day(value: time) -> np.timedelta64:
+    return np.timedelta64(
+        ((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000
+        + value.microsecond,
+        "us",
+    )
+
+
+def serie_analysis_events(
+    manifest, occurrences: list, rooms: List[int], people: List[int]
+) -> List[EventDTO]:
+    """
+    Convert the calculated occurrences of the serie of the given manifest into events ready for collision analysis,
+    each preceded by its rigging events
+    """
+    roots = [
+        EventDTO(
+            title=occurrence.title,
+            start=occurrence.start,
+            end=occurrence.end,
+            rooms=rooms,
+            people=people,
+            is_resolution=True,
+        )
+        for occurrence in occurrences
+    ]
+    riggings = explode_rigging_events([root.start for root in roots], manifest)
+
+    events = []
+    for index, root in enumerate(roots):
+        root.serie_positional_hash = root.generate_serie_positional_hash(
+            manifest.internal_uuid
+        )
+
+        for position, intervals in riggings.items():
+            rigging_start, rigging_end = intervals[index]
+            rigging = EventDTO(
+                title=rigging_title(position, manifest, root.title),
+                start=rigging_start,
+                end=rigging_end,
+                rooms=rooms,
+                people=people,
+                is_rigging=True,
+                sph_of_root_event=root.serie_positional_hash,
+            )
+            rigging.serie_positional_hash = rigging.generate_serie_positional_hash(
+                manifest.internal_uuid
+            )
+            events.append(rigging)
+
+        events.append(root)
+
+    return events
 
 
 def analyze_collisions(
@@ -44,7 +310,8 @@ def analyze_collisions(
     ignore_serie_pk: Optional[int] = None,
 ) -> Union[List[CollisionRecord], CollisionRecord]:
     """
-    Analyze a list of events, or a single event for collisions. Returns a list of CollisionRecords.
+    Analyze a list of events, or a single event for collisions on exclusive rooms and on people. Returns a list of
+    CollisionRecords.
     If annotate_events is True then the items in the event list will have a new attribute set; is_collision.
     If true then the event is in a collision with another event.
     """
@@ -52,11 +319,26 @@ def analyze_collisions(
     if len(events) == 0:
         return []
 
+    return list(iter_collisions(events, annotate_events, ignore_serie_pk))
+
+
+def iter_collisions(
+    events: List[dict],
+    annotate_events: bool = True,
+    ignore_serie_pk: Optional[int] = None,
+) -> Iterator[CollisionRecord]:
+    """
+    Analyze a list of events for collisions, as analyze_collisions, yielding the records as they are found -- in the
+    order of the events. An event is annotated as a collision once its records have been yielded.
+    """
+    if len(events) == 0:
+        return
+
     earliest_start = min(map(lambda event: event.start, events))
     latest_end = max(map(lambda event: event.end, events))
 
-    room_calendars = {}
     room_ids = []
+    person_ids = set()
 
     for event in events:
         if annotate_events:
@@ -65,69 +347,465 @@ def analyze_collisions(
         for room_id in event.rooms:
             if room_id not in room_ids:
                 room_ids.append(room_id)
+        person_ids.update(getattr(event, "people", None) or [])
 
-    ignore_serie_criterion = ~Q(pk__in=[])
-    if ignore_serie_pk:
-        ignore_serie_criterion = ~Q(serie_id=ignore_serie_pk)
+    exclusive_rooms = list(
+        Room.objects.filter(Q(pk__in=room_ids) & Q(is_exclusive=True))
+    )
+    room_ids = [room.id for room in exclusive_rooms]
+    if earliest_start.tzinfo is None:
+        earliest_start = pytz.UTC.localize(earliest_start)
+    if latest_end.tzinfo is None:
+        latest_end = pytz.UTC.localize(latest_end)
 
-    exclusive_rooms = Room.objects.filter(Q(pk__in=room_ids) & Q(is_exclusive=True))
+    bookings = room_occupancy_index.bookings(
+        room_ids, earliest_start, latest_end, ignore_serie_pk=ignore_serie_pk
+    )
+    room_calendars = {
+        room.id: RoomCalendar(
+            room, [Booking(*booking) for booking in bookings[room.id]]
+        )
+        for room in exclusive_rooms
+    }
+
+    person_calendars = {}
+    if person_ids:
+        person_calendars = load_person_calendars(
+            list(person_ids), earliest_start, latest_end, ignore_serie_pk
+        )
+
+    yield from _iter_collisions(
+        events, room_calendars, room_ids, people=person_calendars
+    )
+
+
+def analyze_batch_collisions(
+    batches: List[Tuple[List[dict], Optional[int]]],
+) -> List[List[CollisionRecord]]:
+    """
+    Analyze several batches of events -- such as the series of multiple plan manifests -- for collisions, both against
+    the existing events and against the events of the other batches. Each batch is given as (events, ignore_serie_pk).
+    Returns the records of each batch, in the order of the batches.
+
+    The calendars of the rooms and people are loaded once for all the batches. Records of collisions between batches
+    have the serie positional hash of the other event as event_b_id, as it does not exist yet.
+    """
+    all_events = [event for events, _ in batches for event in events]
+    if len(all_events) == 0:
+        return [[] for _ in batches]
+
+    utc = pytz.UTC
+    for event in all_events:
+        if event.start.tzinfo is None:
+            event.start = utc.localize(event.start)
+        if event.end.tzinfo is None:
+            event.end = utc.localize(event.end)
+        event.is_collision = False
+
+    earliest_start = min(event.start for event in all_events)
+    latest_end = max(event.end for event in all_events)
+
+    exclusive_rooms = list(
+        Room.objects.filter(
+            pk__in={room_id for event in all_events for room_id in event.rooms},
+            is_exclusive=True,
+        )
+    )
     room_ids = [room.id for room in exclusive_rooms]
-    for room in exclusive_rooms:
-        room_calendars[room.id] = RoomCalendar(
-            room,
+    person_ids = list(
+        {
+            int(person_id)
+            for event in all_events
+            for person_id in getattr(event, "people", None) or []
+        }
+    )
+
+    # The existing calendars, per serie to ignore; the room occupancy index only loads the rooms once
+    existing_calendars = {}
+    for ignore_serie_pk in {ignore_serie_pk for _, ignore_serie_pk in batches}:
+        bookings = room_occupancy_index.bookings(
+            room_ids, earliest_start, latest_end, ignore_serie_pk=ignore_serie_pk
+        )
+        person_bookings = {}
+        if person_ids:
+            person_bookings = {
+                person_id: person_calendar.events
+                for person_id, person_calendar in load_person_calendars(
+                    person_ids, earliest_start, latest_end, ignore_serie_pk
+                ).items()
+            }
+
+        existing_calendars[ignore_serie_pk] = (
+            {
+                room_id: [Booking(*booking) for booking in bookings[room_id]]
+                for room_id in room_ids
+            },
+            person_bookings,
+        )
+
+    # The events of each batch, as bookings of the rooms and people they use
+    batch_room_bookings = [dict() for _ in batches]
+    batch_person_bookings = [dict() for _ in batches]
+    for batch_index, (events, _) in enumerate(batches):
+        for event in events:
+            booking = Booking(
+                event.serie_positional_hash, event.title, event.start, event.end
+            )
+            for room_id in event.rooms:
+                if int(room_id) in room_ids:
+                    batch_room_bookings[batch_index].setdefault(
+                        int(room_id), []
+                    ).append(booking)
+            for person_id in getattr(event, "people", None) or []:
+                batch_person_bookings[batch_index].setdefault(
+                    int(person_id), []
+                ).append(booking)
+
+    person_names = {}
+    if person_ids:
+        for person in Person.objects.filter(pk__in=person_ids).only(
+            "first_name", "middle_name", "last_name"
+        ):
+            person_names[person.id] = person.full_name
+
+    records = []
+    for batch_index, (events, ignore_serie_pk) in enumerate(batches):
+        existing_rooms, existing_people = existing_calendars[ignore_serie_pk]
+        other_batches = [
+            other_index
+            for other_index in range(len(batches))
+            if other_index != batch_index
+        ]
+
+        room_calendars = {
+            room.id: RoomCalendar(
+                room,
+                existing_rooms[room.id]
+                + [
+                    booking
+                    for other_index in other_batches
+                    for booking in batch_room_bookings[other_index].get(room.id, [])
+                ],
+            )
+            for room in exclusive_rooms
+        }
+        person_calendars = {
+            person_id: PersonCalendar(
+                PersonResource(person_id, person_names.get(person_id, "")),
+                existing_people.get(person_id, [])
+                + [
+                    booking
+                    for other_index in other_batches
+                    for booking in batch_person_bookings[other_index].get(person_id, [])
+                ],
+            )
+            for person_id in person_ids
+        }
+
+        records.append(
             list(
-                room.event_set.filter(
-                    Q(start__lte=latest_end)
-                    & Q(end__gte=earliest_start)
-                    & ignore_serie_criterion
+                _iter_collisions(
+                    events, room_calendars, room_ids, people=person_calendars
                 )
+            )
+        )
+
+    return records
+
+
+def _occurrence_signature(events: list, ignore_serie_pk: Optional[int]) -> str:
+    """Get a signature of an occurrence of a serie (its root event and rigging) covering all that its analysis uses"""
+    return hashlib.sha256(
+        repr(
+            [ignore_serie_pk]
+            + [
+                (
+                    event.serie_positional_hash,
+                    event.title,
+                    event.start.isoformat(),
+                    event.end.isoformat(),
+                    sorted(int(room_id) for room_id in event.rooms),
+                    sorted(
+                        int(person_id)
+                        for person_id in getattr(event, "people", None) or []
+                    ),
+                    getattr(event, "is_rigging", None),
+                    getattr(event, "is_resolution", False),
+                )
+                for event in events
+            ]
+        ).encode()
+    ).hexdigest()
+
+
+def _occurrence_key(event) -> Optional[str]:
+    return event.sph_of_root_event or event.serie_positional_hash
+
+
+def _person_version_key(person_id: int) -> str:
+    return f"collision_analysis:person_version:{person_id}"
+
+
+def person_versions(person_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Get the current versions of the bookings of the given people, which change whenever their bookings change. The
+    versions are shared between processes through Redis, and are not kept without it (see arrangement/signals.py).
+    """
+    person_ids = list(person_ids)
+    versions = cache.get_many(
+        [_person_version_key(person_id) for person_id in person_ids]
+    )
+    return {
+        person_id: versions.get(_person_version_key(person_id), 0)
+        for person_id in person_ids
+    }
+
+
+def bump_person_versions(person_ids: Iterable[int]) -> None:
+    """Bump the versions of the bookings of the given people"""
+    for person_id in person_ids:
+        cache.add(_person_version_key(person_id), 0, None)
+        cache.incr(_person_version_key(person_id))
+
+
+def analyze_serie_collisions(
+    serie_uuid: str,
+    events: List[dict],
+    ignore_serie_pk: Optional[int] = None,
+) -> List[CollisionRecord]:
+    """
+    Analyze the events of a serie for collisions, incrementally. Returns the same records as analyze_collisions.
+
+    The events are grouped into occurrences -- a root event and its rigging, by serie positional hash -- and the
+    records of each occurrence are cached under the uuid of the serie. When the serie is analyzed again (as the user
+    edits it) only the occurrences that have been added or changed are analyzed; the records of the others are
+    reused. The cached records are dropped when the bookings of any of the rooms or people of the serie have changed,
+    and after SERIE_COLLISION_CACHE_TIMEOUT seconds regardless, as changes made without signals are not tracked.
+
+    The versions that tell that bookings have changed are only shared between processes through Redis. Without it, a
+    booking made through another worker would go unseen, and the serie is analyzed in full every time.
+    """
+    return list(iter_serie_collisions(serie_uuid, events, ignore_serie_pk))
+
+
+def iter_serie_collisions(
+    serie_uuid: str,
+    events: List[dict],
+    ignore_serie_pk: Optional[int] = None,
+) -> Iterator[CollisionRecord]:
+    """
+    Analyze the events of a serie for collisions, as analyze_serie_collisions, yielding the records as they are found.
+    The cached records of the serie are updated once all records have been yielded.
+    """
+    if len(events) == 0:
+        return
+
+    occurrences: Dict[str, list] = {}
+    for event in events:
+        occurrences.setdefault(_occurrence_key(event), []).append(event)
+
+    # Records are only reused where the versions of the bookings of the rooms and people are shared between processes
+    cached_records = {}
+    if settings.USE_REDIS:
+        versions = {
+            "rooms": room_occupancy_index.versions(
+                {int(room_id) for event in events for room_id in event.rooms}
+            ),
+            "people": person_versions(
+                {
+                    int(person_id)
+                    for event in events
+                    for person_id in getattr(event, "people", None) or []
+                }
             ),
+        }
+        cache_key = f"serie_collision_analysis:{serie_uuid}"
+
+        cached = cache.get(cache_key)
+        if cached is not None and cached["versions"] == versions:
+            cached_records = cached["occurrences"]
+
+    signatures = {
+        occurrence_key: _occurrence_signature(occurrence_events, ignore_serie_pk)
+        for occurrence_key, occurrence_events in occurrences.items()
+    }
+    changed_events = [
+        event
+        for occurrence_key, occurrence_events in occurrences.items()
+        if signatures[occurrence_key] not in cached_records
+        for event in occurrence_events
+    ]
+
+    # The records of the changed occurrences come in the order of the occurrences; one record is read ahead to tell
+    # where the records of an occurrence end
+    analyzed = iter_collisions(changed_events, ignore_serie_pk=ignore_serie_pk)
+    next_record = next(analyzed, None)
+
+    records_by_signature = {}
+    for occurrence_key, occurrence_events in occurrences.items():
+        signature = signatures[occurrence_key]
+
+        if signature in cached_records:
+            occurrence_records = cached_records[signature]
+        else:
+            occurrence_records = []
+            while (
+                next_record is not None
+                and (
+                    next_record.parent_serie_position_hash
+                    or next_record.my_serie_position_hash
+                )
+                == occurrence_key
+            ):
+                occurrence_records.append(next_record)
+                next_record = next(analyzed, None)
+
+        records_by_signature[signature] = occurrence_records
+
+        colliding = {record.my_serie_position_hash for record in occurrence_records}
+        for event in occurrence_events:
+            event.is_collision = event.serie_positional_hash in colliding
+
+        yield from occurrence_records
+
+    if settings.USE_REDIS:
+        cache.set(
+            cache_key,
+            {"versions": versions, "occurrences": records_by_signature},
+            settings.SERIE_COLLISION_CACHE_TIMEOUT,
         )
 
-    return _analyze_multiple_events(events, room_calendars, room_ids)
+
+@dataclass
+class CollisionSummary:
+    """A summary of collision records, accumulated as they are found"""
+
+    count: int = 0
+    earliest: Optional[datetime] = None
+    latest: Optional[datetime] = None
+    # The amount of records per contested resource, by (dimension, resource id)
+    resources: Dict[Tuple[str, int], dict] = field(default_factory=dict)
+
+    def add(self, record: CollisionRecord) -> None:
+        self.count += 1
+        if self.earliest is None or record.event_a_start < self.earliest:
+            self.earliest = record.event_a_start
+        if self.latest is None or record.event_a_end > self.latest:
+            self.latest = record.event_a_end
+
+        resource_key = (record.dimension, record.contested_resource_id)
+        if resource_key not in self.resources:
+            self.resources[resource_key] = {
+                "dimension": record.dimension,
+                "id": record.contested_resource_id,
+                "name": record.contested_resource_name,
+                "count": 0,
+            }
+        self.resources[resource_key]["count"] += 1
+
+
+def iter_ndjson(records: Iterable[CollisionRecord], tz) -> Iterator[str]:
+    """
+    Serialize the given collision records as NDJSON, one line per record as it is found, with its times in the given
+    timezone. The last line is a summary of the records; {"summary": {"count", "earliest", "latest", "resources"}}.
+    """
+    summary = CollisionSummary()
+
+    for record in records:
+        summary.add(record)
+        line = vars(record).copy()
+        for time_field in (
+            "event_a_start",
+            "event_a_end",
+            "event_b_start",
+            "event_b_end",
+        ):
+            line[time_field] = line[time_field].astimezone(tz)
+        yield json.dumps(line, default=json_serial) + "\n"
+
+    yield json.dumps(
+        {
+            "summary": {
+                "count": summary.count,
+                "earliest": summary.earliest and summary.earliest.astimezone(tz),
+                "latest": summary.latest and summary.latest.astimezone(tz),
+                "resources": list(summary.resources.values()),
+            }
+        },
+        default=json_serial,
+    ) + "\n"
 
 
 def _analyze_multiple_events(
-    events: List[dict], rooms: dict, room_ids: List[int]
+    events: List[dict],
+    rooms: dict,
+    room_ids: List[int],
+    people: Optional[Dict[int, PersonCalendar]] = None,
 ) -> List[CollisionRecord]:
     """Analyze a sequence of given events, and see if they collide with any other existing events"""
-    records = []
+    return list(_iter_collisions(events, rooms, room_ids, people))
 
+
+def _iter_collisions(
+    events: List[dict],
+    rooms: dict,
+    room_ids: List[int],
+    people: Optional[Dict[int, PersonCalendar]] = None,
+) -> Iterator[CollisionRecord]:
+    room_indexes: Dict[int, CalendarIndex] = {
+        int(room_id): CalendarIndex(
+            room_calendar.room,
+            room_calendar.events,
+            CollisionAnalysisRecord.DIMENSION_ROOM,
+        )
+        for room_id, room_calendar in rooms.items()
+    }
+    person_indexes: Dict[int, CalendarIndex] = {
+        int(person_id): CalendarIndex(
+            person_calendar.person,
+            person_calendar.events,
+            CollisionAnalysisRecord.DIMENSION_PERSON,
+        )
+        for person_id, person_calendar in (people or {}).items()
+    }
+
+    utc = pytz.UTC
     for event in events:
-        utc = pytz.UTC
         if event.start.tzinfo is None:
             event.start = utc.localize(event.start)
         if event.end.tzinfo is None:
             event.end = utc.localize(event.end)
-        exclusive_room_ids = [value for value in room_ids if value in event.rooms]
-        for exlusive_room_id in exclusive_room_ids:
-            room_calendar = rooms[int(exlusive_room_id)]
-            for r_event in room_calendar.events:
-                if (
-                    hasattr(event, "id")
-                    and event.id is not None
-                    and r_event.id == event.id
-                ):
-                    continue
-                if r_event.start < event.end and r_event.end > event.start:
-                    records.append(
-                        CollisionRecord(
-                            event_a_title=event.title,
-                            event_a_start=event.start,
-                            event_a_end=event.end,
-                            event_b_title=r_event.title,
-                            event_b_start=r_event.start,
-                            event_b_end=r_event.end,
-                            contested_resource_id=room_calendar.room.id,
-                            contested_resource_name=room_calendar.room.name,
-                            my_serie_position_hash=event.serie_positional_hash,
-                            parent_serie_position_hash=event.sph_of_root_event,
-                            is_rigging=event.is_rigging
-                            if hasattr(event, "is_rigging")
-                            else None,
-                        )
-                    )
-                    if hasattr(event, "is_collision"):
-                        event.is_collision = True
 
-    return records
+        event_id = getattr(event, "id", None)
+        is_rigging = event.is_rigging if hasattr(event, "is_rigging") else None
+        annotate = hasattr(event, "is_collision")
+
+        contested_indexes = [
+            room_indexes[int(room_id)] for room_id in room_ids if room_id in event.rooms
+        ] + [
+            person_indexes[int(person_id)]
+            for person_id in getattr(event, "people", None) or []
+            if int(person_id) in person_indexes
+        ]
+        for index in contested_indexes:
+            for r_event in index.overlapping(event.start, event.end):
+                if event_id is not None and r_event.id == event_id:
+                    continue
+                if annotate:
+                    event.is_collision = True
+                yield CollisionRecord(
+                    event_a_title=event.title,
+                    event_a_start=event.start,
+                    event_a_end=event.end,
+                    event_b_title=r_event.title,
+                    event_b_start=r_event.start,
+                    event_b_end=r_event.end,
+                    contested_resource_id=index.resource.id,
+                    contested_resource_name=index.resource.name,
+                    my_serie_position_hash=event.serie_positional_hash,
+                    parent_serie_position_hash=event.sph_of_root_event,
+                    is_rigging=is_rigging,
+                    event_a_id=event_id,
+                    event_b_id=r_event.id,
+                    dimension=index.dimension,
+                )
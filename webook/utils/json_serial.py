@@ -1,8 +1,8 @@
-from datetime import datetime, date
+from datetime import datetime, date, time
 
 
 def json_serial(obj):
     """JSON serializer for objects not serializable by default json code"""
-    if isinstance(obj, (datetime, date)):
+    if isinstance(obj, (datetime, date, time)):
         return obj.isoformat()
     raise TypeError ("Type %s not serializable" % type(obj))
\ No newline at end of file
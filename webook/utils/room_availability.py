@@ -0,0 +1,237 @@
+"""room_availability.py
+
+Finding the times at which a set of rooms (and optionally people) are all free.
+
+The period that is searched is divided into slots of five minutes, and each resource is given a bitmap over those
+slots -- one bool per slot, True where the resource is free. A slot is free for a resource when none of its bookings
+overlap the slot, and the slot is within the business hours of the resource (a resource that has no business hours is
+considered open at all times). The slots that all the resources are free at are then the AND of their bitmaps, and a
+free window of a given duration is a run of free slots that is at least as long as the duration.
+
+The slots run continuously over the days of the period, rather than as a fixed amount of slots per day, such that days
+where daylight saving time begins or ends are handled by the same bitmaps.
+
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.utils import timezone as dj_timezone
+from pytz import utc
+
+from webook.arrangement.models import Person, Room
+from webook.utils.collision_analysis import load_person_calendars
+from webook.utils.room_occupancy import room_occupancy_index
+
+SLOT = timedelta(minutes=5)
+# The longest period that can be searched, bounding the size of the bitmaps
+MAX_PERIOD = timedelta(days=366)
+_EPOCH = datetime(1970, 1, 1, tzinfo=utc)
+
+
+@dataclass
+class FreeWindow:
+    start: datetime
+    end: datetime
+    # The end of the run of free slots the window starts; the window may be extended until then
+    free_until: datetime
+
+
+def _localize(tz, value: datetime) -> datetime:
+    if hasattr(tz, "localize"):
+        return tz.localize(value)
+    return value.replace(tzinfo=tz)
+
+
+def _slot_of(period_start: datetime, value: datetime) -> float:
+    return (value - period_start) / SLOT
+
+
+def _bookings_bitmap(
+    bookings: Iterable[Tuple[datetime, datetime]], period_start: datetime, slots: int
+) -> np.ndarray:
+    """Get a bitmap of the slots that are not overlapped by any of the given (start, end) bookings"""
+    bookings = list(bookings)
+    if not bookings:
+        return np.ones(slots, dtype=bool)
+
+    offsets = np.array(
+        [
+            (_slot_of(period_start, start), _slot_of(period_start, end))
+            for start, end in bookings
+        ]
+    )
+    first_slots = np.clip(np.floor(offsets[:, 0]), 0, slots).astype(np.int64)
+    end_slots = np.clip(np.ceil(offsets[:, 1]), 0, slots).astype(np.int64)
+
+    # Count the bookings overlapping each slot, by summing +1 at the first slot and -1 past the last slot of each
+    overlaps = np.zeros(slots + 1, dtype=np.int64)
+    np.add.at(overlaps, first_slots, 1)
+    np.add.at(overlaps, end_slots, -1)
+
+    return np.cumsum(overlaps[:-1]) == 0
+
+
+def _business_hours_bitmap(
+    business_hours: List[tuple], period_start: datetime, slots: int, tz
+) -> Optional[np.ndarray]:
+    """
+    Get a bitmap of the slots that are within the given business hours, or None if there are no business hours.
+    Each business hour is a (day of week, start time, end time, valid from, valid through) tuple.
+    """
+    if not business_hours:
+        return None
+
+    period_end = period_start + SLOT * slots
+    first_day = period_start.astimezone(tz).date()
+    last_day = period_end.astimezone(tz).date()
+
+    hours_by_weekday: Dict[int, List[tuple]] = {}
+    for day_of_week, *hours in business_hours:
+        hours_by_weekday.setdefault(day_of_week, []).append(hours)
+
+    opening_hours = []
+    # Business hours of the day before the period may pass midnight into it
+    day = first_day - timedelta(days=1)
+    while day <= last_day:
+        for start_time, end_time, valid_from, valid_through in hours_by_weekday.get(
+            day.weekday(), []
+        ):
+            if not valid_from.date() <= day <= valid_through.date():
+                continue
+
+            end_day = day
+            if end_time <= start_time:
+                # Business hours that pass midnight end on the next day
+                end_day += timedelta(days=1)
+            opening_hours.append(
+                (
+                    _localize(tz, datetime.combine(day, start_time)),
+                    _localize(tz, datetime.combine(end_day, end_time)),
+                )
+            )
+        day += timedelta(days=1)
+
+    # The opening hours are the inverse of bookings; a slot is open where it is "booked" by any business hour
+    return ~_bookings_bitmap(opening_hours, period_start, slots)
+
+
+def _business_hours(through_model, owner_field: str, owner_ids: List[int]):
+    business_hours: Dict[int, List[tuple]] = {owner_id: [] for owner_id in owner_ids}
+    for owner_id, *business_hour in through_model.objects.filter(
+        **{f"{owner_field}__in": owner_ids, "businesshour__is_archived": False}
+    ).values_list(
+        owner_field,
+        "businesshour__day_of_week",
+        "businesshour__start_of_business_hours",
+        "businesshour__end_of_business_hours",
+        "businesshour__valid_from",
+        "businesshour__valid_through",
+    ):
+        business_hours[owner_id].append(tuple(business_hour))
+    return business_hours
+
+
+def availability_bitmap(
+    room_ids: List[int],
+    period_start: datetime,
+    slots: int,
+    person_ids: Optional[List[int]] = None,
+    tz=None,
+) -> np.ndarray:
+    """Get a bitmap of the slots, from period_start, at which all of the given rooms and people are free"""
+    person_ids = person_ids or []
+    tz = tz or dj_timezone.get_current_timezone()
+    period_end = period_start + SLOT * slots
+
+    room_bookings = room_occupancy_index.bookings(room_ids, period_start, period_end)
+    person_calendars = load_person_calendars(person_ids, period_start, period_end)
+    room_business_hours = _business_hours(
+        Room.business_hours.through, "room_id", room_ids
+    )
+    person_business_hours = _business_hours(
+        Person.business_hours.through, "person_id", person_ids
+    )
+
+    # The (start, end) bookings and the business hours of each resource
+    resources = [
+        (
+            [(start, end) for _, _, start, end in room_bookings[room_id]],
+            room_business_hours[room_id],
+        )
+        for room_id in room_ids
+    ] + [
+        (
+            [
+                (booking.start, booking.end)
+                for booking in (
+                    person_calendars[person_id].events
+                    if person_id in person_calendars
+                    else []
+                )
+            ],
+            person_business_hours[person_id],
+        )
+        for person_id in person_ids
+    ]
+
+    free = np.ones(slots, dtype=bool)
+    for bookings, business_hours in resources:
+        free &= _bookings_bitmap(bookings, period_start, slots)
+
+        open_slots = _business_hours_bitmap(business_hours, period_start, slots, tz)
+        if open_slots is not None:
+            free &= open_slots
+
+    return free
+
+
+def find_free_windows(
+    room_ids: List[int],
+    duration: timedelta,
+    start: datetime,
+    end: datetime,
+    person_ids: Optional[List[int]] = None,
+    count: int = 5,
+    tz=None,
+) -> List[FreeWindow]:
+    """
+    Find the first count windows of the given duration, between start and end, at which all of the given rooms and
+    people are free. Each window starts a separate run of free time; the windows never overlap.
+
+    raises:
+        ValueError: if the period is empty or longer than MAX_PERIOD, or the duration is not positive
+    """
+    if duration <= timedelta(0):
+        raise ValueError("The duration must be positive")
+    if end <= start:
+        raise ValueError("The end of the period must be after its start")
+    if end - start > MAX_PERIOD:
+        raise ValueError(f"The period can not be longer than {MAX_PERIOD.days} days")
+
+    # Align the period to whole slots, such that windows start on the slot grid
+    period_start = start + (-(start - _EPOCH) % SLOT)
+    slots = int((end - period_start) // SLOT)
+    needed_slots = int(np.ceil(duration / SLOT))
+    if slots < needed_slots:
+        return []
+
+    free = availability_bitmap(room_ids, period_start, slots, person_ids, tz)
+
+    # The runs of free slots are found where the padded bitmap changes
+    changes = np.flatnonzero(np.diff(np.concatenate(([False], free, [False]))))
+    run_starts, run_ends = changes[0::2], changes[1::2]
+    fitting = (run_ends - run_starts) >= needed_slots
+
+    return [
+        FreeWindow(
+            start=period_start + SLOT * int(run_start),
+            end=period_start + SLOT * int(run_start) + duration,
+            free_until=period_start + SLOT * int(run_end),
+        )
+        for run_start, run_end in zip(
+            run_starts[fitting][:count], run_ends[fitting][:count]
+        )
+    ]
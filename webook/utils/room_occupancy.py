@@ -0,0 +1,385 @@
+"""room_occupancy.py
+
+In-process index of the occupancy (bookings) of rooms, for answering collision queries without going to the database.
+
+Each room in the index holds its bookings -- the non-archived events booked in the room -- sorted by start, such that
+the bookings overlapping a period are found by bisection. Rooms are loaded lazily, all stale rooms of a query in one
+query, and kept up to date incrementally from the signals on Event and Event.rooms (see arrangement/signals.py).
+
+Only the bookings that end after the horizon of a room, settings.ROOM_OCCUPANCY_INDEX_HISTORY_DAYS before the room was
+loaded, are held. Queries for periods that start before the horizon are answered by the database instead.
+
+Every room has a version, which is bumped on each change to the bookings of the room. The versions are shared between
+processes through Redis, and the bookings of each room are mirrored there; a process that finds that its version of a
+room is behind reloads the room from the mirror, or from the database if the mirror is behind as well. Without Redis
+(settings.USE_REDIS) the versions are local to each process, and a worker can not tell that another worker has
+changed the bookings of a room. The index then holds no rooms, and every query is answered by the database.
+Changes that are made without sending signals (bulk operations, queryset updates) are not seen by the index, which is
+why rooms are reloaded once they are older than settings.ROOM_OCCUPANCY_INDEX_MAX_AGE regardless of their version.
+Mirrors expire along with the rooms they were loaded for, for the same reason. Code doing such changes to bookings may
+call invalidate for the affected rooms, to have them reloaded right away.
+
+Virtual series (see arrangement/virtual_series.py) book rooms without stored events. The calendars of the virtual
+series of a room are loaded along with the room, and their occurrences are expanded for the period of each query.
+Changes to virtual series, and to the events that are exceptions to them, invalidate the rooms of the series.
+
+"""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from webook.arrangement.models import Event
+from webook.arrangement.periods import room_bookings
+
+# A booking of a room; (start, end, event id, title, serie id), ordered by start
+_Booking = Tuple[datetime, datetime, int, str, Optional[int]]
+
+
+def _version_key(room_id: int) -> str:
+    return f"room_occupancy:version:{room_id}"
+
+
+def _mirror_key(room_id: int) -> str:
+    return f"room_occupancy:room:{room_id}"
+
+
+def _as_aware(moment: datetime) -> datetime:
+    if timezone.is_naive(moment):
+        return timezone.make_aware(moment, timezone.get_default_timezone())
+    return moment
+
+
+def _virtual_calendars(room_ids: Iterable[int]) -> Dict[int, list]:
+    """
+    Load the calendars of the virtual series that book the given rooms. The occurrences of virtual series are not
+    stored as bookings; the calendars of their series are loaded instead.
+    """
+    from webook.arrangement.virtual_series import load_virtual_serie_calendars
+
+    return load_virtual_serie_calendars(room_ids=room_ids)[0]
+
+
+class _RoomOccupancy:
+    """
+    The bookings of a room that end at or after its horizon, sorted by start, and the calendars of the virtual series
+    that book the room
+    """
+
+    def __init__(
+        self,
+        version: int,
+        bookings: List[_Booking],
+        horizon: datetime,
+        loaded_at: Optional[float] = None,
+    ):
+        self.version = version
+        self.horizon = horizon
+        self.virtual_calendars = []
+        # Wall clock time, such that the age of a room carries over to the processes that load it from the mirror
+        self.loaded_at = time.time() if loaded_at is None else loaded_at
+        self.bookings = sorted(bookings)
+        self.starts = [booking[0] for booking in self.bookings]
+        self.by_event = {booking[2]: booking for booking in self.bookings}
+        # An upper bound of the longest booking; it is not lowered when bookings are removed
+        self.longest = max(
+            (booking[1] - booking[0] for booking in self.bookings),
+            default=timedelta(0),
+        )
+
+    def remove(self, event_id: int) -> None:
+        booking = self.by_event.pop(event_id, None)
+        if booking is None:
+            return
+        index = bisect_left(self.bookings, booking)
+        del self.bookings[index]
+        del self.starts[index]
+
+    def upsert(self, booking: _Booking) -> None:
+        self.remove(booking[2])
+        index = bisect_left(self.bookings, booking)
+        self.bookings.insert(index, booking)
+        self.starts.insert(index, booking[0])
+        self.by_event[booking[2]] = booking
+        self.longest = max(self.longest, booking[1] - booking[0])
+
+    def overlapping(
+        self, start: datetime, end: datetime, ignore_serie_pk: Optional[int]
+    ) -> List[Tuple[int, str, datetime, datetime]]:
+        """
+        Get the (id, title, start, end) of the bookings that start before or at end, and end at or after start, ordered
+        by event id, followed by the occurrences of virtual series (with their serie positional hash as id), ordered by
+        start
+        """
+        lower = bisect_left(self.starts, start - self.longest)
+        upper = bisect_right(self.starts, end, lower)
+
+        overlapping = sorted(
+            (event_id, title, booking_start, booking_end)
+            for booking_start, booking_end, event_id, title, serie_id in self.bookings[
+                lower:upper
+            ]
+            if booking_end >= start
+            and not (ignore_serie_pk and serie_id == ignore_serie_pk)
+        )
+        overlapping += sorted(
+            (
+                occurrence
+                for calendar in self.virtual_calendars
+                if calendar.serie_id != ignore_serie_pk
+                for occurrence in calendar.bookings(start, end)
+            ),
+            key=lambda occurrence: occurrence[2],
+        )
+        return overlapping
+
+
+class RoomOccupancyIndex:
+    """A thread safe, in-process index of the bookings of rooms"""
+
+    def __init__(self, max_age: int, history: timedelta):
+        self.max_age = max_age
+        self.history = history
+        self.hits = 0
+        self.misses = 0
+
+        self._rooms: Dict[int, _RoomOccupancy] = {}
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _current_versions(self, room_ids: List[int]) -> Dict[int, int]:
+        if settings.USE_REDIS:
+            versions = cache.get_many([_version_key(room_id) for room_id in room_ids])
+            return {
+                room_id: versions.get(_version_key(room_id), 0) for room_id in room_ids
+            }
+
+        with self._lock:
+            return {room_id: self._versions.get(room_id, 0) for room_id in room_ids}
+
+    def _bump_version(self, room_id: int) -> int:
+        if settings.USE_REDIS:
+            cache.add(_version_key(room_id), 0, None)
+            return cache.incr(_version_key(room_id))
+
+        with self._lock:
+            self._versions[room_id] = self._versions.get(room_id, 0) + 1
+            return self._versions[room_id]
+
+    def _is_fresh(self, occupancy: Optional[_RoomOccupancy], version: int) -> bool:
+        return (
+            occupancy is not None
+            and occupancy.version == version
+            and time.time() - occupancy.loaded_at < self.max_age
+        )
+
+    def _mirror(self, occupancy: _RoomOccupancy) -> Tuple[tuple, int]:
+        """Get the mirror of the given room, and the seconds it should be kept until the room is due to be reloaded"""
+        return (
+            (
+                occupancy.version,
+                occupancy.loaded_at,
+                occupancy.horizon,
+                list(occupancy.bookings),
+            ),
+            max(1, int(occupancy.loaded_at + self.max_age - time.time())),
+        )
+
+    def _load(self, versions: Dict[int, int]) -> Dict[int, _RoomOccupancy]:
+        """Load the given rooms from the Redis mirror where it is current, and from the database otherwise"""
+        loaded = {}
+
+        if settings.USE_REDIS:
+            mirrors = cache.get_many([_mirror_key(room_id) for room_id in versions])
+            for room_id, version in versions.items():
+                mirror = mirrors.get(_mirror_key(room_id))
+                if mirror is not None and mirror[0] == version:
+                    loaded[room_id] = _RoomOccupancy(
+                        version, mirror[3], horizon=mirror[2], loaded_at=mirror[1]
+                    )
+
+        virtual_calendars = _virtual_calendars(versions)
+
+        bookings = {room_id: [] for room_id in versions if room_id not in loaded}
+        if bookings:
+            horizon = timezone.now() - self.history
+            for room_id, *booking in room_bookings(list(bookings), horizon):
+                bookings[room_id].append(tuple(booking))
+
+            for room_id, loaded_bookings in bookings.items():
+                loaded[room_id] = _RoomOccupancy(
+                    versions[room_id], loaded_bookings, horizon
+                )
+
+            if settings.USE_REDIS:
+                # The rooms are loaded together, and are due to be reloaded at the same time
+                cache.set_many(
+                    {
+                        _mirror_key(room_id): self._mirror(loaded[room_id])[0]
+                        for room_id in bookings
+                    },
+                    self.max_age,
+                )
+
+        for room_id, occupancy in loaded.items():
+            occupancy.virtual_calendars = virtual_calendars.get(room_id, [])
+
+        return loaded
+
+    def _query(
+        self,
+        room_ids: List[int],
+        start: datetime,
+        end: datetime,
+        virtual_calendars: Dict[int, list],
+    ) -> Dict[int, _RoomOccupancy]:
+        """Get the bookings of the given rooms that overlap the period between start and end from the database"""
+        bookings = {room_id: [] for room_id in room_ids}
+        for room_id, *booking in room_bookings(room_ids, start, end):
+            bookings[room_id].append(tuple(booking))
+
+        queried = {}
+        for room_id, room_bookings_in_period in bookings.items():
+            queried[room_id] = _RoomOccupancy(
+                0, room_bookings_in_period, _as_aware(start)
+            )
+            queried[room_id].virtual_calendars = virtual_calendars.get(room_id, [])
+        return queried
+
+    def bookings(
+        self,
+        room_ids: Iterable[int],
+        start: datetime,
+        end: datetime,
+        ignore_serie_pk: Optional[int] = None,
+    ) -> Dict[int, List[Tuple[int, str, datetime, datetime]]]:
+        """
+        Get the (id, title, start, end) of the bookings of each of the given rooms that overlap the period between start
+        and end, ordered by event id. Bookings of the serie with pk ignore_serie_pk are left out.
+        """
+        room_ids = list(room_ids)
+
+        if not settings.USE_REDIS:
+            # The versions of rooms are local to the process without Redis, and can not tell that another process has
+            # changed the bookings of a room; the bookings are read from the database on every query instead
+            rooms = self._query(room_ids, start, end, _virtual_calendars(room_ids))
+            with self._lock:
+                self.misses += len(room_ids)
+            return {
+                room_id: rooms[room_id].overlapping(start, end, ignore_serie_pk)
+                for room_id in room_ids
+            }
+
+        versions = self._current_versions(room_ids)
+
+        with self._lock:
+            rooms = {room_id: self._rooms.get(room_id) for room_id in room_ids}
+        stale = {
+            room_id: versions[room_id]
+            for room_id, occupancy in rooms.items()
+            if not self._is_fresh(occupancy, versions[room_id])
+        }
+
+        if stale:
+            loaded = self._load(stale)
+            rooms.update(loaded)
+            with self._lock:
+                self._rooms.update(loaded)
+
+        # Periods that start before the horizon of a room are beyond the bookings it holds
+        historic = [
+            room_id for room_id in room_ids if _as_aware(start) < rooms[room_id].horizon
+        ]
+        if historic:
+            rooms.update(
+                self._query(
+                    historic,
+                    start,
+                    end,
+                    {room_id: rooms[room_id].virtual_calendars for room_id in historic},
+                )
+            )
+
+        with self._lock:
+            self.hits += len(room_ids) - len(stale)
+            self.misses += len(stale)
+
+            return {
+                room_id: rooms[room_id].overlapping(start, end, ignore_serie_pk)
+                for room_id in room_ids
+            }
+
+    def _apply(self, room_ids: Iterable[int], change) -> None:
+        """Apply a change to the given rooms, where they are current, and bump their versions"""
+        for room_id in room_ids:
+            version = self._bump_version(room_id)
+            mirror = None
+
+            with self._lock:
+                occupancy = self._rooms.get(room_id)
+                if change is not None and self._is_fresh(occupancy, version - 1):
+                    change(occupancy)
+                    occupancy.version = version
+                    mirror = self._mirror(occupancy)
+                else:
+                    self._rooms.pop(room_id, None)
+
+            if settings.USE_REDIS:
+                if mirror is not None:
+                    cache.set(_mirror_key(room_id), *mirror)
+                else:
+                    cache.delete(_mirror_key(room_id))
+
+    def versions(self, room_ids: Iterable[int]) -> Dict[int, int]:
+        """Get the current versions of the given rooms; the version of a room changes whenever its bookings change"""
+        return self._current_versions(list(room_ids))
+
+    def event_changed(self, event: Event, room_ids: Iterable[int]) -> None:
+        """Update the booking of the given event, in the given rooms"""
+        if event.is_archived:
+            self.event_removed(event.pk, room_ids)
+            return
+        if not isinstance(event.start, datetime) or not isinstance(event.end, datetime):
+            self.invalidate(room_ids)
+            return
+
+        booking = (event.start, event.end, event.pk, event.title, event.serie_id)
+        self._apply(room_ids, lambda occupancy: occupancy.upsert(booking))
+
+    def event_removed(self, event_id: int, room_ids: Iterable[int]) -> None:
+        """Remove the booking of the given event, from the given rooms"""
+        self._apply(room_ids, lambda occupancy: occupancy.remove(event_id))
+
+    def invalidate(self, room_ids: Iterable[int]) -> None:
+        """Have the given rooms reloaded when they are next queried"""
+        self._apply(room_ids, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "rooms": len(self._rooms),
+                "bookings": sum(
+                    len(occupancy.bookings) for occupancy in self._rooms.values()
+                ),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rooms.clear()
+            self._versions.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+room_occupancy_index = RoomOccupancyIndex(
+    max_age=getattr(settings, "ROOM_OCCUPANCY_INDEX_MAX_AGE", 300),
+    history=timedelta(days=getattr(settings, "ROOM_OCCUPANCY_INDEX_HISTORY_DAYS", 31)),
+)
@@ -0,0 +1,155 @@
+"""serie_cache.py
+
+Memoization of serie expansions (calculate_serie).
+
+The same plan manifest tends to be calculated many times over; the collision analysis is re-run as the user edits
+the serie, and then the serie is calculated again when it is created. Expansions are cached by a hash of every
+field on the manifest that affects the expansion, so that unsaved manifests and manifests that are re-created from
+form data hit the same cache entries.
+
+The cache is an in-process LRU bounded by the total amount of cached events. If Redis is in use the expansions are
+also stored there, so that they are shared between processes.
+Cached events are copied both when stored and when handed out, as callers annotate the events they are given.
+
+"""
+
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from webook.arrangement.models import PlanManifest
+
+# The fields, in addition to those of PlanManifest.hash_key, that affect the expansion of a manifest
+_EXPANSION_FIELDS = [
+    "interval",
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+    "arbitrator",
+    "day_of_week",
+    "day_of_month",
+    "month",
+    "stop_within",
+    "stop_after_x_occurences",
+    "project_x_months_into_future",
+]
+
+
+def serie_cache_key(
+    serie_manifest: PlanManifest, tz, exclusions: Optional[Iterable] = None
+) -> str:
+    """Get the cache key of the expansion of the given manifest in the given timezone"""
+    parts = [serie_manifest.hash_key(), tz.zone]
+    parts += [str(getattr(serie_manifest, field)) for field in _EXPANSION_FIELDS]
+    parts += sorted(str(exclusion) for exclusion in exclusions or [])
+
+    return "serie_expansion:" + hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+class SerieExpansionCache:
+    """A bounded, thread safe LRU cache of serie expansions"""
+
+    def __init__(self, max_events: int, timeout: int = 3600):
+        self.max_events = max_events
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._events = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _copy(events: list) -> list:
+        return [copy.copy(event) for event in events]
+
+    def _store(self, key: str, events: list) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._events -= len(self._entries.pop(key))
+            if len(events) > self.max_events:
+                return
+
+            self._entries[key] = events
+            self._events += len(events)
+
+            while self._events > self.max_events:
+                _, evicted = self._entries.popitem(last=False)
+                self._events -= len(evicted)
+
+    def get(self, key: str) -> Optional[list]:
+        """Get a copy of the cached expansion with the given key, or None if it is not cached"""
+        with self._lock:
+            events = self._entries.get(key)
+            if events is not None:
+                self._entries.move_to_end(key)
+
+        if events is None and settings.USE_REDIS:
+            events = cache.get(key)
+            if events is not None:
+                self._store(key, events)
+
+        with self._lock:
+            if events is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return self._copy(events)
+
+    def set(self, key: str, events: list) -> None:
+        events = self._copy(events)
+        self._store(key, events)
+
+        if settings.USE_REDIS:
+            cache.set(key, events, self.timeout)
+
+    def get_or_calculate(
+        self,
+        serie_manifest: PlanManifest,
+        tz,
+        exclusions: Optional[Iterable],
+        calculate: Callable[..., List],
+    ) -> List:
+        """Get the expansion of the given manifest from the cache, calculating and caching it if it is not cached"""
+        if exclusions is not None:
+            exclusions = list(exclusions)
+
+        key = serie_cache_key(serie_manifest, tz, exclusions)
+        events = self.get(key)
+
+        if events is None:
+            events = calculate(serie_manifest, tz, exclusions)
+            self.set(key, events)
+
+        return events
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "events": self._events,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._events = 0
+            self.hits = 0
+            self.misses = 0
+
+
+serie_expansion_cache = SerieExpansionCache(
+    max_events=getattr(settings, "SERIE_EXPANSION_CACHE_MAX_EVENTS", 250000)
+)
@@ -1,12 +1,16 @@
 import calendar
 from dataclasses import dataclass
-from datetime import datetime, time, timedelta
-from typing import List, Optional
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Iterable, Iterator, List, Optional, Union
 
+import numpy as np
 from dateutil.relativedelta import *
 from pytz import timezone
 
 from webook.arrangement.models import PlanManifest
+from webook.utils.serie_cache import serie_expansion_cache
+from webook.utils.serie_vectorizer import combine, vectorized_strategies
+from webook.utils.tz_offset_table import localize_wall_times
 
 """
 
@@ -31,6 +35,15 @@ class LikelyInfiniteLoopException(Exception):
     pass
 
 
+class ImpossibleSerieException(Exception):
+    """Raised for serie manifests that can not give a sensible serie, for instance one with an interval of 0"""
+
+    pass
+
+
+_LIKELY_INFINITE_LOOP_THRESHOLD = 15000
+
+
 @dataclass
 class _Scope:
     start_date: datetime
@@ -63,6 +76,16 @@ class _CycleInstruction:
     tz: timezone
 
 
+@dataclass
+class _CycleCursor:
+    """The position of the cycling loop; everything needed to resume cycling at a given cycle"""
+
+    cycle: int
+    date: datetime
+    instances: int
+    occurrences: int
+
+
 @dataclass
 class _RecurrenceInstruction:
     """Instructions for how recurrence is to be calculated (cycling)"""
@@ -274,7 +297,7 @@ def _pattern_strategy_arbitrary_weekday_in_month(cycle: _CycleInstruction) -> _E
         )
 
     date = _day_seek(
-        cycle.start_date.replace(month=cycle.month),
+        cycle.start_date.replace(day=1, month=cycle.month),
         int(cycle.arbitrator),
         cycle.day_of_week,
     )
@@ -358,13 +381,559 @@ _area_strategies = {
 }
 
 
-def calculate_serie(
-    serie_manifest: PlanManifest, tz=timezone("Europe/Oslo")
-) -> List[_Event]:
+def _weekdays_between(start: date, end: date) -> int:
+    """Count the weekdays (monday through friday) in the half-open range [start, end)"""
+    if end <= start:
+        return 0
+    full_weeks, remainder = divmod((end - start).days, 7)
+    count = full_weeks * 5
+    for offset in range(remainder):
+        if (start.weekday() + offset) % 7 < 5:
+            count += 1
+    return count
+
+
+def _months_between(start: date, end: date) -> int:
+    """Count the month boundaries crossed when going from the month of start to the month of end"""
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def _end_of(day: date, serie_manifest: PlanManifest, tz: timezone) -> datetime:
+    """Get the localized end of the event generated on the given day, as the cycling loop would have it"""
+    return tz.localize(datetime.combine(day, serie_manifest.end_time))
+
+
+def _seek_daily_every_x_day(
+    serie_manifest: PlanManifest, target: date, tz: timezone
+) -> Optional[_CycleCursor]:
+    interval = serie_manifest.interval
+    if not interval or interval < 0:
+        return None
+
+    start = serie_manifest.start_date
+    cycle = max(0, (target - start).days // interval - 1)
+    if cycle == 0:
+        return None
+
+    previous_day = start + timedelta(days=(cycle - 1) * interval)
+    return _CycleCursor(
+        cycle=cycle,
+        date=_end_of(previous_day, serie_manifest, tz),
+        instances=cycle,
+        occurrences=cycle,
+    )
+
+
+def _seek_daily_every_weekday(
+    serie_manifest: PlanManifest, target: date, tz: timezone
+) -> Optional[_CycleCursor]:
+    start = serie_manifest.start_date
+    cycle = max(0, _weekdays_between(start, target) - 1)
+    if cycle == 0:
+        return None
+
+    # The weekday of the previous cycle is the last weekday before the one we are seeking to
+    previous_day = start
+    while previous_day.weekday() > 4:
+        previous_day += timedelta(days=1)
+    full_weeks, remainder = divmod(cycle - 1, 5)
+    previous_day += timedelta(days=full_weeks * 7)
+    for _ in range(remainder):
+        previous_day += timedelta(days=1)
+        while previous_day.weekday() > 4:
+            previous_day += timedelta(days=1)
+
+    return _CycleCursor(
+        cycle=cycle,
+        date=_end_of(previous_day, serie_manifest, tz) + relativedelta(days=1),
+        instances=cycle,
+        occurrences=cycle,
+    )
+
+
+def _seek_weekly_standard(
+    serie_manifest: PlanManifest, target: date, tz: timezone
+) -> Optional[_CycleCursor]:
+    interval = serie_manifest.interval
+    selected_days = [
+        day for day, is_on in _days_to_dict(serie_manifest).items() if is_on
+    ]
+    if not interval or interval < 0 or not selected_days:
+        return None
+
+    start = serie_manifest.start_date
+    first_monday = start - timedelta(days=start.weekday())
+    cycle = max(0, (target - first_monday).days // 7 // interval - 1)
+    if cycle == 0:
+        return None
+
+    first_week_count = len([day for day in selected_days if day >= start.weekday()])
+    if cycle == 1 and first_week_count == 0:
+        # The first cycle did not produce anything, so the cursor was never moved.
+        cursor_date = tz.localize(datetime.combine(start, datetime.min.time()))
+    else:
+        previous_monday = first_monday + timedelta(days=7 * interval * (cycle - 1))
+        cursor_date = _end_of(
+            previous_monday + timedelta(days=selected_days[-1]), serie_manifest, tz
+        )
+
+    return _CycleCursor(
+        cycle=cycle,
+        date=cursor_date,
+        instances=(1 if first_week_count else 0) + cycle - 1,
+        occurrences=first_week_count + (cycle - 1) * len(selected_days),
+    )
+
+
+def _seek_every_x_day_every_y_month(
+    serie_manifest: PlanManifest, target: date, tz: timezone
+) -> Optional[_CycleCursor]:
+    interval = serie_manifest.interval
+    day_of_month = serie_manifest.day_of_month
+    start = serie_manifest.start_date
+    # Only the regular case is seekable; where the first cycle is skipped, or the day does not exist in every month,
+    # the cycling is irregular and we leave it to the cycling loop.
+    if (
+        not interval
+        or interval < 0
+        or day_of_month is None
+        or day_of_month < start.day
+        or day_of_month > 28
+    ):
+        return None
+
+    cycle = max(0, _months_between(start, target) // interval - 1)
+    if cycle == 0:
+        return None
+
+    previous_month = start + relativedelta(months=(cycle - 1) * interval)
+    return _CycleCursor(
+        cycle=cycle,
+        date=_end_of(previous_month.replace(day=day_of_month), serie_manifest, tz),
+        instances=cycle,
+        occurrences=cycle,
+    )
+
+
+def _seek_every_arbitrary_date_of_month(
+    serie_manifest: PlanManifest, target: date, tz: timezone
+) -> Optional[_CycleCursor]:
+    interval = serie_manifest.interval
+    if not interval or interval < 0 or serie_manifest.arbitrator is None:
+        return None
+
+    start = serie_manifest.start_date
+    cycle = max(0, _months_between(start, target) // interval - 1)
+    if cycle == 0:
+        return None
+
+    previous_day = _day_seek(
+        start.replace(day=1) + relativedelta(months=(cycle - 1) * interval),
+        int(serie_manifest.arbitrator),
+        serie_manifest.day_of_week,
+    )
+    return _CycleCursor(
+        cycle=cycle,
+        date=_end_of(previous_day, serie_manifest, tz),
+        instances=cycle,
+        occurrences=cycle,
+    )
+
+
+def _seek_yearly(
+    serie_manifest: PlanManifest,
+    target: date,
+    tz: timezone,
+    day_of: Callable[[int], date],
+) -> Optional[_CycleCursor]:
+    """Seek for the yearly strategies, which move forward by (interval + 1) years per cycle"""
+    if serie_manifest.interval is None or serie_manifest.interval < 0:
+        return None
+
+    step = serie_manifest.interval + 1
+    start = serie_manifest.start_date
+    cycle = max(0, (target.year - start.year) // step - 1)
+    if cycle == 0:
+        return None
+
+    previous_day = day_of(start.year + (cycle - 1) * step)
+    return _CycleCursor(
+        cycle=cycle,
+        date=_end_of(previous_day, serie_manifest, tz) + relativedelta(years=1),
+        instances=cycle,
+        occurrences=cycle,
+    )
+
+
+def _seek_yearly_every_x_of_month(
+    serie_manifest: PlanManifest, target: date, tz: timezone
+) -> Optional[_CycleCursor]:
+    return _seek_yearly(
+        serie_manifest,
+        target,
+        tz,
+        lambda year: date(year, serie_manifest.month, serie_manifest.day_of_month),
+    )
+
+
+def _seek_arbitrary_weekday_in_month(
+    serie_manifest: PlanManifest, target: date, tz: timezone
+) -> Optional[_CycleCursor]:
+    if serie_manifest.arbitrator is None:
+        return None
+
+    return _seek_yearly(
+        serie_manifest,
+        target,
+        tz,
+        lambda year: _day_seek(
+            date(year, serie_manifest.month, 1),
+            int(serie_manifest.arbitrator),
+            serie_manifest.day_of_week,
+        ),
+    )
+
+
+_seek_strategies = {
+    "daily__every_x_day": _seek_daily_every_x_day,
+    "daily__every_weekday": _seek_daily_every_weekday,
+    "weekly__standard": _seek_weekly_standard,
+    "month__every_x_day_every_y_month": _seek_every_x_day_every_y_month,
+    "month__every_arbitrary_date_of_month": _seek_every_arbitrary_date_of_month,
+    "yearly__every_x_of_month": _seek_yearly_every_x_of_month,
+    "yearly__every_arbitrary_weekday_in_month": _seek_arbitrary_weekday_in_month,
+}
+"""
+Seek strategies mirror the pattern strategies, and compute the state of the cycling loop at (or just before) the cycle
+that produces the first event on or after a given date -- without running the cycles leading up to it.
+A seek strategy returns None if it can not (or need not) seek, in which case cycling starts from the beginning.
+"""
+
+
+@dataclass
+class SeriePrediction:
+    """The outcome of calculating a serie; how many events it gives, and on which dates the first and last are"""
+
+    count: int
+    first_date: Optional[date]
+    last_date: Optional[date]
+
+
+@dataclass
+class _Progression:
     """
-    Takes a serie manifest (PlanManifest) and calculates it, and returns the resulting events of said calculation.
+    The occurrences of a serie addressed by their (zero-indexed) position in the serie, in constant time.
+
+    nth gives the date of an occurrence, and index_on_or_before the index of the last occurrence on or before a date
+    (-1 if there is none). cursor_after gives the date cursor the cycling loop has after generating an occurrence, for
+    patterns where the loop may stop before reaching an occurrence that is within the stop date.
+    cycles_until gives the amount of cycles the loop runs to generate up to and including an occurrence, and
+    limit_cycles the amount of cycles it runs to generate a given instance limit.
     """
 
+    nth: Callable[[int], date]
+    index_on_or_before: Callable[[date], int]
+    cursor_after: Optional[Callable[[date], datetime]] = None
+    cycles_until: Callable[[int], int] = lambda n: n + 1
+    limit_cycles: Callable[[int], int] = lambda instances: instances
+
+
+def _require_interval(serie_manifest: PlanManifest, minimum: int = 1) -> int:
+    interval = serie_manifest.interval
+    if not isinstance(interval, int) or interval < minimum:
+        raise ImpossibleSerieException(
+            f"Interval must be at least {minimum}, got {interval}"
+        )
+    return interval
+
+
+def _require_in_range(serie_manifest: PlanManifest, field: str, lower: int, upper: int):
+    value = getattr(serie_manifest, field)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = None
+    if value is None or not lower <= value <= upper:
+        raise ImpossibleSerieException(
+            f"{field} must be between {lower} and {upper}, got {getattr(serie_manifest, field)}"
+        )
+    return value
+
+
+def _progression_daily_every_x_day(
+    serie_manifest: PlanManifest, tz: timezone
+) -> _Progression:
+    interval = _require_interval(serie_manifest)
+    start = serie_manifest.start_date
+
+    return _Progression(
+        nth=lambda n: start + timedelta(days=n * interval),
+        index_on_or_before=lambda day: (day - start).days // interval,
+    )
+
+
+def _progression_daily_every_weekday(
+    serie_manifest: PlanManifest, tz: timezone
+) -> _Progression:
+    start = serie_manifest.start_date
+
+    def index_on_or_before(day: date) -> int:
+        return _weekdays_between(start, day + timedelta(days=1)) - 1
+
+    def cursor_after(day: date) -> datetime:
+        return _end_of(day, serie_manifest, tz) + relativedelta(days=1)
+
+    return _Progression(
+        nth=lambda n: np.busday_offset(start, n, roll="forward").astype(date),
+        index_on_or_before=index_on_or_before,
+        cursor_after=cursor_after,
+    )
+
+
+def _progression_weekly_standard(
+    serie_manifest: PlanManifest, tz: timezone
+) -> _Progression:
+    interval = _require_interval(serie_manifest)
+    selected_days = [
+        day for day, is_on in _days_to_dict(serie_manifest).items() if is_on
+    ]
+    if not selected_days:
+        raise ImpossibleSerieException("No days of the week are selected")
+
+    start = serie_manifest.start_date
+    first_monday = start - timedelta(days=start.weekday())
+    first_week_days = [day for day in selected_days if day >= start.weekday()]
+
+    def nth(n: int) -> date:
+        if n < len(first_week_days):
+            return first_monday + timedelta(days=first_week_days[n])
+        week, position = divmod(n - len(first_week_days), len(selected_days))
+        return first_monday + timedelta(
+            days=7 * interval * (week + 1) + selected_days[position]
+        )
+
+    def index_on_or_before(day: date) -> int:
+        if day < first_monday:
+            return -1
+        week, weekday = divmod((day - first_monday).days, 7 * interval)
+        within_week = len([d for d in selected_days if d <= weekday])
+        if week == 0:
+            return len([d for d in first_week_days if d <= weekday]) - 1
+        return len(first_week_days) + (week - 1) * len(selected_days) + within_week - 1
+
+    def cycles_until(n: int) -> int:
+        if n < len(first_week_days):
+            return 1
+        return (n - len(first_week_days)) // len(selected_days) + 2
+
+    # The cycling loop goes on until it has generated the instance limit in weeks (not occurrences), and the first
+    # cycle does not count if there are no selected days left in the week of the start date.
+    return _Progression(
+        nth=nth,
+        index_on_or_before=index_on_or_before,
+        cycles_until=cycles_until,
+        limit_cycles=lambda instances: instances + (0 if first_week_days else 1),
+    )
+
+
+def _progression_every_x_day_every_y_month(
+    serie_manifest: PlanManifest, tz: timezone
+) -> Optional[_Progression]:
+    interval = _require_interval(serie_manifest)
+    day_of_month = _require_in_range(serie_manifest, "day_of_month", 1, 31)
+    start = serie_manifest.start_date
+
+    # As with seeking; when the first cycle is skipped, or the day does not exist in every month, the cycling is
+    # irregular and can not be predicted in constant time.
+    if day_of_month < start.day or day_of_month > 28:
+        return None
+
+    def nth(n: int) -> date:
+        return (start + relativedelta(months=n * interval)).replace(day=day_of_month)
+
+    def index_on_or_before(day: date) -> int:
+        n = _months_between(start, day) // interval
+        return n - 1 if nth(n) > day else n
+
+    return _Progression(
+        nth=nth,
+        index_on_or_before=index_on_or_before,
+    )
+
+
+def _progression_every_arbitrary_date_of_month(
+    serie_manifest: PlanManifest, tz: timezone
+) -> _Progression:
+    interval = _require_interval(serie_manifest)
+    arbitrator = _require_in_range(serie_manifest, "arbitrator", 0, 4)
+    day_of_week = _require_in_range(serie_manifest, "day_of_week", 0, 6)
+    first_of_month = serie_manifest.start_date.replace(day=1)
+
+    def nth(n: int) -> date:
+        return _day_seek(
+            first_of_month + relativedelta(months=n * interval),
+            arbitrator,
+            day_of_week,
+        )
+
+    def index_on_or_before(day: date) -> int:
+        n = _months_between(first_of_month, day) // interval
+        return n - 1 if nth(n) > day else n
+
+    return _Progression(nth=nth, index_on_or_before=index_on_or_before)
+
+
+def _progression_yearly(
+    serie_manifest: PlanManifest, tz: timezone, day_of: Callable[[int], date]
+) -> _Progression:
+    """Progression for the yearly strategies, which move forward by (interval + 1) years per cycle"""
+    step = _require_interval(serie_manifest, minimum=0) + 1
+    first_year = serie_manifest.start_date.year
+
+    def index_on_or_before(day: date) -> int:
+        n = (day.year - first_year) // step
+        return n - 1 if day_of(first_year + n * step) > day else n
+
+    def cursor_after(day: date) -> datetime:
+        return _end_of(day, serie_manifest, tz) + relativedelta(years=1)
+
+    return _Progression(
+        nth=lambda n: day_of(first_year + n * step),
+        index_on_or_before=index_on_or_before,
+        cursor_after=cursor_after,
+    )
+
+
+def _progression_yearly_every_x_of_month(
+    serie_manifest: PlanManifest, tz: timezone
+) -> _Progression:
+    month = _require_in_range(serie_manifest, "month", 1, 12)
+    day_of_month = _require_in_range(
+        serie_manifest,
+        "day_of_month",
+        1,
+        calendar.monthrange(2000, month)[1],  # 2000 being a leap year
+    )
+    if month == 2 and day_of_month == 29:
+        # Only leap years have the 29th of February, and cycling can not skip the years that do not
+        if (
+            not calendar.isleap(serie_manifest.start_date.year)
+            or (_require_interval(serie_manifest, minimum=0) + 1) % 4
+        ):
+            raise ImpossibleSerieException(
+                "The 29th of February does not occur in every year of the serie"
+            )
+
+    return _progression_yearly(
+        serie_manifest, tz, lambda year: date(year, month, day_of_month)
+    )
+
+
+def _progression_arbitrary_weekday_in_month(
+    serie_manifest: PlanManifest, tz: timezone
+) -> _Progression:
+    month = _require_in_range(serie_manifest, "month", 1, 12)
+    arbitrator = _require_in_range(serie_manifest, "arbitrator", 0, 4)
+    day_of_week = _require_in_range(serie_manifest, "day_of_week", 0, 6)
+
+    return _progression_yearly(
+        serie_manifest,
+        tz,
+        lambda year: _day_seek(date(year, month, 1), arbitrator, day_of_week),
+    )
+
+
+_progression_strategies = {
+    "daily__every_x_day": _progression_daily_every_x_day,
+    "daily__every_weekday": _progression_daily_every_weekday,
+    "weekly__standard": _progression_weekly_standard,
+    "month__every_x_day_every_y_month": _progression_every_x_day_every_y_month,
+    "month__every_arbitrary_date_of_month": _progression_every_arbitrary_date_of_month,
+    "yearly__every_x_of_month": _progression_yearly_every_x_of_month,
+    "yearly__every_arbitrary_weekday_in_month": _progression_arbitrary_weekday_in_month,
+}
+"""
+Progression strategies validate a serie manifest for their pattern, raising ImpossibleSerieException if it can not give
+a sensible serie, and describe its occurrences as a _Progression. A progression strategy returns None if the
+occurrences of the manifest are too irregular to be described in constant time.
+"""
+
+
+def _guard_cycles(cycles: int) -> None:
+    # The cycling loop raises when it is about to run a cycle past the threshold
+    if cycles > _LIKELY_INFINITE_LOOP_THRESHOLD + 1:
+        raise LikelyInfiniteLoopException(
+            "calculate_serie is in a likely infinite loop, as defined by threshold"
+        )
+
+
+def predict_serie(
+    serie_manifest: PlanManifest,
+    tz=timezone("Europe/Oslo"),
+    exclusions: Optional[Iterable[date]] = None,
+) -> Optional[SeriePrediction]:
+    """
+    Predict the outcome of calculating a serie manifest, in constant time, without calculating it.
+    Raises ImpossibleSerieException if the manifest can not give a sensible serie, and LikelyInfiniteLoopException
+    if calculating it would trip the infinite loop threshold. Returns None if the outcome can not be predicted, in
+    which case it remains to calculate the serie.
+    """
+    progression = _progression_strategies[serie_manifest.pattern_strategy](
+        serie_manifest, tz
+    )
+    if progression is None:
+        return None
+
+    scope = _get_scope(serie_manifest, tz)
+
+    if scope.stop_within_date is None:
+        if not isinstance(scope.instance_limit, int):
+            raise ImpossibleSerieException(
+                f"Instance limit must be a number, got {scope.instance_limit}"
+            )
+        count = max(scope.instance_limit, 0)
+        if count:
+            _guard_cycles(progression.limit_cycles(count))
+    elif scope.start_date > scope.stop_within_date.date():
+        count = 0
+    else:
+        last = progression.index_on_or_before(scope.stop_within_date.date())
+        if (
+            last >= 1
+            and progression.cursor_after is not None
+            and progression.cursor_after(progression.nth(last - 1))
+            >= scope.stop_within_date
+        ):
+            last -= 1
+        count = max(last + 1, 0)
+        if count:
+            # A lower bound; the loop may run one more cycle for an occurrence past the stop date
+            _guard_cycles(progression.cycles_until(last))
+
+    excluded = set()
+    for exclusion in exclusions or []:
+        index = progression.index_on_or_before(exclusion)
+        if 0 <= index < count and progression.nth(index) == exclusion:
+            excluded.add(index)
+
+    if len(excluded) == count:
+        return SeriePrediction(count=0, first_date=None, last_date=None)
+
+    first = 0
+    while first in excluded:
+        first += 1
+    last = count - 1
+    while last in excluded:
+        last -= 1
+
+    return SeriePrediction(
+        count=count - len(excluded),
+        first_date=progression.nth(first),
+        last_date=progression.nth(last),
+    )
+
+
+def _get_scope(serie_manifest: PlanManifest, tz: timezone) -> _Scope:
     recurrence_instructions = _RecurrenceInstruction(
         start_date=serie_manifest.start_date,
         stop_within_date=serie_manifest.stop_within,
@@ -374,28 +943,36 @@ def calculate_serie(
     )
 
     area_strategy = _area_strategies[serie_manifest.recurrence_strategy]
-    scope = area_strategy(recurrence_instructions)
-    pattern_strategy = _pattern_strategies[serie_manifest.pattern_strategy]
+    return area_strategy(recurrence_instructions)
 
-    events = []
 
-    date_cursor = tz.localize(datetime.combine(scope.start_date, datetime.min.time()))
-    instance_cursor = 0
-    cycle_cursor = 0
+def _run_cycles(
+    serie_manifest: PlanManifest, scope: _Scope, cursor: _CycleCursor, tz: timezone
+) -> Iterator[_Event]:
+    """
+    Run the cycling loop from the given cursor, yielding the events of each cycle as they are generated.
+    The cursor is moved forward as cycling progresses.
+    """
+    pattern_strategy = _pattern_strategies[serie_manifest.pattern_strategy]
+    days = _days_to_dict(serie_manifest)
+    cycles_run = 0
 
     while (
         scope.stop_within_date is not None
-        and date_cursor < scope.stop_within_date
-        or (scope.instance_limit != 0 and scope.instance_limit >= (instance_cursor + 1))
+        and cursor.date < scope.stop_within_date
+        or (
+            scope.instance_limit != 0 and scope.instance_limit >= (cursor.instances + 1)
+        )
     ):
-        if cycle_cursor > 15000:
+        if cycles_run > _LIKELY_INFINITE_LOOP_THRESHOLD:
             raise LikelyInfiniteLoopException(
                 "calculate_serie is in a likely infinite loop, as defined by threshold"
             )
+        cycles_run += 1
 
         cycle_instruction = _CycleInstruction(
-            cycle=cycle_cursor,
-            start_date=date_cursor,
+            cycle=cursor.cycle,
+            start_date=cursor.date,
             event=_Event(
                 title=serie_manifest.title,
                 start=serie_manifest.start_time,
@@ -403,7 +980,7 @@ def calculate_serie(
             ),
             arbitrator=serie_manifest.arbitrator,
             interval=serie_manifest.interval,
-            days=_days_to_dict(serie_manifest),
+            days=days,
             day_of_month=serie_manifest.day_of_month,
             day_of_week=serie_manifest.day_of_week,
             day_index=serie_manifest.day_of_month,
@@ -415,18 +992,18 @@ def calculate_serie(
 
         if result is None or (isinstance(result, list) and len(result) == 0):
             if serie_manifest.pattern_strategy == "month__every_x_day_every_y_month":
-                date_cursor = date_cursor + relativedelta(
+                cursor.date = cursor.date + relativedelta(
                     months=serie_manifest.interval
                 )
-            cycle_cursor += 1
+            cursor.cycle += 1
             continue
 
         if isinstance(result, list):
-            date_cursor = result[-1].end
-            events += result
+            cursor.date = result[-1].end
+            events = result
         else:
-            date_cursor = result.end
-            events.append(result)
+            cursor.date = result.end
+            events = [result]
 
             if (
                 serie_manifest.pattern_strategy == "yearly__every_x_of_month"
@@ -435,18 +1012,97 @@ def calculate_serie(
             ):
                 # if the pattern is yearly__every_x_of_month we can't rely on new event end time to move the date cursor
                 # this because the yearly generates event in one day, so the date does not change. hence we +1
-                date_cursor += relativedelta(years=1)
+                cursor.date += relativedelta(years=1)
 
             if serie_manifest.pattern_strategy == "daily__every_weekday":
                 # if the pattern is daily__every_weekday we can't rely on new event end time to move the date cursor
                 # this because the daily generates event in one day, so the date does not change. hence we +1
                 # we could also do +1 if result.end.date() != date_cursor.date() but this would cause duplicates for mondays after weekends
-                date_cursor += relativedelta(days=1)
+                cursor.date += relativedelta(days=1)
 
         if scope.instance_limit != 0:
-            instance_cursor += 1
+            cursor.instances += 1
+
+        cursor.cycle += 1
+
+        for event in events:
+            cursor.occurrences += 1
+            yield event
+
+
+def _calculate_serie_vectorized(
+    serie_manifest: PlanManifest,
+    scope: _Scope,
+    tz: timezone,
+    exclusions: Optional[Iterable[date]],
+) -> Optional[List[_Event]]:
+    """
+    Calculate the serie with the vectorized strategy of its pattern, if it has one that can expand it.
+    Returns None if not, in which case the serie must be calculated by cycling.
+    """
+    vectorized_strategy = vectorized_strategies.get(serie_manifest.pattern_strategy)
+    expansion = (
+        vectorized_strategy(serie_manifest, scope, tz) if vectorized_strategy else None
+    )
+    if expansion is None:
+        return None
+
+    days, cycles = expansion
+    # The cycling loop raises when it is about to run a cycle past the threshold
+    if cycles > _LIKELY_INFINITE_LOOP_THRESHOLD + 1:
+        raise LikelyInfiniteLoopException(
+            "calculate_serie is in a likely infinite loop, as defined by threshold"
+        )
+
+    if exclusions:
+        days = days[~np.isin(days, np.array(list(exclusions), dtype="datetime64[D]"))]
 
-        cycle_cursor += 1
+    starts = localize_wall_times(tz, combine(days, serie_manifest.start_time))
+    ends = localize_wall_times(tz, combine(days, serie_manifest.end_time))
+
+    return [
+        _Event(title=serie_manifest.title, start=start, end=end)
+        for start, end in zip(starts, ends)
+    ]
+
+
+def calculate_serie(
+    serie_manifest: PlanManifest,
+    tz=timezone("Europe/Oslo"),
+    exclusions: Optional[Iterable[date]] = None,
+) -> List[_Event]:
+    """
+    Takes a serie manifest (PlanManifest) and calculates it, and returns the resulting events of said calculation.
+    Events starting on any of the dates in exclusions are left out of the result.
+    Calculations are memoized in serie_expansion_cache.
+    """
+    return serie_expansion_cache.get_or_calculate(
+        serie_manifest, tz, exclusions, _calculate_serie
+    )
+
+
+def _calculate_serie(
+    serie_manifest: PlanManifest,
+    tz: timezone,
+    exclusions: Optional[Iterable[date]],
+) -> List[_Event]:
+    # Reject degenerate manifests, and manifests that would trip the threshold, before expanding anything
+    predict_serie(serie_manifest, tz)
+
+    scope = _get_scope(serie_manifest, tz)
+
+    events = _calculate_serie_vectorized(serie_manifest, scope, tz, exclusions)
+    if events is not None:
+        return events
+
+    cursor = _CycleCursor(
+        cycle=0,
+        date=tz.localize(datetime.combine(scope.start_date, datetime.min.time())),
+        instances=0,
+        occurrences=0,
+    )
+
+    events = list(_run_cycles(serie_manifest, scope, cursor, tz))
 
     if scope.stop_within_date:
         events = list(
@@ -455,4 +1111,60 @@ def calculate_serie(
     if scope.instance_limit:
         events = events[: scope.instance_limit]
 
+    if exclusions:
+        exclusions = set(exclusions)
+        events = [event for event in events if event.start.date() not in exclusions]
+
     return events
+
+
+def iter_serie(
+    serie_manifest: PlanManifest,
+    window_start: Union[date, datetime],
+    window_end: Union[date, datetime],
+    tz=timezone("Europe/Oslo"),
+) -> Iterator[_Event]:
+    """
+    Lazily generate the events of a serie manifest that overlap the window between window_start and window_end.
+
+    Yields the same events as calculate_serie would produce in the window, but instead of cycling from the start of the
+    serie it seeks straight to the first cycle inside of the window, so that the cost is proportional to the amount of
+    events in the window rather than the length of the serie. Dates are taken as midnight in the given timezone.
+    """
+
+    def as_datetime(value: Union[date, datetime]) -> datetime:
+        if not isinstance(value, datetime):
+            value = datetime.combine(value, datetime.min.time())
+        if value.tzinfo is None:
+            value = tz.localize(value)
+        return value
+
+    window_start = as_datetime(window_start)
+    window_end = as_datetime(window_end)
+
+    scope = _get_scope(serie_manifest, tz)
+    seek_strategy = _seek_strategies[serie_manifest.pattern_strategy]
+
+    cursor = seek_strategy(
+        serie_manifest, window_start.astimezone(tz).date(), tz
+    ) or _CycleCursor(
+        cycle=0,
+        date=tz.localize(datetime.combine(scope.start_date, datetime.min.time())),
+        instances=0,
+        occurrences=0,
+    )
+
+    for event in _run_cycles(serie_manifest, scope, cursor, tz):
+        if scope.instance_limit and cursor.occurrences > scope.instance_limit:
+            return
+        if (
+            scope.stop_within_date
+            and event.start.date() > scope.stop_within_date.date()
+        ):
+            continue
+        if event.start >= window_end:
+            return
+        if event.end <= window_start:
+            continue
+
+        yield event
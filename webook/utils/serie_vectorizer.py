@@ -0,0 +1,203 @@
+"""serie_vectorizer.py
+
+Vectorized (NumPy) expansion of the regular pattern strategies of serie_calculator.
+
+The daily and weekly patterns are regular enough that the dates of all their occurrences can be computed as
+datetime64 arrays in one go, instead of cycling over them one event at a time. Each strategy here mirrors the cycling
+loop of its pattern exactly -- including how the loop decides whether to run another cycle -- and returns the dates
+of the occurrences together with the amount of cycles the loop would have run, so that the caller can apply the
+same infinite loop threshold.
+
+A strategy returns None when it is given a manifest it can not expand, in which case the caller should fall back to
+cycling.
+
+"""
+
+from datetime import datetime, time
+from typing import Optional, Tuple
+
+import numpy as np
+from pytz import utc
+
+from webook.arrangement.models import PlanManifest
+from webook.utils.tz_offset_table import utc_offsets
+
+_ONE_DAY = np.timedelta64(1, "D")
+
+
+def _as_timedelta(value: time) -> np.timedelta64:
+    return np.timedelta64(
+        ((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000
+        + value.microsecond,
+        "us",
+    )
+
+
+def combine(days: np.ndarray, value: time) -> np.ndarray:
+    """The vectorized counterpart of datetime.combine; get the wall times of value on each of the days"""
+    return days.astype("datetime64[us]") + _as_timedelta(value)
+
+
+def _as_day(value) -> np.datetime64:
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, "D")
+
+
+def _instants(wall_times: np.ndarray, tz) -> np.ndarray:
+    """Convert naive wall times in tz to naive UTC instants, which can be compared directly"""
+    wall_times = wall_times.astype("datetime64[us]")
+    return wall_times - utc_offsets(tz, wall_times)
+
+
+def _end_instants(days: np.ndarray, serie_manifest: PlanManifest, tz) -> np.ndarray:
+    return _instants(combine(days, serie_manifest.end_time), tz)
+
+
+def _stop_instant(scope) -> np.datetime64:
+    return np.datetime64(
+        scope.stop_within_date.astimezone(utc).replace(tzinfo=None), "us"
+    )
+
+
+def _cycles_run(cursors: np.ndarray, scope) -> np.ndarray:
+    """
+    Given the instant the cycle cursor is at when each cycle after the first is about to start, get a mask of which
+    cycles the cycling loop actually runs. The first cycle always runs, and cycling stops at the first cursor that is
+    not before the stop date.
+    """
+    return np.logical_and.accumulate(
+        np.concatenate(([True], cursors < _stop_instant(scope)))
+    )
+
+
+def _limit(scope) -> Optional[int]:
+    if scope.stop_within_date is not None:
+        return None
+    if isinstance(scope.instance_limit, int) and scope.instance_limit > 0:
+        return scope.instance_limit
+    return -1
+
+
+def _interval(serie_manifest: PlanManifest) -> Optional[int]:
+    interval = serie_manifest.interval
+    if isinstance(interval, int) and interval > 0:
+        return interval
+    return None
+
+
+def _vectorized_daily_every_x_day(
+    serie_manifest: PlanManifest, scope, tz
+) -> Optional[Tuple[np.ndarray, int]]:
+    interval = _interval(serie_manifest)
+    limit = _limit(scope)
+    if interval is None or limit == -1:
+        return None
+
+    start = _as_day(scope.start_date)
+
+    if limit is not None:
+        return start + np.arange(limit) * interval, limit
+
+    stop = _as_day(scope.stop_within_date)
+    if start > stop:
+        return np.array([], dtype="datetime64[D]"), 0
+
+    # Include the first date past the stop date, as the loop will run a cycle for it as well
+    candidates = np.arange(start, stop + interval + 1, interval)
+    runs = _cycles_run(_end_instants(candidates[:-1], serie_manifest, tz), scope)
+
+    return candidates[runs & (candidates <= stop)], int(runs.sum())
+
+
+def _vectorized_daily_every_weekday(
+    serie_manifest: PlanManifest, scope, tz
+) -> Optional[Tuple[np.ndarray, int]]:
+    limit = _limit(scope)
+    if limit == -1:
+        return None
+
+    start = _as_day(scope.start_date)
+
+    if limit is not None:
+        return np.busday_offset(start, np.arange(limit), roll="forward"), limit
+
+    stop = _as_day(scope.stop_within_date)
+    if start > stop:
+        return np.array([], dtype="datetime64[D]"), 0
+
+    # Include the first weekday past the stop date, as the loop may run a cycle for it as well
+    candidates = np.arange(start, stop + 4)
+    candidates = candidates[np.is_busday(candidates)]
+    # The loop moves its cursor a day past the end of the previous event, keeping the UTC offset of said end; which
+    # around a DST transition may put the cursor past the stop date even if the next weekday is not.
+    runs = _cycles_run(
+        _end_instants(candidates[:-1], serie_manifest, tz) + _ONE_DAY, scope
+    )
+
+    return candidates[runs & (candidates <= stop)], int(runs.sum())
+
+
+def _vectorized_weekly_standard(
+    serie_manifest: PlanManifest, scope, tz
+) -> Optional[Tuple[np.ndarray, int]]:
+    interval = _interval(serie_manifest)
+    limit = _limit(scope)
+    selected_days = np.array(
+        [
+            day
+            for day, selected in enumerate(
+                (
+                    serie_manifest.monday,
+                    serie_manifest.tuesday,
+                    serie_manifest.wednesday,
+                    serie_manifest.thursday,
+                    serie_manifest.friday,
+                    serie_manifest.saturday,
+                    serie_manifest.sunday,
+                )
+            )
+            if selected == True
+        ],
+        dtype="int64",
+    )
+    if interval is None or limit == -1 or len(selected_days) == 0:
+        return None
+
+    start = _as_day(scope.start_date)
+    start_weekday = scope.start_date.weekday()
+    first_week = start - start_weekday
+    # The first cycle only generates events on the days of the week from the start date and onwards. If there are
+    # none, it generates no events and the loop stays on the start date for the next cycle.
+    first_week_is_empty = start_weekday > selected_days[-1]
+
+    def occurrences_of(weeks: np.ndarray) -> np.ndarray:
+        days = (weeks[:, None] + selected_days[None, :]).ravel()
+        return days[days >= start]
+
+    if limit is not None:
+        # Cycling goes on until limit weeks with events have been generated
+        weeks_needed = -(-limit // len(selected_days)) + 1
+        weeks = first_week + np.arange(weeks_needed) * 7 * interval
+        return occurrences_of(weeks)[:limit], limit + int(first_week_is_empty)
+
+    stop = _as_day(scope.stop_within_date)
+    if start > stop:
+        return np.array([], dtype="datetime64[D]"), 0
+
+    # Include the first week past the stop date, as the loop may run a cycle for it as well
+    weeks = np.arange(first_week, stop + 7 * interval + 1, 7 * interval)
+    cursors = _end_instants(weeks[:-1] + selected_days[-1], serie_manifest, tz)
+    if first_week_is_empty:
+        cursors[0] = _instants(np.array([start]), tz)[0]
+    runs = _cycles_run(cursors, scope)
+
+    occurrences = occurrences_of(weeks[runs])
+    return occurrences[occurrences <= stop], int(runs.sum())
+
+
+vectorized_strategies = {
+    "daily__every_x_day": _vectorized_daily_every_x_day,
+    "daily__every_weekday": _vectorized_daily_every_weekday,
+    "weekly__standard": _vectorized_weekly_standard,
+}
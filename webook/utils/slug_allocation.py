@@ -0,0 +1,119 @@
+"""slug_allocation.py
+
+Allocation of unique slugs for many new instances at once.
+
+AutoSlugField makes a slug unique as each instance is saved, probing the database for a rival slug once for every
+suffix it tries -- also when the instances are inserted with bulk_create, which saves all of them with the same
+view of the database, and thus hands out the same slug to instances with the same name.
+
+allocate_slugs computes the candidate slug of each of the given instances, fetches the existing slugs starting with
+each candidate with one query, and assigns unique suffixes in memory, in the same way AutoSlugField would have:
+
+    rooms = [Room(name=name, location=location, max_capacity=10) for name in names]
+    allocate_slugs(rooms)
+    Room.objects.bulk_create(rooms)
+
+The slugs of allocated instances are not probed again when they are saved, provided the field is a BulkAutoSlugField.
+
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set
+
+from autoslug import AutoSlugField
+from autoslug.utils import crop_slug, get_prepopulated_value
+from django.db import models
+
+# The amount of digits of the suffixes that are accounted for when cropping a candidate to fetch rivals with
+_MAX_SUFFIX_DIGITS = 6
+
+
+class BulkAutoSlugField(AutoSlugField):
+    """An AutoSlugField that keeps the slugs that have been allocated with allocate_slugs, instead of probing them"""
+
+    def pre_save(self, instance, add):
+        if add and self.name in getattr(instance, "_allocated_slugs", ()):
+            return getattr(instance, self.attname)
+
+        return super().pre_save(instance, add)
+
+    def deconstruct(self):
+        # Deconstructed as an AutoSlugField, as the two differ in how slugs are saved, not in what is stored
+        name, path, args, kwargs = super().deconstruct()
+        return name, "autoslug.fields.AutoSlugField", args, kwargs
+
+
+def _candidate_slug(field: AutoSlugField, instance: models.Model) -> str:
+    """Get the slug AutoSlugField would try first for the given instance"""
+    value = field.value_from_object(instance)
+    if field.always_update or (field.populate_from and not value):
+        value = get_prepopulated_value(field, instance)
+
+    slug = field.slugify(value) if value else None
+    if not slug:
+        slug = instance._meta.model_name
+
+    return crop_slug(field, slug)
+
+
+def _suffixed_slug(field: AutoSlugField, candidate: str, index: int) -> str:
+    """Get the slug with the given index, cropped such that it fits the field, as AutoSlugField does"""
+    suffix = f"{field.index_sep}{index}"
+    return candidate[: field.max_length - len(suffix)] + suffix
+
+
+def allocate_slugs(instances: Iterable[models.Model], field_name: str = "slug") -> None:
+    """
+    Allocate unique slugs for the given new instances of a model, unique among the instances as well as among the
+    existing rows, with one query for each distinct candidate slug.
+    """
+    instances = list(instances)
+    if not instances:
+        return
+
+    model = type(instances[0])
+    field = model._meta.get_field(field_name)
+    if not isinstance(field, AutoSlugField):
+        raise TypeError(f"{model.__name__}.{field_name} is not an AutoSlugField")
+    if field.unique_with:
+        raise ValueError(
+            f"Allocating slugs that are unique with {field.unique_with} is not supported"
+        )
+
+    if field.manager is not None:
+        manager = field.manager
+    elif field.manager_name is not None:
+        manager = getattr(model, field.manager_name)
+    else:
+        manager = model._default_manager
+
+    instances_of_candidates: Dict[str, List[models.Model]] = defaultdict(list)
+    for instance in instances:
+        instances_of_candidates[_candidate_slug(field, instance)].append(instance)
+
+    # Rivals may also be among the instances allocated for other candidates
+    allocated: Set[str] = set()
+    for candidate, candidate_instances in instances_of_candidates.items():
+        # Suffixed slugs may have been cropped shorter than the candidate itself
+        prefix = candidate[
+            : field.max_length - len(field.index_sep) - _MAX_SUFFIX_DIGITS
+        ]
+        taken = allocated | set(
+            manager.filter(**{f"{field.name}__startswith": prefix}).values_list(
+                field.name, flat=True
+            )
+        )
+
+        index = 1
+        for instance in candidate_instances:
+            slug = candidate
+            while slug in taken:
+                index += 1
+                slug = _suffixed_slug(field, candidate, index)
+
+            taken.add(slug)
+            allocated.add(slug)
+            setattr(instance, field.attname, slug)
+            instance._allocated_slugs = getattr(instance, "_allocated_slugs", set()) | {
+                field.name
+            }
@@ -0,0 +1,76 @@
+"""tz_offset_table.py
+
+Vectorized localization of wall times, using a precomputed table of the UTC offset transitions of a timezone.
+
+    Localizing with pytz is done one datetime at a time, which becomes the dominant cost when localizing thousands
+    of datetimes. The transitions of a pytz timezone are instead converted into a sorted table of wall time boundaries,
+    such that the tzinfo of any wall time can be found with a binary search over a whole array at once.
+
+    Localization follows tz.localize(dt, is_dst=False); ambiguous wall times resolve to standard time, and wall times
+    that do not exist (in the gap of a spring forward transition) keep the offset from before the transition.
+
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+from pytz import timezone
+
+
+@lru_cache(maxsize=None)
+def _offset_table(zone: str) -> Tuple[np.ndarray, list, np.ndarray]:
+    """
+    Build the offset table of the given timezone. Returns a tuple of the wall time boundaries (as datetime64[us]),
+    the tzinfo in effect from each boundary and onwards, and the UTC offset of each tzinfo (as timedelta64[us]).
+    """
+    tz = timezone(zone)
+    utc_transition_times = getattr(tz, "_utc_transition_times", None)
+
+    if not utc_transition_times:
+        # Static timezones (UTC and friends) have one offset, and no transitions
+        return (
+            np.array([np.datetime64(datetime.min, "us")]),
+            [tz],
+            np.array([np.timedelta64(tz.utcoffset(datetime.min), "us")]),
+        )
+
+    tzinfos = [tz._tzinfos[info] for info in tz._transition_info]
+    offsets = np.array([np.timedelta64(info[0], "us") for info in tz._transition_info])
+    # A transition takes effect, in wall time, at the moment of transition as seen with the new offset.
+    # For spring forward this leaves the gap with the old offset, and for fall back it gives the repeated hour the new
+    # (standard) offset -- both of which are what localize does with is_dst=False.
+    boundaries = (
+        np.array([np.datetime64(t, "us") for t in utc_transition_times]) + offsets
+    )
+
+    return boundaries, tzinfos, offsets
+
+
+def _table_indices(zone: str, wall_times: np.ndarray) -> np.ndarray:
+    boundaries, _, _ = _offset_table(zone)
+    indices = np.searchsorted(boundaries, wall_times.astype("datetime64[us]"), "right")
+    return np.clip(indices - 1, 0, None)
+
+
+def utc_offsets(tz, wall_times: np.ndarray) -> np.ndarray:
+    """Get the UTC offsets (as timedelta64[us]) that the given naive wall times would be localized with"""
+    _, _, offsets = _offset_table(tz.zone)
+    return offsets[_table_indices(tz.zone, wall_times)]
+
+
+def localize_wall_times(tz, wall_times: np.ndarray) -> List[datetime]:
+    """
+    Localize an array of naive wall times (datetime64) in the given timezone, returning a list of aware datetimes
+    identical to what tz.localize would have returned for each of them.
+    """
+    _, tzinfos, _ = _offset_table(tz.zone)
+    indices = _table_indices(tz.zone, wall_times)
+
+    return [
+        wall_time.replace(tzinfo=tzinfos[index])
+        for wall_time, index in zip(
+            wall_times.astype("datetime64[us]").tolist(), indices.tolist()
+        )
+    ]